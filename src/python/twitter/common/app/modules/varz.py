@@ -18,11 +18,19 @@
 # word in Python.  All characters appearing in this work are fictitious.
 # Any resemblance to real persons, living or dead, is purely coincidental.
 
+import gzip
+import hashlib
+import json
+import re
+import threading
+
 from twitter.common import app, options
+from twitter.common.lang import Compatibility
 from twitter.common.http import HttpServer
 from twitter.common.quantity import Amount, Time
 from twitter.common.metrics import (
   RootMetrics,
+  MetricHistory,
   MetricSampler,
   Label,
   LambdaGauge
@@ -48,7 +56,16 @@ class VarsSubsystem(app.Module):
           type='int',
           metavar='MILLISECONDS',
           dest='twitter_common_metrics_vars_sampling_delay_ms',
-          help='How long between taking samples of the vars subsystem.')
+          help='How long between taking samples of the vars subsystem.'),
+    'history_samples':
+      options.Option('--vars_history_samples',
+          default=0,
+          type='int',
+          metavar='SAMPLES',
+          dest='twitter_common_metrics_vars_history_samples',
+          help='How many samples of each numeric exported variable to retain for '
+               '/vars/history.  Memory use is bounded by SAMPLES * 8 bytes per variable.  '
+               'If 0, history is disabled.')
   }
 
   def __init__(self):
@@ -59,45 +76,178 @@ class VarsSubsystem(app.Module):
     options = app.get_options()
     rs = RootServer()
     if rs:
-      varz = VarsEndpoint(period = Amount(
-        options.twitter_common_metrics_vars_sampling_delay_ms, Time.MILLISECONDS))
+      varz = VarsEndpoint(
+        period = Amount(options.twitter_common_metrics_vars_sampling_delay_ms, Time.MILLISECONDS),
+        history_samples = options.twitter_common_metrics_vars_history_samples)
       rs.mount_routes(varz)
       register_diagnostics()
       register_build_properties()
 
 
+class SerializedSample(object):
+  """
+    Serializations of a single MetricSampler sample, each computed at most once.
+
+    Each body is cached with its ETag, and gzip-compressed variants are cached alongside.
+  """
+
+  FORMATTERS = {
+    'text': lambda samples: '\n'.join(
+        '%s %s' % (key, val) for key, val in sorted(samples.items())),
+    'json': lambda samples: json.dumps(samples),
+  }
+
+  @staticmethod
+  def compress(body):
+    buf = Compatibility.BytesIO()
+    # GzipFile is not a context manager on Python 2.6.
+    fp = gzip.GzipFile(fileobj=buf, mode='wb', mtime=0)
+    try:
+      fp.write(body)
+    finally:
+      fp.close()
+    return buf.getvalue()
+
+  def __init__(self, samples):
+    self.samples = samples
+    self._bodies = {}  # (format, gzipped) => (etag, body)
+    self._lock = threading.Lock()
+
+  def _serialize(self, format):
+    body = Compatibility.to_bytes(self.FORMATTERS[format](self.samples))
+    return '"%s"' % hashlib.md5(body).hexdigest(), body
+
+  def get(self, format, gzipped=False):
+    """
+      Return (etag, body) for the samples serialized in format, optionally gzipped.
+    """
+    with self._lock:
+      if (format, False) not in self._bodies:
+        self._bodies[(format, False)] = self._serialize(format)
+      if gzipped and (format, True) not in self._bodies:
+        etag, body = self._bodies[(format, False)]
+        self._bodies[(format, True)] = (etag[:-1] + '-gzip"', self.compress(body))
+      return self._bodies[(format, gzipped)]
+
+
+def accepts_gzip(accept_encoding):
+  """
+    Return True if the Accept-Encoding header value accept_encoding allows a gzipped response,
+    i.e. it lists gzip, or failing that *, with a nonzero quality.
+  """
+  qualities = {}
+  for coding in accept_encoding.split(','):
+    coding, _, params = coding.partition(';')
+    quality = 1.0
+    for param in params.split(';'):
+      name, _, value = param.partition('=')
+      if name.strip().lower() == 'q':
+        try:
+          quality = float(value)
+        except ValueError:
+          quality = 0.0
+    qualities[coding.strip().lower()] = quality
+  return qualities.get('gzip', qualities.get('*', 0.0)) > 0
+
+
+_ENTITY_TAG = re.compile(r'\*|(?:W/)?"[^"]*"')
+
+
+def etag_matches(etag, if_none_match):
+  """
+    Return True if the If-None-Match header value if_none_match matches etag, using the weak
+    comparison that HTTP requires for If-None-Match.
+  """
+  def opaque(tag):
+    return tag[2:] if tag.startswith('W/') else tag
+  for tag in _ENTITY_TAG.findall(if_none_match):
+    if tag == '*' or opaque(tag) == opaque(etag):
+      return True
+  return False
+
+
 class VarsEndpoint(object):
   """
     Wrap a MetricSampler to export the /vars endpoint for applications that register
     exported variables.
+
+    /vars and /vars.json serialize each sample once and serve the cached bytes, gzipped
+    for clients that accept it, with an ETag so that unchanged samples return 304.
   """
 
-  def __init__(self, period=None):
+  def __init__(self, period=None, history_samples=0):
     self._metrics = RootMetrics()
+    kw = {}
     if period is not None:
-      self._monitor = MetricSampler(self._metrics, period)
-    else:
-      self._monitor = MetricSampler(self._metrics)
+      kw.update(period = period)
+    if history_samples:
+      kw.update(history = MetricHistory(history_samples))
+    self._monitor = MetricSampler(self._metrics, **kw)
     self._monitor.start()
+    self._last_serialized = None
+    self._serialized_lock = threading.Lock()
+
+  def _serialized(self):
+    samples = self._monitor.sample()
+    with self._serialized_lock:
+      if self._last_serialized is None or self._last_serialized.samples is not samples:
+        self._last_serialized = SerializedSample(samples)
+      return self._last_serialized
+
+  def _serve(self, format, content_type):
+    gzipped = accepts_gzip(HttpServer.Request.headers.get('Accept-Encoding', ''))
+    etag, body = self._serialized().get(format, gzipped)
+    HttpServer.set_content_type(content_type)
+    HttpServer.set_header('ETag', etag)
+    HttpServer.set_header('Vary', 'Accept-Encoding')
+    if etag_matches(etag, HttpServer.Request.headers.get('If-None-Match', '')):
+      HttpServer.set_status(304)
+      return ''
+    if gzipped:
+      HttpServer.set_header('Content-Encoding', 'gzip')
+    return body
 
   @HttpServer.route("/vars")
   @HttpServer.route("/vars/:var")
   def handle_vars(self, var=None):
+    if var is None:
+      return self._serve('text', 'text/plain; charset=iso-8859-1')
+
     HttpServer.set_content_type('text/plain; charset=iso-8859-1')
     samples = self._monitor.sample()
-
-    if var is None:
-      return '\n'.join(
-        '%s %s' % (key, val) for key, val in sorted(samples.items()))
+    if var in samples:
+      return samples[var]
     else:
-      if var in samples:
-        return samples[var]
-      else:
-        HttpServer.abort(404, 'Unknown exported variable')
+      HttpServer.abort(404, 'Unknown exported variable')
+
+  @HttpServer.route("/vars/history/:var")
+  def handle_vars_history(self, var):
+    """
+      Serve the recorded "timestamp value" lines of var, oldest first.  The samples query
+      parameter limits the response to that many of the most recent samples.
+    """
+    HttpServer.set_content_type('text/plain; charset=iso-8859-1')
+    limit = HttpServer.Request.query.get('samples')
+    if limit is not None:
+      try:
+        limit = int(limit)
+      except ValueError:
+        limit = 0
+      if limit <= 0:
+        HttpServer.abort(400, 'samples must be a positive integer')
+    history = self._monitor.history()
+    if history is None:
+      HttpServer.abort(404, 'Variable history is disabled, see --vars_history_samples')
+    samples = history.get(var)
+    if samples is None:
+      HttpServer.abort(404, 'No history for exported variable')
+    if limit is not None:
+      samples = samples[-limit:]
+    return '\n'.join('%.3f %r' % (timestamp, value) for timestamp, value in samples)
 
   @HttpServer.route("/vars.json")
   def handle_vars_json(self, var=None, value=None):
-    return self._monitor.sample()
+    return self._serve('json', 'application/json')
 
   def shutdown(self):
     self._monitor.shutdown()
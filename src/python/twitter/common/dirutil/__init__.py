@@ -262,12 +262,13 @@ def unlock_file(fp, close=False):
 
 
 from twitter.common.dirutil.lock import Lock
-from twitter.common.dirutil.tail import tail_f
+from twitter.common.dirutil.tail import follow, tail_f
 from twitter.common.dirutil.fileset import Fileset
 
 __all__ = (
   'chmod_plus_x',
   'du',
+  'follow',
   'lock_file',
   'safe_bsize',
   'safe_delete',
@@ -16,38 +16,57 @@
 
 __author__ = 'Brian Wickman'
 
-import os
+import ctypes
+import ctypes.util
+from collections import defaultdict
 import errno
+import itertools
+import os
+import select
+import struct
+import sys
 import time
 
 
+def reverse_lines(fp, block_size=8192):
+  """
+    Generate the lines of the file-like fp from last to first, without their line endings, by
+    reading it backward from the end in blocks of block_size bytes.  Each byte is read once, so
+    reading the last N lines costs about the size of those lines, however long they are.
+  """
+  fp.seek(0, 2)
+  position = fp.tell()
+  newline = carriage_return = None
+  chunks = []  # the pieces of the line being read, last piece first
+  at_end = True
+  while position > 0:
+    size = min(block_size, position)
+    position -= size
+    fp.seek(position)
+    block = fp.read(size)
+    if newline is None:
+      newline, carriage_return = (b'\n', b'\r') if isinstance(block, bytes) else (u'\n', u'\r')
+    pieces = block.split(newline)
+    chunks.append(pieces[-1])
+    for piece in reversed(pieces[:-1]):
+      line = newline[:0].join(reversed(chunks))
+      # a newline at the end of the file does not start another line.
+      if line or not at_end:
+        yield line.rstrip(carriage_return)
+      at_end = False
+      chunks = [piece]
+  if chunks:
+    yield newline[:0].join(reversed(chunks)).rstrip(carriage_return)
+
+
 def _tail_lines(fd, linesback=10):
   if fd is None:
     return
 
-  # Contributed to Python Cookbook by Ed Pascoe (2003)
-  avgcharsperline = 75
-
-  while True:
-    try:
-      fd.seek(int(-1 * avgcharsperline * linesback), 2)
-    except IOError:
-      fd.seek(0)
-
-    atstart = fd.tell() == 0
-
-    lines = fd.read().splitlines()
-    if atstart or len(lines) > (linesback + 1):
-      break
-
-    avgcharsperline = avgcharsperline * 1.3
-
-  if len(lines) > linesback:
-    start = len(lines) - linesback - 1
-  else:
-    start = 0
-
-  return lines[start:start+linesback]
+  lines = list(itertools.islice(reverse_lines(fd), linesback))
+  lines.reverse()
+  fd.seek(0, 2)
+  return lines
 
 
 def wait_until_opened(filename, forever=True, clock=time):
@@ -70,49 +89,308 @@ def tail(filename, lines=10):
       yield line
 
 
-def tail_f(filename, forever=True, include_last=False, clock=time):
-  fd = wait_until_opened(filename, forever, clock)
+class Inotify(object):
+  """
+    A minimal ctypes binding of the Linux inotify API.
+  """
 
-  # wind back to near the end of the file...
-  last_lines = _tail_lines(fd, 10)
+  IN_MODIFY = 0x00000002
+  IN_ATTRIB = 0x00000004
+  IN_MOVED_FROM = 0x00000040
+  IN_MOVED_TO = 0x00000080
+  IN_CREATE = 0x00000100
+  IN_DELETE = 0x00000200
+  IN_Q_OVERFLOW = 0x00004000
+  IN_IGNORED = 0x00008000
 
-  while True:
-    if fd is None:
-      return
+  IN_CLOEXEC = 0o2000000
+  IN_NONBLOCK = 0o4000
 
-    where = fd.tell()
+  _EVENT = struct.Struct('iIII')
 
-    if last_lines:
-      yield last_lines.pop(0)
-      continue
-    else:
-      line = fd.readline()
+  class Error(Exception): pass
+
+  _LIBC = None
+
+  @classmethod
+  def _libc(cls):
+    if cls._LIBC is None:
+      if not sys.platform.startswith('linux'):
+        raise cls.Error('inotify is only available on Linux.')
+      try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        for function in ('inotify_init1', 'inotify_add_watch'):
+          getattr(libc, function)
+      except (OSError, AttributeError) as e:
+        raise cls.Error('Could not load inotify: %s' % e)
+      cls._LIBC = libc
+    return cls._LIBC
+
+  @classmethod
+  def available(cls):
+    try:
+      cls._libc()
+      return True
+    except cls.Error:
+      return False
+
+  @classmethod
+  def _check(cls, rc):
+    if rc < 0:
+      code = ctypes.get_errno()
+      raise OSError(code, os.strerror(code))
+    return rc
+
+  def __init__(self):
+    self._fd = self._check(self._libc().inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC))
+
+  def fileno(self):
+    return self._fd
+
+  def add_watch(self, path, mask):
+    """Watch path for the events in mask, returning the watch descriptor.  May raise OSError."""
+    if not isinstance(path, bytes):
+      path = path.encode(sys.getfilesystemencoding())
+    return self._check(self._libc().inotify_add_watch(self._fd, path, mask))
+
+  def read(self):
+    """Return the pending events as a list of (watch descriptor, mask, cookie, name)."""
+    try:
+      buf = os.read(self._fd, 65536)
+    except OSError as e:
+      if e.errno in (errno.EAGAIN, errno.EINTR):
+        return []
+      raise
+    events, offset = [], 0
+    while offset + self._EVENT.size <= len(buf):
+      wd, mask, cookie, length = self._EVENT.unpack_from(buf, offset)
+      offset += self._EVENT.size
+      name = buf[offset:offset + length].rstrip(b'\0')
+      offset += length
+      if not isinstance(name, str):
+        name = name.decode(sys.getfilesystemencoding())
+      events.append((wd, mask, cookie, name))
+    return events
+
+  def close(self):
+    if self._fd is not None:
+      os.close(self._fd)
+      self._fd = None
+
+
+class _Follower(object):
+  """
+    The state of one file being followed.  lines() yields whatever can be read from the file
+    and then checks whether it was rotated or truncated, reopening or rewinding it.
+  """
+
+  def __init__(self, filename, forever, lines_back):
+    self.filename = filename
+    self.paths = ()
+    self.done = False
+    self._forever = forever
+    self._fp = None
+    self._pending = []
+    self._lines_back = lines_back
+    self._resolve()
+
+  def _resolve(self):
+    # The (dirname, basename) of the followed path and, if it is a symlink (such as the
+    # app.INFO links made by twitter.common.log), of the file it points to.
+    paths = [os.path.split(os.path.abspath(self.filename))]
+    real_path = os.path.split(os.path.realpath(self.filename))
+    if real_path != paths[0]:
+      paths.append(real_path)
+    self.paths = tuple(paths)
+
+  def _open(self):
+    self._resolve()
+    try:
+      self._fp = open(self.filename, 'r')
+    except (IOError, OSError) as e:
+      if e.errno != errno.ENOENT:
+        raise
+      if not self._forever:
+        self.done = True
+      return False
+    if self._lines_back:
+      # wind back to near the end of the file...
+      self._pending = _tail_lines(self._fp, self._lines_back)
+    self._lines_back = 0
+    return True
+
+  def close(self):
+    if self._fp is not None:
+      self._fp.close()
+      self._fp = None
+
+  def lines(self):
+    while not self.done and (self._fp is not None or self._open()):
+      while self._pending:
+        yield self._pending.pop(0)
+
+      where = self._fp.tell()
+      line = self._fp.readline()
+      if line:
+        yield line
+        continue
 
-    if line:
-      yield line
-    else:
       # check health of the file descriptor.
-      fd_results = os.fstat(fd.fileno())
+      fd_results = os.fstat(self._fp.fileno())
       try:
-        st_results = None
-        st_results = os.stat(filename)
+        st_results = os.stat(self.filename)
       except OSError as e:
-        if e.errno == errno.ENOENT:
-          fd = wait_until_opened(filename, forever, clock)
-          continue
-        else:
+        if e.errno != errno.ENOENT:
           raise
+        self.close()
+        if not self._forever:
+          self.done = True
+        return
 
       # file changed from underneath us, reopen
       if fd_results.st_ino != st_results.st_ino:
-        fd.close()
-        fd = wait_until_opened(filename, forever, clock)
+        self.close()
         continue
 
       if st_results.st_size < where:
         # file truncated, rewind
-        fd.seek(0)
+        self._fp.seek(0)
+        continue
+
+      # our buffer has not yet caught up, wait.
+      self._fp.seek(where)
+      return
+
+
+def _follow_poll(followers, clock):
+  while True:
+    for follower in followers:
+      for line in follower.lines():
+        yield follower.filename, line
+    followers = [follower for follower in followers if not follower.done]
+    if not followers:
+      return
+    clock.sleep(1)
+
+
+_WATCH_MASK = (Inotify.IN_MODIFY | Inotify.IN_ATTRIB | Inotify.IN_CREATE | Inotify.IN_DELETE |
+               Inotify.IN_MOVED_FROM | Inotify.IN_MOVED_TO)
+
+
+def _follow_inotify(followers, inotify):
+  # Parent directories are watched rather than the files themselves, so that creation, rotation
+  # and deletion are seen along with writes.  Followers whose directory cannot be watched are
+  # polled every second until it can be.
+  directories = {}  # dirname => watch descriptor
+  watched = defaultdict(list)  # (watch descriptor, basename) => [follower]
+  registered = {}  # follower => set([(watch descriptor, basename)])
+
+  def watch(follower):
+    """
+      Watch the paths of follower.  Returns None if they cannot all be watched, otherwise
+      whether the watched paths changed.
+    """
+    keys = set()
+    for dirname, basename in follower.paths:
+      if dirname not in directories:
+        try:
+          directories[dirname] = inotify.add_watch(dirname, _WATCH_MASK)
+        except OSError:
+          return None
+      keys.add((directories[dirname], basename))
+    old_keys = registered.get(follower, set())
+    for key in old_keys - keys:
+      watched[key].remove(follower)
+      if not watched[key]:
+        del watched[key]
+    for key in keys - old_keys:
+      watched[key].append(follower)
+    registered[follower] = keys
+    return keys != old_keys
+
+  def unwatch(wd):
+    for dirname, dirname_wd in list(directories.items()):
+      if dirname_wd == wd:
+        del directories[dirname]
+    for key in [key for key in watched if key[0] == wd]:
+      del watched[key]
+    for keys in registered.values():
+      keys.difference_update([key for key in keys if key[0] == wd])
+
+  ready = list(followers)
+  while True:
+    # Watch before reading, so that a write just after a read always wakes us.  Followers whose
+    # paths are newly watched (e.g. a symlink that now points elsewhere) are read again, since
+    # they may have been written before the watch was added.
+    unwatched = []
+    for follower in followers:
+      changed = watch(follower)
+      if changed is None:
+        unwatched.append(follower)
+      elif changed and follower not in ready:
+        ready.append(follower)
+
+    if ready:
+      for follower in ready:
+        for line in follower.lines():
+          yield follower.filename, line
+      ready = []
+      followers = [follower for follower in followers if not follower.done]
+      if not followers:
+        return
+      continue
+
+    try:
+      rlist, _, _ = select.select([inotify], [], [], 1.0 if unwatched else None)
+    except select.error as e:
+      if e.args[0] == errno.EINTR:
+        continue
+      raise
+
+    woken = set(unwatched)
+    for wd, mask, _, name in inotify.read() if rlist else ():
+      if mask & Inotify.IN_Q_OVERFLOW:
+        woken.update(followers)
+      elif mask & Inotify.IN_IGNORED:
+        woken.update(follower for key, followers_of_key in watched.items() if key[0] == wd
+                     for follower in followers_of_key)
+        unwatch(wd)
       else:
-        # our buffer has not yet caught up, wait.
-        clock.sleep(1)
-        fd.seek(where)
+        woken.update(watched.get((wd, name), ()))
+    ready = [follower for follower in followers if follower in woken]
+
+
+def follow(filenames, forever=True, clock=time, lines_back=10):
+  """
+    Follow the files filenames from a single thread, yielding (filename, line) for the last
+    lines_back lines of each file that exists at the start and then for every line written to
+    them.  Files that are rotated (replaced by a new file) are reopened and read from the start,
+    and files that are truncated are rewound.
+
+    If forever is True, files that are missing are waited for; otherwise they are dropped, and
+    the generator ends when no file is left.
+
+    On Linux, changes are waited for with inotify, so lines are delivered as soon as they are
+    written; both a symlink and the file it currently points to are watched.  Elsewhere, or if
+    a clock other than time is supplied, the files are polled once every clock.sleep(1).
+  """
+  followers = [_Follower(filename, forever, lines_back) for filename in filenames]
+  try:
+    if clock is time and Inotify.available():
+      inotify = Inotify()
+      try:
+        for filename_and_line in _follow_inotify(followers, inotify):
+          yield filename_and_line
+      finally:
+        inotify.close()
+    else:
+      for filename_and_line in _follow_poll(followers, clock):
+        yield filename_and_line
+  finally:
+    for follower in followers:
+      follower.close()
+
+
+def tail_f(filename, forever=True, include_last=False, clock=time):
+  for _, line in follow([filename], forever=forever, clock=clock):
+    yield line
@@ -104,6 +104,14 @@ class HttpServer(object):
   def set_content_type(header_value):
     bottle.response.content_type = header_value
 
+  @staticmethod
+  def set_header(name, value):
+    bottle.response.set_header(name, value)
+
+  @staticmethod
+  def set_status(status):
+    bottle.response.status = status
+
   def __init__(self):
     self._app = bottle.Bottle()
     self._request = bottle.request   # it's sort of upsetting that these are globals
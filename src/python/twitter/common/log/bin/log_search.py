@@ -0,0 +1,90 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+"""Search glog and zookeeper log files in parallel, printing matching entries in time order.
+
+  log_search --level=WARNING --start='2013-03-01 12:00:00' --end='2013-03-01 13:00' \\
+      --pattern='Timeout' /var/log/myservice/*.INFO.*
+"""
+
+from __future__ import print_function
+
+from datetime import datetime
+
+from twitter.common import app
+from twitter.common.log.parsers import Level
+from twitter.common.log.search import LogFilter, SearchError, search
+
+
+TIME_FORMATS = ('%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d')
+
+
+def parse_time(value):
+  for time_format in TIME_FORMATS:
+    try:
+      return datetime.strptime(value, time_format)
+    except ValueError:
+      continue
+  app.error('Could not parse time %r, expected YYYY-mm-dd [HH:MM[:SS[.uuuuuu]]]' % value)
+
+
+app.set_usage('%prog [options] logfile [logfile ...]')
+
+app.add_option('--level', default=None, metavar='LEVEL',
+               choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'FATAL'],
+               help='Only print entries at or above this level.')
+
+app.add_option('--start', default=None, metavar='TIME',
+               help='Only print entries at or after this local time, YYYY-mm-dd [HH:MM[:SS]].')
+
+app.add_option('--end', default=None, metavar='TIME',
+               help='Only print entries before this local time, YYYY-mm-dd [HH:MM[:SS]].')
+
+app.add_option('--source', default=None, metavar='REGEX',
+               help='Only print entries whose source (e.g. file.py:42]) matches this regex.')
+
+app.add_option('--pattern', default=None, metavar='REGEX',
+               help='Only print entries whose text, including continuation lines, matches '
+                    'this regex.')
+
+app.add_option('--processes', type='int', default=None, metavar='N',
+               help='Number of files to search in parallel [default: number of CPUs].')
+
+app.add_option('--with_filename', default=False, action='store_true',
+               help='Prefix each entry with the name of its file.')
+
+
+def main(args, options):
+  if not args:
+    app.error('Must supply at least one log file to search.')
+  log_filter = LogFilter(
+      level=getattr(Level, options.level) if options.level else None,
+      start=parse_time(options.start) if options.start else None,
+      end=parse_time(options.end) if options.end else None,
+      source=options.source,
+      pattern=options.pattern)
+  try:
+    matches = search(args, log_filter=log_filter, processes=options.processes)
+  except SearchError as e:
+    app.error(str(e))
+  for filename, line in matches:
+    if options.with_filename:
+      print('%s: %s' % (filename, line.raw))
+    else:
+      print(line.raw)
+
+
+app.main()
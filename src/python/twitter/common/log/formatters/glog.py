@@ -48,19 +48,41 @@ class GlogFormatter(logging.Formatter):
 
   def __init__(self):
     logging.Formatter.__init__(self)
+    # (second, 'mmdd hh:mm:ss' of that second) and (process, pid string) of the last record,
+    # each replaced as a whole so that they are safe to share between threads.
+    self._last_second = (None, None)
+    self._last_process = (None, None)
+
+  def _timestamp(self, second):
+    last_second, timestamp = self._last_second
+    if second != last_second:
+      date = time.localtime(second)
+      timestamp = '%02d%02d %02d:%02d:%02d' % (
+          date.tm_mon, date.tm_mday, date.tm_hour, date.tm_min, date.tm_sec)
+      self._last_second = (second, timestamp)
+    return timestamp
+
+  def _pid(self, process):
+    last_process, pid = self._last_process
+    if process != last_process or pid is None:
+      pid = str(process) if process is not None else '?????'
+      self._last_process = (process, pid)
+    return pid
 
   def format(self, record):
-    try:
-      level = GlogFormatter.LEVEL_MAP[record.levelno]
-    except:
-      level = '?'
-    date = time.localtime(record.created)
-    date_usec = (record.created - int(record.created)) * 1e6
-    record_message = '%c%02d%02d %02d:%02d:%02d.%06d %s %s:%d] %s' % (
-       level, date.tm_mon, date.tm_mday, date.tm_hour, date.tm_min, date.tm_sec, date_usec,
-       record.process if record.process is not None else '?????',
+    created = record.created
+    second = int(created)
+    record_message = '%s%s.%06d %s %s:%d] %s' % (
+       self.LEVEL_MAP.get(record.levelno, '?'),
+       self._timestamp(second),
+       (created - second) * 1e6,
+       self._pid(record.process),
        record.filename,
        record.lineno,
        format_message(record))
-    record.getMessage = lambda: record_message
-    return logging.Formatter.format(self, record)
+    if record.exc_info or record.exc_text or getattr(record, 'stack_info', None):
+      # Let logging.Formatter append the traceback.
+      record.getMessage = lambda: record_message
+      return logging.Formatter.format(self, record)
+    record.message = record_message
+    return record_message
@@ -14,7 +14,12 @@
 # limitations under the License.
 # ==================================================================================================
 
+from collections import deque
+import logging
 from logging import Handler
+import sys
+import threading
+import time
 
 try:
   from scribe import scribe
@@ -114,3 +119,424 @@ class ScribeHandler(Handler):
                                         % (self._host, self._port, err))
     finally:
       self.transport.close()
+
+
+class AsyncHandler(Handler):
+  """logging.Handler that hands records to other handlers on a single writer thread.
+
+  emit() appends the record to a queue without taking a lock unless the queue is full.  The
+  writer thread drains the queue in batches and, for each target handler, filters and formats
+  the batch and writes it to the handler's stream with a single write and flush.  Targets that
+  are not logging.StreamHandlers are passed each record in turn.
+
+  When max_queue records are waiting, emit() either blocks until the writer makes room
+  ('block') or discards the record ('drop').
+  """
+  BLOCK = 'block'
+  DROP = 'drop'
+  OVERFLOW_POLICIES = (BLOCK, DROP)
+
+  def __init__(self, handlers, max_queue=10000, overflow=BLOCK, batch_size=1000,
+               flush_interval=0.5):
+    """Initialize an AsyncHandler writing to the list of logging.Handlers handlers.
+
+    Params:
+    max_queue: Maximum number of records waiting to be written.
+    overflow: 'block' or 'drop', what emit() does when the queue is full.
+    batch_size: Maximum number of records written per batch.
+    flush_interval: Maximum seconds between checks of the queue by the writer thread.
+    """
+    if overflow not in self.OVERFLOW_POLICIES:
+      raise ValueError('Unknown overflow policy %r, choose from %s' % (
+          overflow, ', '.join(self.OVERFLOW_POLICIES)))
+    Handler.__init__(self)
+    self._handlers = list(handlers)
+    self._max_queue = max_queue
+    self._overflow = overflow
+    self._batch_size = batch_size
+    self._flush_interval = flush_interval
+    self._queue = deque()
+    self._dropped = 0
+    self._in_flight = 0
+    self._closing = False
+    self._wakeup = threading.Event()
+    self._written = threading.Condition()
+    self._thread = threading.Thread(target=self._run, name='AsyncHandler')
+    self._thread.daemon = True
+    self._thread.start()
+
+  @property
+  def handlers(self):
+    """The handlers records are written to."""
+    return self._handlers
+
+  def queue_depth(self):
+    """The number of records waiting to be written."""
+    return len(self._queue) + self._in_flight
+
+  def dropped(self):
+    """The number of records discarded because the queue was full or the handler closed."""
+    return self._dropped
+
+  def handle(self, record):
+    # The targets' filters are applied and their locks taken on the writer thread, so the caller
+    # does not need to take this handler's lock.
+    rv = self.filter(record)
+    if rv:
+      self.emit(record)
+    return rv
+
+  def _drop(self):
+    with self._written:
+      self._dropped += 1
+
+  def emit(self, record):
+    """Queue a record to be written by the writer thread."""
+    if self._closing:
+      self._drop()
+      return
+    if len(self._queue) >= self._max_queue:
+      if self._overflow == self.DROP:
+        self._drop()
+        return
+      with self._written:
+        while len(self._queue) >= self._max_queue and self._thread.is_alive():
+          self._wakeup.set()
+          self._written.wait(self._flush_interval)
+        if len(self._queue) >= self._max_queue:
+          # The writer thread is gone, so nothing will make room.
+          self._dropped += 1
+          return
+    self._queue.append(record)
+    if not self._wakeup.is_set():
+      self._wakeup.set()
+
+  def flush(self, timeout=None):
+    """Wait until all queued records have been written, for at most timeout seconds.
+
+    Returns True if nothing remains to be written.
+    """
+    deadline = None if timeout is None else time.time() + timeout
+    with self._written:
+      while self.queue_depth() and self._thread.is_alive():
+        self._wakeup.set()
+        remaining = self._flush_interval if deadline is None else min(
+            self._flush_interval, deadline - time.time())
+        if remaining <= 0:
+          break
+        self._written.wait(remaining)
+      return not self.queue_depth()
+
+  def close(self):
+    """Write any queued records, stop the writer thread and close the target handlers."""
+    if not self._closing:
+      self._closing = True
+      self._wakeup.set()
+      self._thread.join()
+      for handler in self._handlers:
+        handler.close()
+    Handler.close(self)
+
+  @staticmethod
+  def _encode(stream, message):
+    """Return message as a line for stream.
+
+    On Python 2, unicode messages are encoded as StreamHandler would write them, so that they can
+    be joined with byte string messages.
+    """
+    line = message + '\n'
+    if sys.version_info[0] == 2 and not isinstance(line, bytes):
+      try:
+        line = line.encode(getattr(stream, 'encoding', None) or 'utf-8')
+      except UnicodeError:
+        line = line.encode('utf-8')
+    return line
+
+  # Handlers whose emit() only formats the record and writes it to the stream, so that a batch of
+  # records may be written with a single write.  Subclasses that override emit(), such as the
+  # rotating file handlers, must be passed each record.
+  _STREAM_EMITS = frozenset(getattr(emit, '__func__', emit) for emit in (
+      logging.StreamHandler.emit, logging.FileHandler.emit))
+
+  @classmethod
+  def _writes_stream(cls, handler):
+    emit = type(handler).emit
+    return getattr(emit, '__func__', emit) in cls._STREAM_EMITS
+
+  @classmethod
+  def _write_batch(cls, handler, records):
+    if not cls._writes_stream(handler):
+      for record in records:
+        handler.handle(record)
+      return
+    lines = []
+    for record in records:
+      if record.levelno >= handler.level and handler.filter(record):
+        try:
+          lines.append(cls._encode(handler.stream, handler.format(record)))
+        except Exception:
+          handler.handleError(record)
+    if not lines:
+      return
+    handler.acquire()
+    try:
+      if handler.stream is None:
+        # A FileHandler created with delay=True opens its file on the first emit().
+        handler.stream = handler._open()
+      handler.stream.write(lines[0][:0].join(lines))
+      handler.flush()
+    except Exception:
+      handler.handleError(records[-1])
+    finally:
+      handler.release()
+
+  def _run(self):
+    while True:
+      self._wakeup.wait(self._flush_interval)
+      self._wakeup.clear()
+      closing = self._closing
+      while self._queue:
+        batch = []
+        while self._queue and len(batch) < self._batch_size:
+          batch.append(self._queue.popleft())
+        self._in_flight = len(batch)
+        for handler in self._handlers:
+          try:
+            self._write_batch(handler, batch)
+          except Exception:
+            # Keep writing: if this thread died, logging would silently stop.
+            handler.handleError(batch[-1])
+        with self._written:
+          self._in_flight = 0
+          self._written.notify_all()
+      if closing:
+        break
+    with self._written:
+      self._dropped += len(self._queue)
+      self._queue.clear()
+      self._written.notify_all()
+
+
+class AsyncScribeHandler(Handler):
+  """logging.Handler interface for Scribe that sends records from a background thread.
+
+  emit() only formats the record and appends it to a bounded queue.  A daemon thread keeps a
+  persistent framed connection to scribe and sends the queue in batched Log calls whenever
+  batch_size records are pending or flush_interval seconds have passed.  Failed sends are
+  retried, reconnecting if necessary, with exponential backoff.
+  """
+  DROP_OLDEST = 'drop_oldest'
+  BLOCK = 'block'
+  OVERFLOW_POLICIES = (DROP_OLDEST, BLOCK)
+
+  class ScribeHandlerException(ScribeHandler.ScribeHandlerException):
+    pass
+
+  def __init__(self, *args, **kwargs):
+    """logging.Handler interface for Scribe that does not block on the network.
+
+    Params:
+    category: Scribe category for logging events.
+    host: Scribe host.
+    port: Scribe port.
+    max_queue: Maximum number of records waiting to be sent (default 10000).
+    overflow: What emit() does when the queue is full: 'drop_oldest' discards the oldest queued
+              record, 'block' waits for the sender to make room (default 'drop_oldest').
+    batch_size: Maximum number of records sent in a single Log call (default 500).
+    flush_interval: Maximum seconds a record waits for its batch to fill (default 1.0).
+    max_backoff: Maximum seconds to wait between failed sends (default 30.0).
+    timeout: Socket timeout in seconds, or None for no timeout (default 10.0).
+    close_timeout: Maximum seconds close() waits for queued records to be sent (default 5.0).
+    """
+    if not _SCRIBE_PRESENT:
+      raise self.ScribeHandlerException(
+        "Could not initialize AsyncScribeHandler: Scribe modules not present.")
+    self._category = kwargs.pop("category")
+    self._host = kwargs.pop("host")
+    self._port = kwargs.pop("port")
+    self._max_queue = kwargs.pop("max_queue", 10000)
+    self._overflow = kwargs.pop("overflow", self.DROP_OLDEST)
+    if self._overflow not in self.OVERFLOW_POLICIES:
+      raise ValueError('Unknown overflow policy %r, choose from %s' % (
+          self._overflow, ', '.join(self.OVERFLOW_POLICIES)))
+    self._batch_size = kwargs.pop("batch_size", 500)
+    self._flush_interval = kwargs.pop("flush_interval", 1.0)
+    self._max_backoff = kwargs.pop("max_backoff", 30.0)
+    self._timeout = kwargs.pop("timeout", 10.0)
+    self._close_timeout = kwargs.pop("close_timeout", 5.0)
+    Handler.__init__(self, *args, **kwargs)
+    self._queue = deque()
+    self._in_flight = 0
+    self._dropped = 0
+    self._closing = False
+    self._flushing = 0  # the number of flush() calls waiting
+    self._condition = threading.Condition()
+    self._client = self._transport = None
+    self._thread = threading.Thread(target=self._run, name='AsyncScribeHandler')
+    self._thread.daemon = True
+    self._thread.start()
+
+  @property
+  def messages_pending(self):
+    """Return True if there are messages waiting to be sent."""
+    with self._condition:
+      return bool(self._queue) or self._in_flight > 0
+
+  @property
+  def dropped(self):
+    """The number of records discarded because the queue was full or the handler closed."""
+    return self._dropped
+
+  def emit(self, record):
+    """Queue a record to be sent to Scribe."""
+    try:
+      entry = scribe.LogEntry(category=self._category, message=self.format(record))
+    except Exception:
+      self.handleError(record)
+      return
+    with self._condition:
+      if self._closing:
+        self._dropped += 1
+        return
+      while len(self._queue) >= self._max_queue:
+        if self._overflow == self.DROP_OLDEST:
+          self._queue.popleft()
+          self._dropped += 1
+        else:
+          self._condition.wait()
+          if self._closing:
+            self._dropped += 1
+            return
+      self._queue.append(entry)
+      # Wake the sender to start the flush interval for a new batch, or to send a full one.
+      if len(self._queue) == 1 or len(self._queue) >= self._batch_size:
+        self._condition.notify_all()
+
+  def flush(self, timeout=None):
+    """Wait until all queued messages have been sent, for at most timeout seconds (default
+    close_timeout.)
+
+    Returns True if nothing remains to be sent.
+    """
+    deadline = time.time() + (self._close_timeout if timeout is None else timeout)
+    with self._condition:
+      self._flushing += 1
+      self._condition.notify_all()
+      try:
+        while self._queue or self._in_flight:
+          remaining = deadline - time.time()
+          if remaining <= 0 or not self._thread.is_alive():
+            break
+          self._condition.wait(remaining)
+        return not (self._queue or self._in_flight)
+      finally:
+        self._flushing -= 1
+
+  def close(self):
+    """Sends any remaining messages, then stops the sender thread and closes the connection."""
+    if not self._closing:
+      self.flush()
+      with self._condition:
+        self._closing = True
+        self._dropped += len(self._queue)
+        self._queue.clear()
+        self._condition.notify_all()
+      self._thread.join(self._flush_interval + 1)
+    Handler.close(self)
+
+  def _next_batch(self):
+    """Wait for a full batch, the flush interval to expire, a flush or close, then dequeue up to
+    batch_size records.  Returns None when closing."""
+    with self._condition:
+      deadline = None
+      while not self._closing:
+        if self._queue:
+          if len(self._queue) >= self._batch_size or self._flushing:
+            break
+          now = time.time()
+          deadline = deadline or now + self._flush_interval
+          if now >= deadline:
+            break
+          self._condition.wait(deadline - now)
+        else:
+          deadline = None
+          self._condition.wait()
+      if self._closing:
+        return None
+      batch = [self._queue.popleft() for _ in range(min(self._batch_size, len(self._queue)))]
+      self._in_flight = len(batch)
+      # Wake emitters blocked on a full queue.
+      self._condition.notify_all()
+      return batch
+
+  def _connect(self):
+    socket = TSocket.TSocket(host=self._host, port=self._port)
+    if self._timeout is not None:
+      socket.setTimeout(self._timeout * 1000)
+    self._transport = TTransport.TFramedTransport(socket)
+    protocol = TBinaryProtocol.TBinaryProtocol(trans=self._transport,
+                                               strictRead=False,
+                                               strictWrite=False)
+    self._client = scribe.Client(iprot=protocol, oprot=protocol)
+    self._transport.open()
+
+  def _disconnect(self):
+    if self._transport is not None:
+      try:
+        self._transport.close()
+      except Exception:
+        pass
+    self._client = self._transport = None
+
+  def _send(self, batch):
+    """Send a batch over the persistent connection, reconnecting if necessary.
+
+    Raises:
+    ScribeHandlerException on connection or protocol errors or if scribe does not accept the
+    batch.
+    """
+    try:
+      if self._client is None:
+        self._connect()
+      result = self._client.Log(batch)
+    except Exception as err:
+      # Transport, protocol and application errors may all leave the connection unusable.
+      self._disconnect()
+      raise self.ScribeHandlerException('Could not send to scribe host=%s:%s error=%s'
+                                        % (self._host, self._port, err))
+    if result != scribe.ResultCode.OK:
+      raise self.ScribeHandlerException('Scribe message submission failed')
+
+  def _sleep(self, seconds):
+    """Sleep for seconds, returning early if the handler is closed."""
+    with self._condition:
+      deadline = time.time() + seconds
+      while not self._closing:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+          break
+        self._condition.wait(remaining)
+
+  def _run(self):
+    backoff = 0
+    try:
+      while True:
+        batch = self._next_batch()
+        if batch is None:
+          break
+        while not self._closing:
+          try:
+            self._send(batch)
+            backoff = 0
+            break
+          except Exception:
+            # The sender must outlive any error, or emitters would block on a full queue.
+            backoff = min(self._max_backoff, backoff * 2 or min(0.1, self._max_backoff))
+            self._sleep(backoff)
+        with self._condition:
+          if self._closing and self._in_flight:
+            self._dropped += self._in_flight
+          self._in_flight = 0
+          self._condition.notify_all()
+    finally:
+      self._disconnect()
@@ -39,6 +39,7 @@ See twitter.com.log.options for customizations.
 
 from __future__ import print_function
 
+import atexit
 import getpass
 import logging
 import os
@@ -47,7 +48,7 @@ import sys
 import time
 
 from twitter.common.log.formatters import glog, plain
-from twitter.common.log.handlers import ScribeHandler
+from twitter.common.log.handlers import AsyncHandler, AsyncScribeHandler, ScribeHandler
 from twitter.common.log.options import LogOptions
 from twitter.common.dirutil import safe_mkdir
 
@@ -189,13 +190,34 @@ def _setup_disk_logging(filebase):
   return handlers
 
 
+def _setup_async_disk_logging(handlers):
+  async_handler = AsyncHandler(handlers, overflow=LogOptions.log_async_overflow())
+  _export_async_metrics(async_handler)
+  return [async_handler]
+
+
+def _export_async_metrics(async_handler):
+  try:
+    from twitter.common.metrics import LambdaGauge, RootMetrics
+  except ImportError:
+    return
+  metrics = RootMetrics().scope('log')
+  metrics.register(LambdaGauge('async_queue_depth', async_handler.queue_depth))
+  metrics.register(LambdaGauge('async_dropped_records', async_handler.dropped))
+
+
 def _setup_scribe_logging():
   filter = GenericFilter(lambda r_l: r_l >= LogOptions.scribe_log_level())
   formatter = ProxyFormatter(LogOptions.scribe_log_scheme)
-  scribe_handler = ScribeHandler(buffer=LogOptions.scribe_buffer(),
-                                 category=LogOptions.scribe_category(),
-                                 host=LogOptions.scribe_host(),
-                                 port=LogOptions.scribe_port())
+  if LogOptions.scribe_async():
+    scribe_handler = AsyncScribeHandler(category=LogOptions.scribe_category(),
+                                        host=LogOptions.scribe_host(),
+                                        port=LogOptions.scribe_port())
+  else:
+    scribe_handler = ScribeHandler(buffer=LogOptions.scribe_buffer(),
+                                   category=LogOptions.scribe_category(),
+                                   host=LogOptions.scribe_host(),
+                                   port=LogOptions.scribe_port())
   scribe_handler.setFormatter(formatter)
   scribe_handler.addFilter(filter)
   return [scribe_handler]
@@ -215,6 +237,8 @@ def teardown_disk_logging():
   global _DISK_LOGGERS
   for handler in _DISK_LOGGERS:
     root_logger.removeHandler(handler)
+    if isinstance(handler, AsyncHandler):
+      handler.close()
   _DISK_LOGGERS = []
 
 
@@ -223,6 +247,8 @@ def teardown_scribe_logging():
   global _SCRIBE_LOGGERS
   for handler in _SCRIBE_LOGGERS:
     root_logger.removeHandler(handler)
+    if isinstance(handler, AsyncScribeHandler):
+      handler.close()
   _SCRIBE_LOGGERS = []
 
 
@@ -239,6 +265,14 @@ _STDERR_LOGGERS = []
 _DISK_LOGGERS = []
 
 
+@atexit.register
+def _flush_async_loggers():
+  # Write out records still queued by asynchronous handlers before the interpreter exits.
+  for handler in _DISK_LOGGERS + _SCRIBE_LOGGERS:
+    if isinstance(handler, (AsyncHandler, AsyncScribeHandler)):
+      handler.flush()
+
+
 def init(filebase=None):
   """
     Sets up default stderr logging and, if filebase is supplied, sets up disk logging using:
@@ -264,7 +298,10 @@ def init(filebase=None):
   if filebase:
     _initialize_disk_logging()
     initializer = _setup_aggregated_disk_logging if LogOptions.simple() else _setup_disk_logging
-    for handler in initializer(filebase):
+    handlers = initializer(filebase)
+    if LogOptions.log_async():
+      handlers = _setup_async_disk_logging(handlers)
+    for handler in handlers:
       root_logger.addHandler(handler)
       _DISK_LOGGERS.append(handler)
 
@@ -36,6 +36,9 @@ _DEFAULT_LOG_OPTS = {
   _DISK_LOG_LEVEL_OPTION: 'INFO',
   'twitter_common_log_log_dir': '/var/tmp',
   'twitter_common_log_simple': False,
+  'twitter_common_log_async': False,
+  'twitter_common_log_async_overflow': 'block',
+  'twitter_common_log_scribe_async': False,
   'twitter_common_log_scribe_buffer': False,
   'twitter_common_log_scribe_host': 'localhost',
   'twitter_common_log_scribe_log_level': 'NONE',
@@ -90,6 +93,9 @@ class LogOptions(object):
   _DISK_LOG_SCHEME = None
   _LOG_DIR = None
   _SIMPLE = None
+  _ASYNC = None
+  _ASYNC_OVERFLOW = None
+  _SCRIBE_ASYNC = None
   _SCRIBE_BUFFER = None
   _SCRIBE_HOST = None
   _SCRIBE_LOG_LEVEL = None
@@ -207,6 +213,23 @@ class LogOptions(object):
       LogOptions._SCRIBE_BUFFER = app.get_options().twitter_common_log_scribe_buffer
     return LogOptions._SCRIBE_BUFFER
 
+  @staticmethod
+  def set_scribe_async(async_enabled):
+    """
+      Send scribe messages from a background thread rather than the logging thread. Must be
+      called before log.init() for changes to take effect.
+    """
+    LogOptions._SCRIBE_ASYNC = async_enabled
+
+  @staticmethod
+  def scribe_async():
+    """
+      Get the current async setting for scribe logging.
+    """
+    if LogOptions._SCRIBE_ASYNC is None:
+      LogOptions._SCRIBE_ASYNC = app.get_options().twitter_common_log_scribe_async
+    return LogOptions._SCRIBE_ASYNC
+
   @staticmethod
   def set_scribe_host(host):
     """
@@ -342,6 +365,42 @@ class LogOptions(object):
       LogOptions._SIMPLE = app.get_options().twitter_common_log_simple
     return LogOptions._SIMPLE
 
+  @staticmethod
+  def set_log_async(value):
+    """
+      Enable/disable writing disk logs from a background thread.  Must be called before
+      log.init().
+    """
+    LogOptions._ASYNC = bool(value)
+
+  @staticmethod
+  def log_async():
+    """
+      Whether or not disk logs should be written from a background thread.
+    """
+    if LogOptions._ASYNC is None:
+      LogOptions._ASYNC = app.get_options().twitter_common_log_async
+    return LogOptions._ASYNC
+
+  @staticmethod
+  def set_log_async_overflow(policy):
+    """
+      Set what happens to disk log records when the background writer falls behind: 'block'
+      waits for room in the queue, 'drop' discards the record.  Must be called before log.init().
+    """
+    if policy not in ('block', 'drop'):
+      raise LogOptionsException('Unknown async overflow policy: %s' % policy)
+    LogOptions._ASYNC_OVERFLOW = policy
+
+  @staticmethod
+  def log_async_overflow():
+    """
+      Get the current overflow policy for asynchronous disk logging.
+    """
+    if LogOptions._ASYNC_OVERFLOW is None:
+      LogOptions._ASYNC_OVERFLOW = app.get_options().twitter_common_log_async_overflow
+    return LogOptions._ASYNC_OVERFLOW
+
   @staticmethod
   def _disk_options_callback(option, opt, value, parser):
     try:
@@ -437,6 +496,21 @@ if HAVE_APP:
                  help='Write a single log file rather than one log file per log level '
                       '[default: %default].')
 
+  app.add_option('--log_async',
+                 default=_DEFAULT_LOG_OPTS['twitter_common_log_async'],
+                 action='store_true',
+                 dest='twitter_common_log_async',
+                 help='Format and write log files from a background thread rather than the '
+                      'logging thread [default: %default].')
+
+  app.add_option('--log_async_overflow',
+                 type='choice',
+                 choices=['block', 'drop'],
+                 default=_DEFAULT_LOG_OPTS['twitter_common_log_async_overflow'],
+                 dest='twitter_common_log_async_overflow',
+                 help='With --log_async, whether logging blocks or drops records when the '
+                      'background writer falls behind [default: %default].')
+
   app.add_option('--log_to_scribe',
               callback=LogOptions._scribe_options_callback,
               default=_DEFAULT_LOG_OPTS['twitter_common_log_scribe_log_level'],
@@ -459,6 +533,13 @@ if HAVE_APP:
               dest='twitter_common_log_scribe_buffer',
               help="Buffer messages when scribe is unavailable rather than dropping them. [default: %default].")
 
+  app.add_option('--scribe_async',
+              action='store_true',
+              default=_DEFAULT_LOG_OPTS['twitter_common_log_scribe_async'],
+              dest='twitter_common_log_scribe_async',
+              help="Send messages to scribe in batches from a background thread over a persistent "
+                   "connection, dropping the oldest when too many are queued. [default: %default].")
+
   app.add_option('--scribe_host',
               type='string',
               default=_DEFAULT_LOG_OPTS['twitter_common_log_scribe_host'],
@@ -30,15 +30,37 @@ class Line(object):
     """parses a line and returns Line if successfully parsed, ValueError/None otherwise."""
     raise NotImplementedError
 
+  @classmethod
+  def try_parse(cls, line):
+    """parses a line and returns Line if successfully parsed, None otherwise."""
+    try:
+      return cls.parse(line)
+    except ValueError:
+      return None
+
+  @classmethod
+  def peek(cls, line):
+    """returns (level, timestamp key, source) if line would parse, None otherwise.
+       Implementations avoid building the Line, so that lines can be filtered before they are
+       parsed."""
+    parsed = cls.try_parse(line)
+    return None if parsed is None else (parsed.level, parsed.datetime, parsed.source)
+
+  @classmethod
+  def timestamp_key(cls, dt):
+    """returns the timestamp key that peek would return for a line at datetime dt, or None if
+       timestamp keys cannot be compared with dt.  Keys order as their datetimes do, except
+       that they may be truncated to a coarser resolution."""
+    return dt
+
   @staticmethod
   def parse_order(line, *line_parsers):
     """Given a text line and any number of Line implementations, return the first that matches
        or None if no lines match."""
     for parser in line_parsers:
-      try:
-        return parser.parse(line)
-      except ValueError:
-        continue
+      parsed = parser.try_parse(line)
+      if parsed is not None:
+        return parsed
 
   def __init__(self, raw, level, dt, pid, source, message):
     (self.raw, self.level, self.datetime, self.pid, self.source, self.message) = (
@@ -68,6 +90,21 @@ class Line(object):
     return self.raw
 
 
+# Two-digit timestamp fields are looked up rather than converted with int(), which is much slower.
+_TWO_DIGITS = dict(('%02d' % k, k) for k in range(100))
+
+
+def _valid_hour(year, month, day, hour):
+  """Returns (year, month, day, hour) if it is a valid hour, otherwise None."""
+  if None in (year, month, day, hour):
+    return None
+  try:
+    datetime(year, month, day, hour)
+  except ValueError:
+    return None
+  return year, month, day, hour
+
+
 class GlogLine(Line):
   LEVEL_MAP = {
     'I': Level.INFO,
@@ -77,23 +114,95 @@ class GlogLine(Line):
     'D': Level.DEBUG
   }
 
+  # Lmmdd hh:mm:ss.uuuuuu pid file:line] msg
+  #
+  # The text of the timestamp of the last line parsed up to the hour, and its (year, month, day,
+  # hour), since consecutive lines almost always share it.
+  _last_hour = (None, None)
+
+  @classmethod
+  def _hour(cls, prefix):
+    # mmdd hh
+    hour = _valid_hour(int(_CURRENT_YEAR), _TWO_DIGITS.get(prefix[0:2]),
+        _TWO_DIGITS.get(prefix[2:4]), _TWO_DIGITS.get(prefix[5:7]))
+    cls._last_hour = (prefix, hour)
+    return hour
+
   @classmethod
   def split_time(cls, line):
-    if len(line) == 0:
-      raise ValueError
-    if line[0] not in 'IWEFD':
-      raise ValueError
-    sline = line[1:].split(' ')
-    if len(sline) < 2:
-      raise ValueError
-    t = datetime.strptime(''.join([_CURRENT_YEAR, sline[0], ' ', sline[1]]), '%Y%m%d %H:%M:%S.%f')
-    return cls.LEVEL_MAP[line[0]], t, sline[2:]
+    parsed = cls.try_parse(line)
+    if parsed is None:
+      raise ValueError('Not a glog line: %r' % line)
+    return parsed.level, parsed.datetime, line[line.index(' ', 15) + 1:].split(' ')
+
+  @classmethod
+  def _header(cls, line):
+    """Validates the header of a glog line.  Returns (level, (year, month, day, hour), minute,
+       second, fraction, rest) or None, where fraction is the text of the fractional seconds and
+       rest is [pid, source(, message)].  Like strptime's %f, between 1 and 6 digits of
+       fractional seconds are accepted."""
+    if len(line) < 18:
+      return None
+    level = cls.LEVEL_MAP.get(line[0])
+    if level is None:
+      return None
+    if line[5] != ' ' or line[8] != ':' or line[11] != ':' or line[14] != '.':
+      return None
+    # Only search for the end of the fractional seconds if they are not the usual 6 digits.
+    end, fraction = 21, line[15:21]
+    if line[21:22] != ' ' or not fraction.isdigit():
+      end = line.find(' ', 15, 21)
+      fraction = line[15:end]
+      if end < 16 or not fraction.isdigit():
+        return None
+    prefix = line[1:8]
+    last_prefix, hour = cls._last_hour
+    if prefix != last_prefix:
+      hour = cls._hour(prefix)
+    minute, second = _TWO_DIGITS.get(line[9:11]), _TWO_DIGITS.get(line[12:14])
+    if hour is None or minute is None or second is None or minute > 59 or second > 59:
+      return None
+    rest = line[end + 1:].split(' ', 2)
+    if len(rest) < 2:
+      return None
+    return level, hour, minute, second, fraction, rest
+
+  @classmethod
+  def try_parse(cls, line):
+    header = cls._header(line)
+    if header is None:
+      return None
+    level, (year, month, day, hour), minute, second, fraction, rest = header
+    if len(fraction) != 6:
+      fraction = fraction.ljust(6, '0')
+    t = datetime(year, month, day, hour, minute, second, int(fraction))
+    return cls(line, level, t, rest[0], rest[1], rest[2] if len(rest) > 2 else '')
 
   @classmethod
   def parse(cls, line):
-    level, dt, rest = cls.split_time(line)
-    pid, source, message = rest[0], rest[1], ' '.join(rest[2:])
-    return cls(line, level, dt, pid, source, message)
+    parsed = cls.try_parse(line)
+    if parsed is None:
+      raise ValueError('Not a glog line: %r' % line)
+    return parsed
+
+  @classmethod
+  def peek(cls, line):
+    # The key is the 'mmdd hh:mm:ss.uuuuuu' text.
+    header = cls._header(line)
+    if header is None:
+      return None
+    level, _, _, _, fraction, rest = header
+    if len(fraction) != 6:
+      return level, line[1:15] + fraction.ljust(6, '0'), rest[1]
+    return level, line[1:21], rest[1]
+
+  @classmethod
+  def timestamp_key(cls, dt):
+    # glog lines do not record the year.
+    if dt.year != int(_CURRENT_YEAR):
+      return None
+    return '%02d%02d %02d:%02d:%02d.%06d' % (
+        dt.month, dt.day, dt.hour, dt.minute, dt.second, dt.microsecond)
 
 
 class ZooLine(Line):
@@ -105,14 +214,83 @@ class ZooLine(Line):
     "ZOO_DEBUG": Level.DEBUG
   }
 
+  # YYYY-mm-dd HH:MM:SS,sss:pid:LEVEL@source:msg
+  _last_hour = (None, None)
+
   @classmethod
-  def parse(cls, line):
-    sline = line.split(':')
-    if len(sline) < 6:
-      raise ValueError
-    t = datetime.strptime(':'.join(sline[0:3]), '%Y-%m-%d %H:%M:%S,%f')
-    pid = sline[3]
-    ssource = sline[4].split('@')
+  def _hour(cls, prefix):
+    # YYYY-mm-dd HH
+    year = prefix[0:4]
+    hour = _valid_hour(int(year) if year.isdigit() else None, _TWO_DIGITS.get(prefix[5:7]),
+        _TWO_DIGITS.get(prefix[8:10]), _TWO_DIGITS.get(prefix[11:13]))
+    cls._last_hour = (prefix, hour)
+    return hour
+
+  @classmethod
+  def _header(cls, line):
+    """Validates the header of a zookeeper line.  Returns ((year, month, day, hour), minute,
+       second, fraction, rest) or None, where fraction is the text of the fractional seconds and
+       rest is [pid, level@source, message].  Like strptime's %f, between 1 and 6 digits of
+       fractional seconds are accepted."""
+    if len(line) < 22:
+      return None
+    if (line[4] != '-' or line[7] != '-' or line[10] != ' ' or line[13] != ':' or
+        line[16] != ':' or line[19] != ','):
+      return None
+    # Only search for the end of the fractional seconds if they are not the usual 3 digits.
+    end, fraction = 23, line[20:23]
+    if line[23:24] != ':' or not fraction.isdigit():
+      end = line.find(':', 20, 27)
+      fraction = line[20:end]
+      if end < 21 or not fraction.isdigit():
+        return None
+    prefix = line[0:13]
+    last_prefix, hour = cls._last_hour
+    if prefix != last_prefix:
+      hour = cls._hour(prefix)
+    minute, second = _TWO_DIGITS.get(line[14:16]), _TWO_DIGITS.get(line[17:19])
+    if hour is None or minute is None or second is None or minute > 59 or second > 59:
+      return None
+    rest = line[end + 1:].split(':', 2)
+    if len(rest) < 3:
+      return None
+    return hour, minute, second, fraction, rest
+
+  @classmethod
+  def try_parse(cls, line):
+    header = cls._header(line)
+    if header is None:
+      return None
+    (year, month, day, hour), minute, second, fraction, (pid, ssource, message) = header
+    if len(fraction) == 3:
+      microsecond = int(fraction) * 1000
+    else:
+      microsecond = int(fraction.ljust(6, '0'))
+    t = datetime(year, month, day, hour, minute, second, microsecond)
+    ssource = ssource.split('@', 1)
     level = cls.LEVEL_MAP.get(ssource[0], 0)
-    source = '@'.join(ssource[1:])
-    return cls(line, level, t, pid, source, ':'.join(sline[5:]))
+    source = ssource[1] if len(ssource) > 1 else ''
+    return cls(line, level, t, pid, source, message)
+
+  @classmethod
+  def parse(cls, line):
+    parsed = cls.try_parse(line)
+    if parsed is None:
+      raise ValueError('Not a zookeeper line: %r' % line)
+    return parsed
+
+  @classmethod
+  def peek(cls, line):
+    # The key is the 'YYYY-mm-dd HH:MM:SS,sss' text.
+    header = cls._header(line)
+    if header is None:
+      return None
+    _, _, _, fraction, (_, ssource, _) = header
+    ssource = ssource.split('@', 1)
+    key = line[0:23] if len(fraction) == 3 else line[0:20] + fraction.ljust(3, '0')[:3]
+    return cls.LEVEL_MAP.get(ssource[0], 0), key, ssource[1] if len(ssource) > 1 else ''
+
+  @classmethod
+  def timestamp_key(cls, dt):
+    return '%04d-%02d-%02d %02d:%02d:%02d,%03d' % (
+        dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second, dt.microsecond // 1000)
@@ -1,7 +1,9 @@
 from collections import deque
 from datetime import datetime, timedelta
 import errno
+import heapq
 from io import BytesIO, FileIO
+import itertools
 import os
 
 from twitter.common.lang import Compatibility
@@ -60,6 +62,89 @@ class Buffer(object):
       self._tail = flattened[-1]
 
 
+class TimeIndex(object):
+  """
+    A sparse index from time to file offset over a log file whose lines are in time order.
+
+    The index is built lazily: to find a time, the file is binary searched by sampling the first
+    parseable line at or after a byte offset, and the samples are kept so that later searches of
+    the same file reuse them.  A search reads O(log(size / block_size)) samples and leaves at most
+    block_size bytes to be scanned linearly.
+  """
+
+  DEFAULT_BLOCK_SIZE = 64 * 1024
+  SAMPLE_CHUNKSIZE = 16 * 1024
+
+  def __init__(self, filename_or_filelike, parsers, block_size=DEFAULT_BLOCK_SIZE):
+    """
+      Given a seekable filelike-object (or filename) and a set of Line-derived parsers, index the
+      file by time in samples about block_size bytes apart.  Searching moves the position of
+      the filelike.
+    """
+    self._fp = Buffer.maybe_filelike(filename_or_filelike)
+    self._parsers = parsers
+    self._block_size = block_size
+    self._samples = {}
+
+  def _size(self):
+    self._fp.seek(0, os.SEEK_END)
+    return self._fp.tell()
+
+  def sample(self, offset):
+    """
+      Returns (line offset, datetime) of the first parseable line starting at or after offset, or
+      None if there is none.
+    """
+    if offset not in self._samples:
+      self._samples[offset] = self._sample(offset)
+    return self._samples[offset]
+
+  def _sample(self, offset):
+    self._fp.seek(offset)
+    data, position = '', offset
+    if offset > 0:
+      # Discard the remainder of the line that offset falls within, unless offset is a line start.
+      self._fp.seek(offset - 1)
+      data, position = self._fp.read(self.SAMPLE_CHUNKSIZE), offset - 1
+      newline = data.find('\n')
+      while newline == -1:
+        chunk = self._fp.read(self.SAMPLE_CHUNKSIZE)
+        if not chunk:
+          return None
+        position += len(data)
+        data, newline = chunk, chunk.find('\n')
+      data, position = data[newline + 1:], position + newline + 1
+    while True:
+      newline = data.find('\n')
+      if newline == -1:
+        chunk = self._fp.read(self.SAMPLE_CHUNKSIZE)
+        if chunk:
+          data += chunk
+          continue
+        newline = len(data)
+        if newline == 0:
+          return None
+      line = Line.parse_order(data[:newline], *self._parsers)
+      if line is not None:
+        return position, line.datetime
+      data, position = data[newline + 1:], position + newline + 1
+
+  def find(self, dt):
+    """
+      Returns an offset of a line start at or before the first line with time at or after dt,
+      within about block_size bytes of it.
+    """
+    low, high = 0, self._size()
+    while high - low > self._block_size:
+      middle = (low + high) // 2
+      sample = self.sample(middle)
+      if sample is None or sample[1] >= dt:
+        high = middle
+      else:
+        low = sample[0]
+    return low
+
+
 class Stream(object):
   class EOF(object): pass
 
@@ -74,6 +159,26 @@ class Stream(object):
     self._tail = []
     self._infinite = infinite
     self._parsers = parsers
+    self._start = self._end = None
+
+  @classmethod
+  def between(cls, filename_or_filelike, parsers, start=None, end=None, infinite=False,
+              index=None):
+    """
+      Construct a Stream over a seekable log file that starts at the first line at or after the
+      datetime start and stops before the first line at or after the datetime end.  Either bound
+      may be None.  The start is found by binary search of the file using a TimeIndex, which
+      may be supplied as index to reuse its samples across queries of the same file.
+    """
+    fp = Buffer.maybe_filelike(filename_or_filelike)
+    offset = 0
+    if start is not None:
+      index = index or TimeIndex(fp, parsers)
+      offset = index.find(start)
+    fp.seek(offset)
+    stream = cls(fp, parsers, infinite=infinite)
+    stream._start, stream._end = start, end
+    return stream
 
   def _full_head(self):
     return self._head.extend(self._tail) if self._tail else self._head
@@ -90,6 +195,21 @@ class Stream(object):
         return self.EOF
 
   def next(self):
+    if self._start is None and self._end is None:
+      return self._next()
+    while True:
+      line = self._next()
+      if line is None or line is self.EOF:
+        return line
+      if self._end is not None and line.datetime >= self._end:
+        self._start = self._end = None
+        self._buffer, self._infinite = Buffer(BytesIO()), False
+        self._head, self._tail = None, []
+        return self.EOF
+      if self._start is None or line.datetime >= self._start:
+        return line
+
+  def _next(self):
     while True:
       line = self._buffer.next()
       if line is None:
@@ -109,34 +229,36 @@ class Stream(object):
 class StreamMuxer(object):
   """
     Multiplexes a set of streams into a single stream.
+
+    Stream heads are kept in a heap ordered by time, so emitting a line costs O(log k) for k
+    streams.  Only the stream whose line was last emitted, and streams that had no data
+    available (when following), are polled for new lines.
   """
   def __init__(self, streams):
     """
       Takes a set of (stream, label) pairs.
     """
-    streams = list(streams)
     self._labels = dict(streams)
-    self._refresh = set(stream for (stream, _) in streams)
-    self._heads = set()
+    self._refresh = list(self._labels)
+    # Heap of (datetime, sequence, line, stream).  The sequence number breaks ties between lines
+    # with the same timestamp in the order they were collected, so lines are never compared.
+    self._heads = []
+    self._sequence = itertools.count()
 
   def _collect(self):
-    discard = set()
+    pending = []
     for stream in self._refresh:
       line = stream.next()
-      if line is Stream.EOF:
-        discard.add(stream)
-      elif line is not None:
-        discard.add(stream)
-        self._heads.add((line, stream))
-    self._refresh -= discard
+      if line is None:
+        pending.append(stream)
+      elif line is not Stream.EOF:
+        heapq.heappush(self._heads, (line.datetime, next(self._sequence), line, stream))
+    self._refresh = pending
 
   def _pop(self):
-    try:
-      minimum = min(self._heads)
-      self._heads.discard(minimum)
-      return minimum
-    except ValueError:
-      pass
+    if self._heads:
+      _, _, line, stream = heapq.heappop(self._heads)
+      return line, stream
 
   def next(self):
     """
@@ -149,5 +271,5 @@ class StreamMuxer(object):
     minimum = self._pop()
     if minimum:
       line, stream = minimum
-      self._refresh.add(stream)
+      self._refresh.append(stream)
       return (self._labels[stream], line)
@@ -0,0 +1,202 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+"""Filtered search of many log files in parallel.
+
+Each file is searched in a multiprocessing worker.  Lines are grouped into entries (a first
+line and its continuation lines) and the filters are checked against the level, timestamp text
+and source returned by Line.peek and against the raw text of the entry, so that only matching
+entries are parsed into Lines.  Log files written by several threads are often slightly out of
+time order, so each file is searched from slack before the start of the time range to slack past
+its end.  The matches of all files are merged in time order:
+
+  log_filter = LogFilter(level=Level.WARNING, start=datetime(2013, 3, 1, 12),
+                         end=datetime(2013, 3, 1, 13), pattern='Timeout')
+  for filename, line in search(glob.glob('/var/log/myservice/*.INFO.*'), log_filter=log_filter):
+    print('%s: %s' % (filename, line))
+"""
+
+from datetime import timedelta
+import heapq
+import multiprocessing
+import re
+
+from .parsers import GlogLine, ZooLine
+from .reader import TimeIndex
+
+
+class SearchError(Exception): pass
+
+
+DEFAULT_SLACK = timedelta(seconds=5)
+
+
+class LogFilter(object):
+  """
+    A conjunction of filters on log entries.  Instances must be picklable, since they are sent
+    to the search workers.
+  """
+
+  def __init__(self, level=None, start=None, end=None, source=None, pattern=None):
+    """
+      level: The minimum Level of matching entries.
+      start, end: Entries must be at or after the datetime start and before the datetime end.
+      source: A regular expression searched for in the source (e.g. 'file.py:42]') of entries.
+      pattern: A regular expression searched for in the raw text of entries, including their
+               continuation lines.
+    """
+    self.level = level
+    self.start = start
+    self.end = end
+    self.source = re.compile(source) if source is not None else None
+    self.pattern = re.compile(pattern, re.MULTILINE) if pattern is not None else None
+
+  def keys(self, parser):
+    """
+      Returns the (start, end) timestamp keys of parser to check entries against before parsing,
+      either of which may be None.
+    """
+    return (parser.timestamp_key(self.start) if self.start is not None else None,
+            parser.timestamp_key(self.end) if self.end is not None else None)
+
+  def accepts_raw(self, level, source, raw):
+    """
+      Returns True if the entry with level, source and raw text matches, apart from its time.
+    """
+    if self.level is not None and level < self.level:
+      return False
+    if self.source is not None and not self.source.search(source):
+      return False
+    if self.pattern is not None and not self.pattern.search(raw):
+      return False
+    return True
+
+  def accepts_time(self, line):
+    """
+      Returns True if the parsed Line is within the time range.
+    """
+    if self.start is not None and line.datetime < self.start:
+      return False
+    if self.end is not None and line.datetime >= self.end:
+      return False
+    return True
+
+  def accepts(self, line):
+    """
+      Returns True if the parsed Line matches.
+    """
+    return self.accepts_raw(line.level, line.source, line.raw) and self.accepts_time(line)
+
+
+def _entries(fp, parsers):
+  """
+    Generate (parser, (level, key, source), raw lines) for the entries of fp, dropping
+    continuation lines that precede the first entry, as Stream does.
+  """
+  entry = None
+  for raw in fp:
+    if raw.endswith('\n'):
+      raw = raw[:-1]
+    for parser in parsers:
+      peeked = parser.peek(raw)
+      if peeked is not None:
+        if entry is not None:
+          yield entry
+        entry = (parser, peeked, [raw])
+        break
+    else:
+      if entry is not None:
+        entry[2].append(raw)
+  if entry is not None:
+    yield entry
+
+
+def _search_file(args):
+  """
+    Search filename in a worker.  Returns (matching Lines in file order, error message or None.)
+  """
+  filename, parsers, log_filter, slack = args
+  keys = dict((parser, log_filter.keys(parser)) for parser in parsers)
+  stop_keys = dict((parser, parser.timestamp_key(log_filter.end + slack)
+                    if log_filter.end is not None else None) for parser in parsers)
+  lines = []
+  try:
+    with open(filename, 'rb') as fp:
+      if log_filter.start is not None:
+        fp.seek(TimeIndex(fp, parsers).find(log_filter.start - slack))
+      for parser, (level, key, source), raws in _entries(fp, parsers):
+        stop_key = stop_keys[parser]
+        if stop_key is not None and key > stop_key:
+          # Files are in time order give or take slack, so no later entry can match.
+          break
+        start_key, end_key = keys[parser]
+        if start_key is not None and key < start_key:
+          continue
+        if end_key is not None and key > end_key:
+          continue
+        if not log_filter.accepts_raw(level, source, '\n'.join(raws)):
+          continue
+        line = parser.try_parse(raws[0])
+        if line is None:
+          # peek accepted a line that the parser rejects.
+          continue
+        if len(raws) > 1:
+          line = line.extend(raws[1:])
+        if log_filter.accepts_time(line):
+          lines.append(line)
+  except (IOError, OSError) as e:
+    return None, str(e)
+  return lines, None
+
+
+def search(filenames, parsers=(GlogLine, ZooLine), log_filter=None, processes=None, pool=None,
+           slack=DEFAULT_SLACK):
+  """
+    Search the time-ordered log files filenames for entries parsed by parsers that match the
+    LogFilter log_filter, in a multiprocessing pool of processes workers (default: the number of
+    CPUs.)  A pool may be supplied to reuse it across searches.
+
+    Entries out of time order by up to the timedelta slack are found; entries further out of
+    order than that may be missed at the edges of the time range.
+
+    Returns a list of (filename, Line) pairs in time order.  Entries with the same time are
+    ordered by the position of their file in filenames.
+
+    May raise:
+      SearchError if any file cannot be read
+  """
+  filenames = list(filenames)
+  if not filenames:
+    return []
+  log_filter = log_filter or LogFilter()
+  work = [(filename, tuple(parsers), log_filter, slack) for filename in filenames]
+  own_pool = pool is None
+  pool = pool or multiprocessing.Pool(processes)
+  try:
+    results = pool.map(_search_file, work)
+  finally:
+    if own_pool:
+      pool.terminate()
+      pool.join()
+
+  streams = []
+  for index, (filename, (lines, error)) in enumerate(zip(filenames, results)):
+    if error:
+      raise SearchError('Failed to search %s: %s' % (filename, error))
+    # Sorted, since files may be slightly out of time order.
+    streams.append(sorted((line.datetime, index, sequence, filename, line)
+                          for sequence, line in enumerate(lines)))
+  return [(filename, line) for _, _, _, filename, line in heapq.merge(*streams)]
@@ -14,7 +14,9 @@
 # limitations under the License.
 # ==================================================================================================
 
+from collections import deque
 from contextlib import contextmanager
+import json
 import os
 import sys
 import threading
@@ -24,11 +26,38 @@ import time
 __all__ = ('Tracer',)
 
 
+def format_message(msg, args=()):
+  """
+    Resolve a lazy message: msg % args if args are supplied, otherwise msg() if msg is callable,
+    otherwise msg itself.
+  """
+  if args:
+    return msg % args
+  elif callable(msg):
+    return msg()
+  return msg
+
+
+class _NullContext(object):
+  """A context manager that does nothing, for blocks that are not traced."""
+  def __enter__(self):
+    return None
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    return False
+
+
+_NULL_CONTEXT = _NullContext()
+
+
 class Trace(object):
-  __slots__ = ('msg', 'verbosity', 'parent', 'children', '_clock', '_start', '_stop')
-  def __init__(self, msg, parent=None, verbosity=1, clock=time):
-    self.msg = msg
+  __slots__ = ('_msg', '_args', 'verbosity', 'parent', 'children', 'thread', '_clock', '_start',
+               '_stop')
+  def __init__(self, msg, parent=None, verbosity=1, clock=time, args=(), thread=None):
+    self._msg = msg
+    self._args = args
     self.verbosity = verbosity
+    self.thread = thread
     self.parent = parent
     if parent is not None:
       parent.children.append(self)
@@ -44,6 +73,33 @@ class Trace(object):
     assert self._stop is not None
     return self._stop - self._start
 
+  @property
+  def msg(self):
+    """The message of this trace, formatted the first time it is needed."""
+    if self._args or callable(self._msg):
+      self._msg, self._args = format_message(self._msg, self._args), ()
+    return self._msg
+
+  def chrome_trace_events(self, pid=None, tid=None):
+    """
+      Return this completed trace and its descendants as a list of Chrome trace-event "complete"
+      events, as loaded by chrome://tracing.  Times are in microseconds.
+    """
+    pid = os.getpid() if pid is None else pid
+    tid = self.thread if tid is None else tid
+    events = [{
+      'name': self.msg,
+      'ph': 'X',
+      'ts': self._start * 1e6,
+      'dur': self.duration() * 1e6,
+      'pid': pid,
+      'tid': tid,
+      'args': {'V': self.verbosity},
+    }]
+    for child in self.children:
+      events.extend(child.chrome_trace_events(pid=pid, tid=tid))
+    return events
+
 
 class Tracer(object):
   """
@@ -59,7 +115,7 @@ class Tracer(object):
       return verbosity <= env_verbosity
     return predicate
 
-  def __init__(self, predicate=None, output=sys.stderr, clock=time):
+  def __init__(self, predicate=None, output=sys.stderr, clock=time, keep_traces=0):
     """
       If predicate specified, it should take a "verbosity" integer and determine whether
       or not to log, e.g.
@@ -71,6 +127,9 @@ class Tracer(object):
             return False
 
       output defaults to sys.stderr, but can take any file-like object.
+
+      If keep_traces is nonzero, the most recent keep_traces completed top-level traces are
+      kept, for export with write_chrome_trace.
     """
     self._predicate = predicate or (lambda verbosity: True)
     self._length = None
@@ -79,13 +138,23 @@ class Tracer(object):
     self._lock = threading.RLock()
     self._local = threading.local()
     self._clock = clock
+    self._traces = deque(maxlen=keep_traces) if keep_traces else None
 
   def should_log(self, V):
     return self._predicate(V)
 
-  def log(self, msg, V=0, end='\n'):
+  def log(self, msg, *args, **kw):
+    """
+      Log msg if verbosity V (default 0) should be logged.  The message may be lazy: a format
+      string with args, or a callable returning the message, so that it is only built if logged.
+      end (default newline) is written after the message.
+    """
+    V, end = kw.pop('V', 0), kw.pop('end', '\n')
+    if kw:
+      raise TypeError('Unexpected keyword arguments: %s' % ', '.join(kw))
     if not self.should_log(V):
       return
+    msg = format_message(msg, args)
     if not self._isatty and end == '\r':
       # force newlines if we're not a tty
       end = '\n'
@@ -112,26 +181,74 @@ class Tracer(object):
   def print_trace(self, indent=0, node=None):
     node = node or self._local.parent
     with self._lock:
-      self.log(' ' * indent + ('%s: %.1fms' % (node.msg, 1000.0 * node.duration())),
-               V=node.verbosity)
+      if self.should_log(node.verbosity):
+        self.log('%s%s: %.1fms', ' ' * indent, node.msg, 1000.0 * node.duration(),
+                 V=node.verbosity)
       for child in node.children:
         self.print_trace(indent=indent + 2, node=child)
 
+  def traces(self):
+    """
+      Return the kept completed top-level traces, oldest first.
+    """
+    with self._lock:
+      return list(self._traces or ())
+
+  def chrome_trace_events(self):
+    """
+      Return the kept completed traces as a list of Chrome trace-event dictionaries.
+    """
+    pid = os.getpid()
+    events = []
+    for trace in self.traces():
+      events.extend(trace.chrome_trace_events(pid=pid))
+    return events
+
+  def write_chrome_trace(self, fp):
+    """
+      Write the kept completed traces to the file-like fp in the Chrome trace-event JSON format,
+      which can be loaded into chrome://tracing for a flame view.
+    """
+    json.dump({'traceEvents': self.chrome_trace_events(), 'displayTimeUnit': 'ms'}, fp)
+
+  def timed(self, msg, *args, **kw):
+    """
+      Time the enclosed block as a trace with verbosity V (default 0), nested in the trace of any
+      enclosing timed block of the same thread.  As for log, the message may be lazy, in which
+      case it is only built if the trace is printed or exported.
+
+      If V should not be logged and traces are not kept, the block is not traced at all, and
+      any traces within it are nested in the enclosing trace instead.
+    """
+    V = kw.pop('V', 0)
+    if kw:
+      raise TypeError('Unexpected keyword arguments: %s' % ', '.join(kw))
+    if self._traces is None and not self.should_log(V):
+      return _NULL_CONTEXT
+    return self._timed(msg, args, V)
+
   @contextmanager
-  def timed(self, msg, V=0):
-    if getattr(self._local, 'parent', None) is None:
-      self._local.parent = Trace(msg, verbosity=V, clock=self._clock)
+  def _timed(self, msg, args, V):
+    parent = getattr(self._local, 'parent', None)
+    if parent is None:
+      self._local.parent = Trace(msg, verbosity=V, clock=self._clock, args=args,
+                                 thread=threading.current_thread().ident)
     else:
-      parent = self._local.parent
-      self._local.parent = Trace(msg, parent=parent, verbosity=V, clock=self._clock)
+      self._local.parent = Trace(msg, parent=parent, verbosity=V, clock=self._clock, args=args)
     self.print_trace_snippet()
-    yield
-    self._local.parent.stop()
-    if self._local.parent.parent is not None:
-      self._local.parent = self._local.parent.parent
-    else:
-      self.print_trace()
-      self._local.parent = None
+    try:
+      yield
+    finally:
+      trace = self._local.parent
+      trace.stop()
+      if trace.parent is not None:
+        self._local.parent = trace.parent
+      else:
+        self.print_trace()
+        if self._traces is not None:
+          with self._lock:
+            self._traces.append(trace)
+        self._local.parent = None
 
 
 def main(args):
@@ -17,6 +17,9 @@
 __author__ = 'Brian Wickman'
 
 from .gauge import *
-from .rate import Rate
+from .histogram import Histogram
+from .history import MetricHistory
+from .rate import LoadAverage, Rate
 from .metrics import RootMetrics
 from .sampler import MetricSampler
+from .timer import Timer
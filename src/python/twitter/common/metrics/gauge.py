@@ -137,3 +137,69 @@ class AtomicGauge(NamedGauge, MutableGauge):
       Decrement metric and return updated metric.
     """
     return self.add(-1)
+
+
+class StripedAtomicGauge(NamedGauge):
+  """
+    A counter with the same interface as AtomicGauge that does not take a shared lock on
+    add, increment or decrement.
+
+    Each writing thread updates its own cell, and read() sums the cells.  Cells belonging
+    to threads that have exited are folded into a base value on read.  Since computing the
+    total requires visiting every cell, add/increment/decrement do not return the updated
+    value; use read() instead.
+  """
+  def __init__(self, name, initial_value=0):
+    if not isinstance(initial_value, Compatibility.integer):
+      raise TypeError('StripedAtomicGauge must be initialized with an integer.')
+    import threading
+    NamedGauge.__init__(self, name)
+    self._base = initial_value
+    self._cells = []  # list of (weakref to owning thread, cell)
+    self._cells_lock = threading.Lock()
+    self._local = threading.local()
+
+  def _new_cell(self):
+    import threading, weakref
+    cell = self._local.cell = [0]
+    with self._cells_lock:
+      self._cells.append((weakref.ref(threading.current_thread()), cell))
+    return cell
+
+  def read(self):
+    with self._cells_lock:
+      live_cells, total = [], self._base
+      for thread_ref, cell in self._cells:
+        thread = thread_ref()
+        if thread is None or not thread.is_alive():
+          self._base += cell[0]
+        else:
+          live_cells.append((thread_ref, cell))
+        total += cell[0]
+      self._cells = live_cells
+      return total
+
+  def add(self, delta):
+    """
+      Add delta to metric.
+    """
+    if not isinstance(delta, Compatibility.integer):
+      raise TypeError('StripedAtomicGauge.add must be called with an integer.')
+    try:
+      cell = self._local.cell
+    except AttributeError:
+      cell = self._new_cell()
+    # Only the owning thread writes to its cell, so this needs no lock.
+    cell[0] += delta
+
+  def increment(self):
+    """
+      Increment metric.
+    """
+    self.add(1)
+
+  def decrement(self):
+    """
+      Decrement metric.
+    """
+    self.add(-1)
@@ -0,0 +1,143 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import math
+import threading
+
+from twitter.common.lang import Compatibility
+from .metrics import MetricProvider
+
+
+class Histogram(MetricProvider):
+  """
+    A named, bounded-memory quantile sketch.
+
+    Values are counted into logarithmically sized buckets, so recording is O(1) and the
+    memory footprint is fixed at construction time regardless of how many values are
+    recorded.  Percentiles are accurate to within the configured relative precision.
+
+    When registered with a Metrics registry, a histogram named 'latency' exports:
+      latency.count, latency.max, latency.p50, latency.p90, latency.p99, latency.p999
+  """
+
+  DEFAULT_PERCENTILES = (50, 90, 99, 99.9)
+
+  @staticmethod
+  def percentile_name(percentile):
+    """
+      Return the exported name of a percentile, e.g. 50 => 'p50', 99.9 => 'p999'.
+    """
+    return 'p' + ('%g' % percentile).replace('.', '')
+
+  def __init__(self, name, percentiles=DEFAULT_PERCENTILES, precision=0.01, lowest=1e-3,
+               highest=1e9):
+    """
+      Create a histogram.
+
+        name: The base name of the exported metrics.
+        percentiles: The percentiles (in the range (0, 100]) to export.
+        precision: The relative error tolerated on exported percentiles (default 1%.)
+        lowest: Values at or below this value are counted in the lowest bucket.
+        highest: Values at or above this value are counted in the highest bucket.
+    """
+    if not isinstance(name, Compatibility.string):
+      raise TypeError('Histogram must be named by a string, got %s' % type(name))
+    if not 0 < precision < 1:
+      raise ValueError('Histogram precision must be in the range (0, 1), got %s' % precision)
+    if not 0 < lowest < highest:
+      raise ValueError('Histogram bounds must satisfy 0 < lowest < highest.')
+    for percentile in percentiles:
+      if not 0 < percentile <= 100:
+        raise ValueError('Percentiles must be in the range (0, 100], got %s' % percentile)
+    self._name = name
+    self._percentiles = sorted(percentiles)
+    self._percentile_names = [self.percentile_name(pct) for pct in self._percentiles]
+    self._lowest = float(lowest)
+    self._gamma = (1 + precision) / (1 - precision)
+    self._inv_log_gamma = 1.0 / math.log(self._gamma)
+    self._nbuckets = int(math.ceil(math.log(highest / self._lowest) * self._inv_log_gamma)) + 2
+    self._lock = threading.Lock()
+    self.clear()
+
+  def name(self):
+    return self._name
+
+  def clear(self):
+    """
+      Discard all recorded values.
+    """
+    with self._lock:
+      self._buckets = [0] * self._nbuckets
+      self._count = 0
+      self._max = None
+
+  def _bucket(self, value):
+    if value <= self._lowest:
+      return 0
+    return min(int(math.log(value / self._lowest) * self._inv_log_gamma) + 1, self._nbuckets - 1)
+
+  def _bucket_value(self, index):
+    # Buckets cover [lowest * gamma^(i-1), lowest * gamma^i); the midpoint of that range is within
+    # the requested relative precision of every value in the bucket.
+    if index == 0:
+      return self._lowest
+    return self._lowest * self._gamma ** (index - 1) * 2 * self._gamma / (1 + self._gamma)
+
+  def add(self, value):
+    """
+      Record a value into the histogram.
+    """
+    if not isinstance(value, Compatibility.numeric):
+      raise TypeError('Histogram.add must be called with a number.')
+    index = self._bucket(value)
+    with self._lock:
+      self._buckets[index] += 1
+      self._count += 1
+      if self._max is None or value > self._max:
+        self._max = value
+
+  def count(self):
+    return self._count
+
+  def percentiles(self):
+    """
+      Returns a list of (percentile, value) pairs, or an empty list if no values were recorded.
+    """
+    with self._lock:
+      buckets, count, maximum = list(self._buckets), self._count, self._max
+    if count == 0:
+      return []
+    results = []
+    seen, index = 0, 0
+    for percentile in self._percentiles:
+      threshold = int(math.ceil(count * percentile / 100.0))
+      while seen < threshold:
+        seen += buckets[index]
+        index += 1
+      results.append((percentile, min(self._bucket_value(index - 1), maximum)))
+    return results
+
+  def sample(self, sample_prefix=''):
+    with self._lock:
+      count, maximum = self._count, self._max
+    samples = {
+      sample_prefix + 'count': count,
+      sample_prefix + 'max': maximum if maximum is not None else 0,
+    }
+    values = dict(self.percentiles())
+    for percentile, name in zip(self._percentiles, self._percentile_names):
+      samples[sample_prefix + name] = values.get(percentile, 0)
+    return samples
@@ -0,0 +1,84 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+from array import array
+import threading
+
+from twitter.common.lang import Compatibility
+
+
+class MetricHistory(object):
+  """
+    Bounded history of the numeric values of a series of samples.
+
+    The last N sample timestamps are kept in a single ring buffer, and the values of each
+    numeric metric in a parallel ring buffer of doubles, so memory is bounded by
+    N * (number of numeric metrics) doubles.  Non-numeric values are not recorded.
+  """
+
+  def __init__(self, samples):
+    if not isinstance(samples, Compatibility.integer) or samples <= 0:
+      raise ValueError('MetricHistory must retain a positive number of samples.')
+    self._capacity = samples
+    self._timestamps = array('d', [0.0] * samples)
+    self._values = {}  # metric name => array('d') parallel to self._timestamps
+    self._next = 0     # index of the next slot to be written
+    self._count = 0    # number of valid slots
+    self._lock = threading.Lock()
+
+  def capacity(self):
+    return self._capacity
+
+  def record(self, timestamp, sample):
+    """
+      Record a sample (dictionary of metric name => value) taken at timestamp.
+    """
+    nan = float('nan')
+    with self._lock:
+      slot = self._next
+      self._timestamps[slot] = timestamp
+      for values in self._values.values():
+        values[slot] = nan
+      for name, value in sample.items():
+        if not isinstance(value, Compatibility.numeric):
+          continue
+        values = self._values.get(name)
+        if values is None:
+          values = self._values[name] = array('d', [nan] * self._capacity)
+        values[slot] = value
+      self._next = (slot + 1) % self._capacity
+      self._count = min(self._count + 1, self._capacity)
+
+  def names(self):
+    """
+      Return the names of the metrics for which history is available.
+    """
+    with self._lock:
+      return list(self._values)
+
+  def get(self, name):
+    """
+      Return the recorded (timestamp, value) pairs for the metric, oldest first, or None if
+      the metric has no history.  Samples where the metric was absent are omitted.
+    """
+    with self._lock:
+      values = self._values.get(name)
+      if values is None:
+        return None
+      start = (self._next - self._count) % self._capacity
+      slots = [(start + offset) % self._capacity for offset in range(self._count)]
+      return [(self._timestamps[slot], values[slot]) for slot in slots
+              if values[slot] == values[slot]]  # filter NaNs
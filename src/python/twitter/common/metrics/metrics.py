@@ -20,6 +20,7 @@ from .gauge import (
   Gauge,
   MutatorGauge,
   NamedGauge,
+  namable,
   namablegauge)
 
 
@@ -41,7 +42,8 @@ class MetricRegistry(object):
 
   def register(self, gauge):
     """
-      Register a gauge (mapper from name => sample) with this registry.
+      Register a gauge (mapper from name => sample) or a named MetricProvider (mapper from
+      name => samples prefixed by name) with this registry.
     """
     raise NotImplementedError
 
@@ -55,10 +57,18 @@ class MetricRegistry(object):
 class Metrics(MetricRegistry, MetricProvider):
   """
     Metric collector.
+
+    Each registry keeps a flattened list of the fully-qualified names of the gauges and
+    providers registered with it and its child scopes, so that sampling does not need to walk
+    the scope tree.  The list is rebuilt only after a register or scope call.
   """
 
   class Error(Exception): pass
 
+  # Values of these types are exported as-is and do not need to be coerced.
+  _PRIMITIVE_TYPES = frozenset(Compatibility.string + (bool, float, int, type(None)) +
+                               ((long,) if Compatibility.PY2 else ()))
+
   @classmethod
   def coerce_value(cls, value):
     if isinstance(value, Compatibility.numeric + Compatibility.string + (bool,)):
@@ -74,34 +84,85 @@ class Metrics(MetricRegistry, MetricProvider):
 
   def __init__(self):
     self._metrics = {}
+    self._providers = {}
     self._children = {}
+    self._parent = None
+    self._generation = 0
+    self._flattened = None  # (generation, [(name, gauge)], [(prefix, provider)])
+
+  def _invalidate(self):
+    self._generation += 1
+    if self._parent is not None:
+      self._parent._invalidate()
+
+  def _flatten(self):
+    """
+      Return the lists of (fully-qualified name, gauge) and (fully-qualified prefix, provider)
+      pairs exported by this registry, rebuilding them if the registry has changed.
+    """
+    flattened = self._flattened
+    if flattened is not None and flattened[0] == self._generation:
+      return flattened[1], flattened[2]
+    # Record the generation before walking, so a concurrent registration forces a rebuild.
+    generation = self._generation
+    gauges = list(self._metrics.items())
+    providers = [(name + '.', provider) for name, provider in self._providers.items()]
+    for scope_name, child in list(self._children.items()):
+      child_gauges, child_providers = child._flatten()
+      gauges.extend((scope_name + '.' + name, gauge) for name, gauge in child_gauges)
+      providers.extend((scope_name + '.' + prefix, provider)
+                       for prefix, provider in child_providers)
+    self._flattened = (generation, gauges, providers)
+    return gauges, providers
 
   def scope(self, name):
     if not isinstance(name, Compatibility.string):
       raise TypeError('Scope names must be strings, got: %s' % type(name))
     if name not in self._children:
-      self._children[name] = Metrics()
+      child = Metrics()
+      child._parent = self
+      self._children[name] = child
+      self._invalidate()
     return self._children[name]
 
   def register(self, gauge):
     if isinstance(gauge, Compatibility.string):
       gauge = MutatorGauge(gauge)
+    if isinstance(gauge, MetricProvider) and namable(gauge):
+      self._providers[gauge.name()] = gauge
+      self._invalidate()
+      return gauge
     if not isinstance(gauge, NamedGauge) and not namablegauge(gauge):
       raise Metrics.Error('Must register either a string or a Gauge-like object! Got %s' % gauge)
     self._metrics[gauge.name()] = gauge
+    self._invalidate()
     return gauge
 
-  def sample(self, sample_prefix=''):
+  def sample(self, sample_prefix='', changed_since=None):
+    """
+      Sample all gauges and providers in this registry and its child scopes.
+
+      If changed_since is supplied, it should be a previous sample from this registry, and
+      only the samples whose values differ from it are returned.
+    """
+    gauges, providers = self._flatten()
+    primitive_types, coerce_value = self._PRIMITIVE_TYPES, self.coerce_value
     samples = {}
-    for name, metric in self._metrics.items():
+    for name, metric in gauges:
       try:
-        samples[sample_prefix + name] = self.coerce_value(metric.read())
+        value = metric.read()
       except ValueError as e:
         # TODO(wickman) Provide error logger to be passed in.
         continue
-    for scope_name in self._children:
-      samples.update(self.scope(scope_name)
-                         .sample(sample_prefix=sample_prefix + scope_name + '.'))
+      samples[name] = value if type(value) in primitive_types else coerce_value(value)
+    for prefix, provider in providers:
+      samples.update(provider.sample(sample_prefix=prefix))
+    if sample_prefix:
+      samples = dict((sample_prefix + name, value) for name, value in samples.items())
+    if changed_since is not None:
+      missing = object()
+      samples = dict((name, value) for name, value in samples.items()
+                     if changed_since.get(name, missing) != value)
     return samples
 
 
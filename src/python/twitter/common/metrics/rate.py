@@ -14,15 +14,21 @@
 # limitations under the License.
 # ==================================================================================================
 
+from collections import deque
+import math
+import threading
 import time
 
 from twitter.common.quantity import Amount, Time
 from .gauge import NamedGauge, gaugelike, namablegauge
+from .metrics import MetricProvider
 
 class Rate(NamedGauge):
   """
     Gauge that computes a windowed rate.
   """
+  DEFAULT_MAX_SAMPLES = 1024
+
   @staticmethod
   def of(gauge, name = None, window = None, clock = None):
     kw = {}
@@ -37,17 +43,21 @@ class Rate(NamedGauge):
         raise TypeError('Rate.of must take a namable Gauge-like object if no name specified!')
       return Rate(gauge.name(), gauge, **kw)
 
-  def __init__(self, name, gauge, window = Amount(1, Time.SECONDS), clock = time):
+  def __init__(self, name, gauge, window = Amount(1, Time.SECONDS), clock = time,
+               max_samples = DEFAULT_MAX_SAMPLES):
     """
       Create a gauge using name as a base for a <name>_per_<window> sampling gauge.
 
         name: The base name of the gauge.
         gauge: The gauge to sample
         window: The window over which the samples should be measured (default 1 second.)
+        max_samples: The maximum number of samples retained within the window.  If the rate
+                     is read more often than this within a single window, the oldest samples
+                     are evicted and the rate is measured over a correspondingly shorter span.
     """
     self._clock = clock
     self._gauge = gauge
-    self._samples = []
+    self._samples = deque(maxlen = max_samples)  # (timestamp, value), oldest first
     self._window = window
     NamedGauge.__init__(self, '%s_per_%s%s' % (name, window.amount(), window.unit()))
 
@@ -57,16 +67,98 @@ class Rate(NamedGauge):
     """
     if newer_than is None:
       newer_than = self._clock.time() - self._window.as_(Time.SECONDS)
-    self._samples = [sample for sample in self._samples if sample[0] >= newer_than]
+    samples = self._samples
+    while samples and samples[0][0] < newer_than:
+      samples.popleft()
 
   def read(self):
     now = self._clock.time()
     self.filter(now - self._window.as_(Time.SECONDS))
     new_sample = self._gauge.read()
-    self._samples.insert(0, (now, new_sample))
+    self._samples.append((now, new_sample))
     if len(self._samples) == 1:
       return 0
-    last_sample = self._samples[-1]
+    last_sample = self._samples[0]
     dy = new_sample - last_sample[1]
     dt = now - last_sample[0]
     return 0 if dt == 0 else dy / dt
+
+
+class LoadAverage(MetricProvider):
+  """
+    Computes exponentially-weighted moving averages of the per-second rate of a gauge over
+    several windows, in the manner of Unix load averages.
+
+    Each sample costs constant time regardless of the window lengths.  When registered with
+    a Metrics registry, a LoadAverage of the gauge 'requests' exports:
+      requests_load.1mins, requests_load.5mins, requests_load.15mins
+  """
+  DEFAULT_WINDOWS = (
+    Amount(1, Time.MINUTES),
+    Amount(5, Time.MINUTES),
+    Amount(15, Time.MINUTES)
+  )
+
+  @staticmethod
+  def of(gauge, name = None, windows = None, clock = None):
+    kw = {}
+    if windows: kw.update(windows = windows)
+    if clock: kw.update(clock = clock)
+    if name:
+      if not gaugelike(gauge):
+        raise TypeError('LoadAverage.of must take a Gauge-like object!  Got %s' % type(gauge))
+      return LoadAverage(name, gauge, **kw)
+    else:
+      if not namablegauge(gauge):
+        raise TypeError(
+            'LoadAverage.of must take a namable Gauge-like object if no name specified!')
+      return LoadAverage(gauge.name(), gauge, **kw)
+
+  def __init__(self, name, gauge, windows = DEFAULT_WINDOWS, clock = time):
+    """
+      Create a provider using name as a base for <name>_load.<window> averages.
+
+        name: The base name of the averages.
+        gauge: The gauge to sample
+        windows: The time constants of the moving averages (default 1, 5 and 15 minutes.)
+    """
+    if not windows:
+      raise ValueError('LoadAverage requires at least one window.')
+    self._name = '%s_load' % name
+    self._gauge = gauge
+    self._clock = clock
+    self._windows = [(window.as_(Time.SECONDS), '%s%s' % (window.amount(), window.unit()))
+                     for window in windows]
+    self._averages = [0.0] * len(self._windows)
+    self._last_sample = None  # (timestamp, value)
+    self._lock = threading.Lock()
+
+  def name(self):
+    return self._name
+
+  def update(self):
+    """
+      Sample the underlying gauge and fold its rate since the last update into the averages.
+    """
+    with self._lock:
+      now, value = self._clock.time(), self._gauge.read()
+      if self._last_sample is not None:
+        dt = now - self._last_sample[0]
+        if dt <= 0:
+          return
+        rate = float(value - self._last_sample[1]) / dt
+        for index, (window, _) in enumerate(self._windows):
+          alpha = 1.0 - math.exp(-dt / window)
+          self._averages[index] += alpha * (rate - self._averages[index])
+      self._last_sample = (now, value)
+
+  def averages(self):
+    """
+      Return the current averages as a list of (window name, average) pairs.
+    """
+    with self._lock:
+      return [(name, average) for ((_, name), average) in zip(self._windows, self._averages)]
+
+  def sample(self, sample_prefix=''):
+    self.update()
+    return dict((sample_prefix + name, average) for (name, average) in self.averages())
@@ -27,12 +27,15 @@ except ImportError:
 class MetricSampler(threading.Thread, MetricProvider):
   """
     A thread that periodically samples from a MetricProvider and caches the
-    samples.
+    samples.  If a MetricHistory is supplied, every sample is also recorded into it.
   """
-  def __init__(self, metric_registry, period = Amount(1, Time.SECONDS)):
+  def __init__(self, metric_registry, period = Amount(1, Time.SECONDS), history = None):
     self._registry = metric_registry
     self._period = period
+    self._history = history
     self._last_sample = self._registry.sample()
+    if self._history is not None:
+      self._history.record(time.time(), self._last_sample)
     self._lock = threading.Lock()
     threading.Thread.__init__(self)
     self.daemon = True
@@ -41,10 +44,24 @@ class MetricSampler(threading.Thread, MetricProvider):
     with self._lock:
       return self._last_sample
 
+  def history(self):
+    """
+      Return the MetricHistory associated with this sampler, or None.
+    """
+    return self._history
+
+  def sample_once(self):
+    """
+      Take a sample of the registry, recording it in the history if there is one.
+    """
+    new_sample = self._registry.sample()
+    if self._history is not None:
+      self._history.record(time.time(), new_sample)
+    with self._lock:
+      self._last_sample = new_sample
+
   def run(self):
     if log: log.debug('Starting metric sampler.')
     while True:
       time.sleep(self._period.as_(Time.SECONDS))
-      new_sample = self._registry.sample()
-      with self._lock:
-        self._last_sample = new_sample
+      self.sample_once()
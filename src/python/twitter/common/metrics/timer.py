@@ -0,0 +1,141 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+from functools import wraps
+import threading
+import time
+
+from .histogram import Histogram
+from .metrics import MetricProvider
+
+
+# Prefer a monotonic high-resolution clock where the interpreter provides one.  Python 2 has
+# neither, so the fallback is time.time, which can step backwards with the system clock.
+_DEFAULT_CLOCK = (getattr(time, 'perf_counter', None) or getattr(time, 'monotonic', None) or
+                  time.time)
+
+
+class Timer(MetricProvider):
+  """
+    Times blocks of code, either as a context manager:
+
+      timer = RootMetrics().register(Timer('fetch_ms'))
+      with timer:
+        fetch()
+
+    or as a decorator:
+
+      @timer
+      def fetch():
+        ...
+
+    Durations are recorded in milliseconds.  When registered with a Metrics registry, a
+    timer named 'fetch_ms' exports fetch_ms.total, plus the count, max and percentiles of
+    its Histogram (fetch_ms.count, fetch_ms.max, fetch_ms.p50, ...)
+
+    Setting enabled to False stops all timing; entering and exiting a disabled timer does not
+    read the clock.  A block is timed only if enabled is left unchanged from its entry to its
+    exit.
+
+    On Python 2 the default clock is time.time, which is not monotonic: durations that span a
+    backwards step of the system clock are recorded as 0.
+  """
+
+  def __init__(self, name, percentiles=Histogram.DEFAULT_PERCENTILES, clock=_DEFAULT_CLOCK,
+               enabled=True):
+    """
+      Create a timer.
+
+        name: The base name of the exported metrics.
+        percentiles: The latency percentiles to export.
+        clock: A function returning the current time in seconds (default: the most precise
+               monotonic clock available.)
+        enabled: Whether or not the timer is initially enabled.
+    """
+    self._histogram = Histogram(name, percentiles=percentiles)
+    self._clock = clock
+    self._total = 0.0
+    self._lock = threading.Lock()
+    self._local = threading.local()
+    self._epoch = 0
+    self._enabled = bool(enabled)
+
+  @property
+  def enabled(self):
+    return self._enabled
+
+  @enabled.setter
+  def enabled(self, value):
+    # Every toggle starts a new epoch, so that blocks which straddle it can be recognized.
+    self._epoch += 1
+    self._enabled = bool(value)
+
+  def name(self):
+    return self._histogram.name()
+
+  def add(self, duration_ms):
+    """
+      Record a duration, in milliseconds.
+    """
+    self._histogram.add(duration_ms)
+    with self._lock:
+      self._total += duration_ms
+
+  def total(self):
+    return self._total
+
+  def _record(self, start):
+    self.add(1000.0 * max(0.0, self._clock() - start))
+
+  def __enter__(self):
+    if not self._enabled:
+      return self
+    try:
+      starts = self._local.starts
+    except AttributeError:
+      starts = self._local.starts = []
+    epoch = self._epoch
+    if starts and starts[-1][0] != epoch:
+      # Left behind by blocks that straddled a toggle; they will never be timed.
+      del starts[:]
+    starts.append((epoch, self._clock()))
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    if not self._enabled:
+      return
+    starts = getattr(self._local, 'starts', None)
+    # Blocks entered in an earlier epoch (or while disabled) have no start of this epoch on top
+    # of the stack, and are not timed.
+    if starts and starts[-1][0] == self._epoch:
+      self._record(starts.pop()[1])
+
+  def __call__(self, fn):
+    @wraps(fn)
+    def timed(*args, **kw):
+      if not self._enabled:
+        return fn(*args, **kw)
+      start = self._clock()
+      try:
+        return fn(*args, **kw)
+      finally:
+        self._record(start)
+    return timed
+
+  def sample(self, sample_prefix=''):
+    samples = self._histogram.sample(sample_prefix=sample_prefix)
+    samples[sample_prefix + 'total'] = self._total
+    return samples
@@ -144,7 +144,7 @@ class Crawler(CrawlerBase):
     return links, rel_links
 
   def execute(self, url):
-    with TRACER.timed('Crawling %s' % url):
+    with TRACER.timed('Crawling %s', url):
       parsed_url = urlparse(url)
       if parsed_url.scheme in ('', 'file'):
         return self._local_execute(parsed_url.path)
@@ -196,7 +196,7 @@ class CachedWeb(object):
   def open(self, url, ttl=None, conn_timeout=None):
     """Return a file-like object with the content of the url."""
     expired = self.expired(url, ttl=ttl)
-    with TRACER.timed('Opening %s' % ('(cached)' if not expired else ''), V=1):
+    with TRACER.timed('Opening %s', '(cached)' if not expired else '', V=1):
       if expired:
         try:
           self.cache(url, conn_timeout=conn_timeout)
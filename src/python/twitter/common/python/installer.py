@@ -88,7 +88,7 @@ exec(compile(open(__file__).read().replace('\\r\\n', '\\n'), __file__, 'exec'))
       'setuptools_path': setuptools_path or '',
       'setup_py': 'setup.py'
     }
-    with TRACER.timed('Installing %s' % self._install_tmp, V=2):
+    with TRACER.timed('Installing %s', self._install_tmp, V=2):
       po = subprocess.Popen(
         [sys.executable,
           '-',
@@ -57,11 +57,11 @@ class Obtainer(object):
       yield link
 
   def obtain(self, req):
-    with TRACER.timed('Obtaining %s' % req):
+    with TRACER.timed('Obtaining %s', req):
       links = list(self.iter(req))
-      TRACER.log('Got ordered links:\n\t%s' % '\n\t'.join(map(str, links)), V=2)
+      TRACER.log(lambda: 'Got ordered links:\n\t%s' % '\n\t'.join(map(str, links)), V=2)
       for link in links:
         dist = self._translator.translate(link)
         if dist:
-          TRACER.log('Picked %s -> %s' % (link, dist), V=2)
+          TRACER.log('Picked %s -> %s', link, dist, V=2)
           return dist
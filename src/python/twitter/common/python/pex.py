@@ -83,13 +83,13 @@ class PEX(object):
     site_distributions = OrderedSet()
     for path_element in sys.path:
       if any(path_element.startswith(site_lib) for site_lib in site_libs):
-        TRACER.log('Inspecting path element: %s' % path_element)
+        TRACER.log('Inspecting path element: %s', path_element)
         site_distributions.update(dist.location for dist in find_distributions(path_element))
     user_site_distributions = OrderedSet(dist.location for dist in find_distributions(USER_SITE))
     for path in site_distributions:
-      TRACER.log('Scrubbing from site-packages: %s' % path)
+      TRACER.log('Scrubbing from site-packages: %s', path)
     for path in user_site_distributions:
-      TRACER.log('Scrubbing from user site: %s' % path)
+      TRACER.log('Scrubbing from user site: %s', path)
     scrub_paths = site_distributions | user_site_distributions
     scrubbed_sys_path = list(OrderedSet(sys.path) - scrub_paths)
     scrub_from_importer_cache = filter(
@@ -106,7 +106,7 @@ class PEX(object):
       self._env.activate()
       if 'PEX_COVERAGE' in os.environ:
         PEX.start_coverage()
-      TRACER.log('PYTHONPATH now %s' % ':'.join(sys.path))
+      TRACER.log(lambda: 'PYTHONPATH now %s' % ':'.join(sys.path))
       force_interpreter = 'PEX_INTERPRETER' in os.environ
       if entry_point and not force_interpreter:
         self.execute_entry(entry_point, args)
@@ -207,7 +207,7 @@ class PEXEnvironment(Environment):
 
     def activate(self):
       if not self._activated:
-        with TRACER.timed('Activating cache %s' % self._path):
+        with TRACER.timed('Activating cache %s', self._path):
           for dist in find_distributions(self._path):
             if self._env.can_add(dist):
               self._env.add(dist)
@@ -241,7 +241,7 @@ class PEXEnvironment(Environment):
     reqs = maybe_requirement_list(requirements)
     resolved = OrderedSet()
     for req in reqs:
-      with TRACER.timed('Resolved %s' % req):
+      with TRACER.timed('Resolved %s', req):
         try:
           distributions = self._ws.resolve([req], env=self)
         except DistributionNotFound as e:
@@ -281,7 +281,7 @@ class PEXEnvironment(Environment):
     all_reqs = [Requirement.parse(req) for req, _, _ in self._pex_info.requirements]
 
     for req in all_reqs:
-      with TRACER.timed('Resolved %s' % str(req)):
+      with TRACER.timed('Resolved %s', req):
         try:
           resolved = self._ws.resolve([req], env=self)
         except DistributionNotFound as e:
@@ -290,7 +290,7 @@ class PEXEnvironment(Environment):
             raise
           continue
       for dist in resolved:
-        with TRACER.timed('  Activated %s' % dist):
+        with TRACER.timed('  Activated %s', dist):
           if os.environ.get('PEX_FORCE_LOCAL', not self._really_zipsafe(dist)):
             with TRACER.timed('    Locally caching'):
               new_dist = DistributionHelper.maybe_locally_cache(dist, self._pex_info.install_cache)
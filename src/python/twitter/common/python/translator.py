@@ -77,9 +77,9 @@ class SourceTranslator(TranslatorBase):
     unpack_path, installer = None, None
     try:
       unpack_path = link.fetch(conn_timeout=self._conn_timeout)
-      with TRACER.timed('Installing %s' % link.name):
+      with TRACER.timed('Installing %s', link.name):
         installer = Installer(unpack_path, strict=(link.name != 'distribute'))
-      with TRACER.timed('Distilling %s' % link.name):
+      with TRACER.timed('Distilling %s', link.name):
         try:
           dist = installer.distribution()
         except Installer.InstallFailure:
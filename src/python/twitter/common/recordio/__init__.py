@@ -17,8 +17,26 @@
 __author__ = 'Brian Wickman'
 
 from .recordio import *
+from .block import BlockRecordIO, BlockRecordReader, BlockRecordWriter
+from .checksum import ChecksummedRecordIO, ChecksummedRecordReader, ChecksummedRecordWriter
+from .group_commit import GroupCommitWriter
+from .index import IndexedRecordReader, IndexedRecordWriter, RecordIndex
+from .mmap_reader import MmapRecordReader
+from .parallel import ParallelRecordReader
 
 __all__ = [
+  'BlockRecordIO',
+  'BlockRecordReader',
+  'BlockRecordWriter',
+  'ChecksummedRecordIO',
+  'ChecksummedRecordReader',
+  'ChecksummedRecordWriter',
+  'GroupCommitWriter',
+  'IndexedRecordReader',
+  'IndexedRecordWriter',
+  'MmapRecordReader',
+  'ParallelRecordReader',
+  'RecordIndex',
   'RecordIO',
   'RecordWriter',
   'RecordReader',
@@ -26,6 +44,6 @@ __all__ = [
 
 try:
   from .thrift_recordio import *
-  __all__ += [ 'ThriftRecordReader', 'ThriftRecordWriter' ]
+  __all__ += [ 'ParallelThriftRecordReader', 'ThriftRecordReader', 'ThriftRecordWriter' ]
 except ImportError:
   pass
@@ -0,0 +1,366 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+"""Block-compressed RecordIO streams.
+
+A block-compressed stream is a sequence of blocks, each holding many records.  A block consists
+of a header:
+
+  magic (4 bytes) | compression (1 byte) | record count (4 bytes) |
+  uncompressed length (4 bytes) | compressed length (4 bytes)
+
+followed by the compressed concatenation of the block's records, each framed as in a plain
+RecordIO stream.  The compressed length in the header allows blocks to be skipped without
+decompressing them.
+
+Records are encoded with any RecordIO.Codec, e.g. ThriftRecordIO.ThriftCodec:
+
+  writer = BlockRecordWriter(fp, ThriftRecordIO.ThriftCodec(), compression='zlib', level=6)
+"""
+
+import bz2
+import struct
+import zlib
+
+from twitter.common import log
+
+from .recordio import RecordIO
+
+try:
+  import lzma
+except ImportError:
+  lzma = None
+
+
+class BlockRecordIO(object):
+  class UnknownCompression(RecordIO.Error): pass
+  class CorruptBlock(RecordIO.Error): pass
+
+  MAGIC = b'RIOB'
+  BLOCK_HEADER = struct.Struct('>4sBLLL')
+  DEFAULT_BLOCK_SIZE = 256 * 1024
+
+  # name => (identifier, default level, compress(data, level), decompress(data))
+  _COMPRESSIONS = {
+    'none': (0, None, lambda data, level: data, lambda data: data),
+    'zlib': (1, 6, zlib.compress, zlib.decompress),
+    'bz2': (2, 9, bz2.compress, bz2.decompress),
+  }
+  if lzma is not None:
+    _COMPRESSIONS['lzma'] = (3, 6, lambda data, level: lzma.compress(data, preset=level),
+                             lzma.decompress)
+  _DECOMPRESSORS = dict((identifier, decompress)
+                        for identifier, _, _, decompress in _COMPRESSIONS.values())
+
+  @staticmethod
+  def compressions():
+    """
+      Return the names of the compressions available in this interpreter.
+    """
+    return sorted(BlockRecordIO._COMPRESSIONS)
+
+  @staticmethod
+  def read_header(fp):
+    """
+      Read a block header from fp.
+
+      Returns (compression identifier, record count, uncompressed length, compressed length),
+      or None if no data is available.
+
+      May raise:
+        RecordIO.PrematureEndOfStream if the header is truncated
+        BlockRecordIO.CorruptBlock if the header is invalid
+    """
+    header = fp.read(BlockRecordIO.BLOCK_HEADER.size)
+    if len(header) == 0:
+      return None
+    elif len(header) != BlockRecordIO.BLOCK_HEADER.size:
+      raise RecordIO.PrematureEndOfStream(
+          "Expected %d bytes, got %d" % (BlockRecordIO.BLOCK_HEADER.size, len(header)))
+    magic, compression, count, uncompressed, compressed = BlockRecordIO.BLOCK_HEADER.unpack(
+        header)
+    if magic != BlockRecordIO.MAGIC:
+      raise BlockRecordIO.CorruptBlock('Bad block magic %r' % magic)
+    if compressed > RecordIO.MAXIMUM_RECORD_SIZE or uncompressed > RecordIO.MAXIMUM_RECORD_SIZE:
+      raise RecordIO.RecordSizeExceeded()
+    return compression, count, uncompressed, compressed
+
+  @staticmethod
+  def do_read_block(fp):
+    """
+      Read and decompress a single block from fp.
+
+      Returns the list of encoded records in the block, or None if no data is available.
+
+      May raise:
+        RecordIO.PrematureEndOfStream if the block is truncated
+        RecordIO.RecordSizeExceeded if the block exceeds RecordIO.MAXIMUM_RECORD_SIZE
+        BlockRecordIO.UnknownCompression if the block compression is not available
+        BlockRecordIO.CorruptBlock if the block cannot be decompressed
+    """
+    header = BlockRecordIO.read_header(fp)
+    if header is None:
+      return None
+    compression, count, uncompressed, compressed = header
+    payload = fp.read(compressed)
+    if len(payload) != compressed:
+      raise RecordIO.PrematureEndOfStream()
+    try:
+      decompress = BlockRecordIO._DECOMPRESSORS[compression]
+    except KeyError:
+      raise BlockRecordIO.UnknownCompression('Unknown block compression %d' % compression)
+    try:
+      payload = decompress(payload)
+    except Exception as e:
+      raise BlockRecordIO.CorruptBlock('Failed to decompress block: %s' % e)
+    if len(payload) != uncompressed:
+      raise BlockRecordIO.CorruptBlock('Expected %d uncompressed bytes, got %d' % (
+          uncompressed, len(payload)))
+    records = []
+    offset = 0
+    while offset < len(payload):
+      if offset + RecordIO.RECORD_HEADER_SIZE > len(payload):
+        raise BlockRecordIO.CorruptBlock('Truncated record header in block')
+      record_len = struct.unpack_from('>L', payload, offset)[0]
+      offset += RecordIO.RECORD_HEADER_SIZE
+      if offset + record_len > len(payload):
+        raise BlockRecordIO.CorruptBlock('Truncated record in block')
+      records.append(payload[offset:offset + record_len])
+      offset += record_len
+    if len(records) != count:
+      raise BlockRecordIO.CorruptBlock('Expected %d records in block, got %d' % (
+          count, len(records)))
+    return records
+
+
+class BlockRecordReader(RecordIO.Reader):
+  """
+    Read records from a block-compressed stream, decompressing one block at a time.
+  """
+
+  def __init__(self, fp, codec):
+    RecordIO.Reader.__init__(self, fp, codec)
+    self._records = []
+    self._next = 0
+
+  def __iter__(self):
+    """
+      Return an iterator over the entire contents of the underlying file handle.
+    """
+    try:
+      dup_fp = self._fp.dup()
+    except self._fp.Error:
+      log.error('Failed to dup %r' % self._fp)
+      return
+
+    try:
+      while True:
+        records = BlockRecordIO.do_read_block(dup_fp)
+        if records is None:
+          break
+        for record in records:
+          yield self._codec.decode(record)
+    except RecordIO.Error as e:
+      log.error('Caught exception in __iter__: %s' % e)
+      dup_fp.close()
+
+  def _fill(self):
+    records = BlockRecordIO.do_read_block(self._fp)
+    if records is None:
+      # Reset EOF (appears to be only necessary on OS X)
+      self._fp.seek(self._fp.tell())
+      return False
+    self._records, self._next = records, 0
+    return True
+
+  def read(self):
+    """
+      Read a single record from this stream, reading and decompressing the next block if the
+      current one is exhausted.
+
+      Returns the decoded record or None if no data available.
+
+      May raise:
+        RecordIO.PrematureEndOfStream if the stream is truncated in the middle of a block
+        RecordIO.RecordSizeExceeded if a block exceeds RecordIO.MAXIMUM_RECORD_SIZE
+        BlockRecordIO.UnknownCompression if the block compression is not available
+        BlockRecordIO.CorruptBlock if the block cannot be decompressed
+    """
+    while self._next >= len(self._records):
+      if not self._fill():
+        return None
+    record = self._records[self._next]
+    self._next += 1
+    return self._codec.decode(record)
+
+  def read_many(self, max_records=None, max_bytes=None):
+    """
+      Read up to max_records records from this stream, reading and decompressing at most one
+      block.  max_bytes is ignored, since blocks are always read whole.
+
+      Returns a list of records, which is empty if no data is available.
+    """
+    if max_records is not None and max_records <= 0:
+      return []
+    while self._next >= len(self._records):
+      if not self._fill():
+        return []
+    end = len(self._records)
+    if max_records is not None:
+      end = min(end, self._next + max_records)
+    records = [self._codec.decode(record) for record in self._records[self._next:end]]
+    self._next = end
+    return records
+
+  def try_read(self):
+    """
+      Attempt to read a single record from the stream.  Only updates the file position
+      if a block was read successfully.
+
+      Returns the decoded record or None if no data available.
+    """
+    pos = self._fp.tell()
+    try:
+      return self.read()
+    except RecordIO.PrematureEndOfStream as e:
+      log.debug('Got premature end of stream [%s], skipping - %s' % (self._fp.name, e))
+      self._fp.seek(pos)
+      return None
+
+  def skip_block(self):
+    """
+      Discard any records remaining in the current block, then skip over the next block
+      without decompressing it.
+
+      Returns the number of records skipped in the next block, or None if no data available.
+    """
+    self._records, self._next = [], 0
+    header = BlockRecordIO.read_header(self._fp)
+    if header is None:
+      return None
+    _, count, _, compressed = header
+    self._fp.seek(compressed, 1)
+    return count
+
+
+class BlockRecordWriter(RecordIO.Writer):
+  """
+    Write records to a block-compressed stream.
+
+    Records are buffered until block_size bytes of framed records are pending, then compressed
+    and written as a single block.  Records are not visible to readers until their block has
+    been written, so flush() must be called (or the writer closed) to write a partial block.
+  """
+
+  def __init__(self, fp, codec, compression='zlib', level=None,
+               block_size=BlockRecordIO.DEFAULT_BLOCK_SIZE, sync=False):
+    """
+      Initialize a BlockRecordWriter from the FileLike fp, with RecordIO.Codec codec.
+
+      compression is one of BlockRecordIO.compressions(), and level its compression level
+      (by default, 6 for zlib and lzma and 9 for bz2.)  If sync=True is supplied, each block
+      is fsynced after it is written.
+
+      May raise:
+        BlockRecordIO.UnknownCompression if the compression is not available
+    """
+    RecordIO.Writer.__init__(self, fp, codec, sync=sync)
+    try:
+      self._compression, default_level, self._compress, _ = (
+          BlockRecordIO._COMPRESSIONS[compression])
+    except KeyError:
+      raise BlockRecordIO.UnknownCompression('Unknown compression %r, choose from %s' % (
+          compression, ', '.join(BlockRecordIO.compressions())))
+    self._level = default_level if level is None else level
+    self._block_size = block_size
+    self._pending = []
+    self._pending_bytes = 0
+
+  def write(self, blob):
+    """
+      Append the blob to the current block, writing the block if it is full.  If the blob would
+      push the block past RecordIO.MAXIMUM_RECORD_SIZE, the pending records are written first.
+
+      Returns True on success, False on any filesystem failure.
+
+      May raise:
+        RecordIO.RecordSizeExceeded if the record alone exceeds RecordIO.MAXIMUM_RECORD_SIZE
+    """
+    blob = self._codec.encode(blob)
+    frame_bytes = RecordIO.RECORD_HEADER_SIZE + len(blob)
+    if frame_bytes > RecordIO.MAXIMUM_RECORD_SIZE:
+      raise RecordIO.RecordSizeExceeded('Record of %d bytes exceeds the maximum block size' %
+          len(blob))
+    if self._pending_bytes + frame_bytes > RecordIO.MAXIMUM_RECORD_SIZE and not self.flush():
+      return False
+    self._pending.append(struct.pack('>L', len(blob)))
+    self._pending.append(blob)
+    self._pending_bytes += frame_bytes
+    if self._pending_bytes >= self._block_size:
+      return self.flush()
+    return True
+
+  def write_many(self, blobs):
+    """
+      Append the blobs of an iterable to the current block, writing blocks as they fill.
+
+      Returns True on success, False on any filesystem failure.
+    """
+    for blob in blobs:
+      if not self.write(blob):
+        return False
+    return True
+
+  def flush(self):
+    """
+      Write the pending records, if any, as a block.
+
+      Returns True on success, False on any filesystem failure.
+
+      May raise:
+        RecordIO.RecordSizeExceeded if the block, compressed or not, would exceed
+          RecordIO.MAXIMUM_RECORD_SIZE.  The pending records are discarded, since readers
+          would reject the block.
+    """
+    if not self._pending:
+      return True
+    payload = b''.join(self._pending)
+    count = len(self._pending) // 2
+    self._pending, self._pending_bytes = [], 0
+    if len(payload) > RecordIO.MAXIMUM_RECORD_SIZE:
+      raise RecordIO.RecordSizeExceeded('Block of %d bytes exceeds the maximum block size' %
+          len(payload))
+    compressed = self._compress(payload, self._level)
+    if len(compressed) > RecordIO.MAXIMUM_RECORD_SIZE:
+      raise RecordIO.RecordSizeExceeded(
+          'Compressed block of %d bytes exceeds the maximum block size' % len(compressed))
+    header = BlockRecordIO.BLOCK_HEADER.pack(
+        BlockRecordIO.MAGIC, self._compression, count, len(payload), len(compressed))
+    try:
+      self._fp.write(header + compressed)
+    except (IOError, OSError) as e:
+      log.debug("Got exception in write(%s): %s" % (self._fp.name, e))
+      return False
+    if self._sync:
+      self._fp.flush()
+    return True
+
+  def close(self):
+    """
+      Write any pending records, then close the underlying filehandle.
+    """
+    self.flush()
+    RecordIO.Writer.close(self)
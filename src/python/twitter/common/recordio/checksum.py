@@ -0,0 +1,279 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+"""Checksummed RecordIO streams.
+
+A checksummed frame consists of a header:
+
+  magic (4 bytes) | length (4 bytes) | CRC32 of magic and length (4 bytes) |
+  CRC32 of payload (4 bytes)
+
+followed by the payload.  The header checksum is verified before the payload is read, so a
+corrupted length can never cause a large bogus read, and the magic allows a reader to
+resynchronize on the next intact frame after corruption or a torn write, by searching for the
+magic and checking candidate headers rather than decoding frame by frame.
+"""
+
+import struct
+import zlib
+
+from twitter.common import log
+
+from .recordio import RecordIO
+
+
+class ChecksummedRecordIO(object):
+  class CorruptFrame(RecordIO.Error): pass
+  class ChecksumMismatch(CorruptFrame): pass
+
+  MAGIC = b'\xd3RIO'
+  FRAME_HEADER = struct.Struct('>4sLLL')
+  RESYNC_CHUNK_SIZE = 64 * 1024
+
+  @staticmethod
+  def _crc32(data):
+    return zlib.crc32(data) & 0xffffffff
+
+  @staticmethod
+  def frame(blob):
+    """
+      Return the checksummed frame of the encoded blob.
+    """
+    prefix = struct.pack('>4sL', ChecksummedRecordIO.MAGIC, len(blob))
+    return prefix + struct.pack('>LL', ChecksummedRecordIO._crc32(prefix),
+        ChecksummedRecordIO._crc32(blob)) + blob
+
+  @staticmethod
+  def _parse_header(header):
+    """
+      Returns (length, payload CRC32) if header is an intact frame header, otherwise None.
+    """
+    magic, length, header_crc, payload_crc = ChecksummedRecordIO.FRAME_HEADER.unpack(header)
+    if magic != ChecksummedRecordIO.MAGIC or header_crc != ChecksummedRecordIO._crc32(header[:8]):
+      return None
+    return length, payload_crc
+
+  @staticmethod
+  def do_read(fp, decoder):
+    """
+      Read a single checksummed record from the given filehandle and decode using the supplied
+      decoder.
+
+      Returns the decoded record, or None if no data is available.
+
+      May raise:
+        RecordIO.PrematureEndOfStream if the stream is truncated in the middle of
+          an expected message
+        RecordIO.RecordSizeExceeded if the message exceeds RecordIO.MAXIMUM_RECORD_SIZE
+        ChecksummedRecordIO.CorruptFrame if the frame header is corrupt
+        ChecksummedRecordIO.ChecksumMismatch if the payload is corrupt
+    """
+    header = fp.read(ChecksummedRecordIO.FRAME_HEADER.size)
+    if len(header) == 0:
+      log.debug("%s has no data (current offset = %d)" % (fp.name, fp.tell()))
+      # Reset EOF (appears to be only necessary on OS X)
+      fp.seek(fp.tell())
+      return None
+    elif len(header) != ChecksummedRecordIO.FRAME_HEADER.size:
+      raise RecordIO.PrematureEndOfStream(
+          "Expected %d bytes, got %d" % (ChecksummedRecordIO.FRAME_HEADER.size, len(header)))
+    parsed = ChecksummedRecordIO._parse_header(header)
+    if parsed is None:
+      raise ChecksummedRecordIO.CorruptFrame('Corrupt frame header')
+    blob_len, payload_crc = parsed
+    if blob_len > RecordIO.MAXIMUM_RECORD_SIZE:
+      raise RecordIO.RecordSizeExceeded()
+    read_blob = fp.read(blob_len)
+    if len(read_blob) != blob_len:
+      raise RecordIO.PrematureEndOfStream()
+    if ChecksummedRecordIO._crc32(read_blob) != payload_crc:
+      raise ChecksummedRecordIO.ChecksumMismatch('Payload checksum mismatch')
+    return decoder.decode(read_blob)
+
+  @staticmethod
+  def resync(fp, offset):
+    """
+      Find the first intact frame header at or after offset, and seek fp to it.
+
+      Returns the offset of the frame, or None (leaving fp at the end of the stream) if no
+      intact frame header was found.
+    """
+    magic = ChecksummedRecordIO.MAGIC
+    header_size = ChecksummedRecordIO.FRAME_HEADER.size
+    fp.seek(offset)
+    buf, base, search = b'', offset, 0
+    while True:
+      index = buf.find(magic, search)
+      if index >= 0 and index + header_size <= len(buf):
+        if ChecksummedRecordIO._parse_header(buf[index:index + header_size]) is not None:
+          fp.seek(base + index)
+          return base + index
+        search = index + 1
+        continue
+      # Keep a candidate header that straddles the end of the buffer, or the last bytes of the
+      # buffer in case the magic straddles it.
+      keep = index if index >= 0 else max(search, len(buf) - len(magic) + 1)
+      buf, base, search = buf[keep:], base + keep, 0
+      chunk = fp.read(ChecksummedRecordIO.RESYNC_CHUNK_SIZE)
+      if not chunk:
+        return None
+      buf += chunk
+
+
+class ChecksummedRecordReader(RecordIO.Reader):
+  """
+    Read records from a checksummed stream.
+
+    Iterating over the reader skips corrupt regions of the stream, resuming at the next intact
+    frame.  read() raises on corruption, after which resync() skips to the next intact frame.
+  """
+
+  def __init__(self, fp, codec):
+    RecordIO.Reader.__init__(self, fp, codec)
+    self._frame_start = 0
+
+  def __iter__(self):
+    """
+      Return an iterator over the intact records of the entire contents of the underlying file
+      handle.
+    """
+    try:
+      dup_fp = self._fp.dup()
+    except self._fp.Error:
+      log.error('Failed to dup %r' % self._fp)
+      return
+
+    try:
+      while True:
+        offset = dup_fp.tell()
+        try:
+          blob = ChecksummedRecordIO.do_read(dup_fp, self._codec)
+        except ChecksummedRecordIO.CorruptFrame as e:
+          resumed = ChecksummedRecordIO.resync(dup_fp, offset + 1)
+          if resumed is None:
+            log.warning('%s at offset %d of %s, no intact frames follow' % (
+                e, offset, dup_fp.name))
+            break
+          log.warning('%s at offset %d of %s, skipped %d bytes' % (
+              e, offset, dup_fp.name, resumed - offset))
+          continue
+        if blob is None:
+          break
+        yield blob
+    except RecordIO.Error as e:
+      log.error('Caught exception in __iter__: %s' % e)
+    dup_fp.close()
+
+  def read(self):
+    """
+      Read a single record from this stream.  Updates the file position on both
+      success and failure (unless no data is available, in which case the file
+      position is unchanged and None is returned.)
+
+      Returns the decoded record or None if no data available.
+
+      May raise:
+        RecordIO.PrematureEndOfStream if the stream is truncated in the middle of
+          an expected message
+        RecordIO.RecordSizeExceeded if the message exceeds RecordIO.MAXIMUM_RECORD_SIZE
+        ChecksummedRecordIO.CorruptFrame if the frame header is corrupt
+        ChecksummedRecordIO.ChecksumMismatch if the payload is corrupt
+    """
+    self._frame_start = self._fp.tell()
+    return ChecksummedRecordIO.do_read(self._fp, self._codec)
+
+  def read_many(self, max_records=None, max_bytes=None):
+    """
+      Read up to max_records records, or about max_bytes (by default
+      RecordIO.DEFAULT_BATCH_BYTES) of frames, from this stream.  If a read fails after some
+      records have been read, those records are returned and the file position is left at the
+      start of the failed frame.
+
+      Returns a list of records, which is empty if no data is available.
+    """
+    records = []
+    start = self._fp.tell()
+    max_bytes = max_bytes or RecordIO.DEFAULT_BATCH_BYTES
+    while max_records is None or len(records) < max_records:
+      if self._fp.tell() - start >= max_bytes:
+        break
+      try:
+        record = self.read()
+      except RecordIO.Error:
+        if not records:
+          raise
+        self._fp.seek(self._frame_start)
+        break
+      if record is None:
+        break
+      records.append(record)
+    return records
+
+  def resync(self):
+    """
+      Skip to the first intact frame after the start of the frame last read.
+
+      Returns the offset of that frame, or None if no intact frame was found.
+    """
+    return ChecksummedRecordIO.resync(self._fp, self._frame_start + 1)
+
+
+class ChecksummedRecordWriter(RecordIO.Writer):
+  """
+    Write checksummed records to a stream.
+  """
+
+  @staticmethod
+  def _write(fp, data):
+    try:
+      fp.write(data)
+    except (IOError, OSError) as e:
+      log.debug("Got exception in write(%s): %s" % (fp.name, e))
+      return False
+    return True
+
+  def write(self, blob):
+    """
+      Append the blob to the current RecordWriter.
+
+      Returns True on success, False on any filesystem failure.
+    """
+    if not self._write(self._fp, ChecksummedRecordIO.frame(self._codec.encode(blob))):
+      return False
+    if self._sync:
+      self._fp.flush()
+    return True
+
+  def write_many(self, blobs):
+    """
+      Append the blobs of an iterable to the current RecordWriter, packing their frames into
+      writes of about RecordIO.DEFAULT_BATCH_BYTES.
+
+      Returns True on success, False on any filesystem failure.
+    """
+    frames, pending_bytes = [], 0
+    for blob in blobs:
+      frames.append(ChecksummedRecordIO.frame(self._codec.encode(blob)))
+      pending_bytes += len(frames[-1])
+      if pending_bytes >= RecordIO.DEFAULT_BATCH_BYTES:
+        if not self._write(self._fp, b''.join(frames)):
+          return False
+        frames, pending_bytes = [], 0
+    if frames and not self._write(self._fp, b''.join(frames)):
+      return False
+    if self._sync:
+      self._fp.flush()
+    return True
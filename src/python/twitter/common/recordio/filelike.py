@@ -86,8 +86,8 @@ class FileLike(object):
   def tell(self):
     return self._fp.tell()
 
-  def seek(self, dest):
-    return self._fp.seek(dest)
+  def seek(self, dest, whence=os.SEEK_SET):
+    return self._fp.seek(dest, whence)
 
   def close(self):
     return self._fp.close()
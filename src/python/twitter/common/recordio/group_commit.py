@@ -0,0 +1,231 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+"""Group-commit RecordIO writer.
+
+GroupCommitWriter coalesces records written by any number of threads into batches, and issues a
+single write (and, if sync=True, a single fsync) per batch.  A batch is committed once it holds
+max_batch_bytes of framed records, or max_delay_secs after its first record was enqueued,
+whichever comes first.
+
+Crash safety (with sync=True):
+
+  - A record is durable once write(record, wait=True) or wait(ticket) has returned True for it,
+    or once a subsequent flush() has returned True.  Records that have merely been enqueued may
+    be lost if the process or host crashes.
+  - Batches are appended in order, so the durable records always form a prefix of the
+    records written.
+  - A crash during a batch write may leave a torn final frame.  Readers observe it as
+    RecordIO.PrematureEndOfStream, and RecordIO.Reader.try_read treats it as no data.
+  - If a batch write fails (with any exception), the writer stops accepting records: that batch and every record
+    enqueued after it are reported as failed, since the file may end in a partial frame.
+
+With sync=False batches are still coalesced into single writes, but durability is left to the
+operating system.
+"""
+
+import struct
+import threading
+import time
+
+from twitter.common import log
+
+from .recordio import RecordIO
+
+
+class GroupCommitWriter(RecordIO.Writer):
+  DEFAULT_MAX_BATCH_BYTES = 1024 * 1024
+  DEFAULT_MAX_DELAY_SECS = 0.01
+
+  def __init__(self, fp, codec, sync=True, max_batch_bytes=DEFAULT_MAX_BATCH_BYTES,
+               max_delay_secs=DEFAULT_MAX_DELAY_SECS):
+    """
+      Initialize a GroupCommitWriter from the FileLike fp, with RecordIO.Codec codec.
+
+      A batch is committed once it holds max_batch_bytes of framed records, or max_delay_secs
+      after its first record was enqueued.  If sync=True (the default), each batch is fsynced.
+    """
+    RecordIO.Writer.__init__(self, fp, codec, sync=sync)
+    self._max_batch_bytes = max_batch_bytes
+    self._max_delay_secs = max_delay_secs
+    self._cond = threading.Condition()
+    self._pending = []          # framed records awaiting commit
+    self._pending_bytes = 0
+    self._pending_since = None  # time the first pending record was enqueued
+    self._enqueued = 0          # ticket of the last enqueued record
+    self._committed = 0         # ticket of the last committed record
+    self._failed_from = None    # ticket of the first failed record, if any
+    self._flush_requested = False
+    self._closing = False
+    self._committer = threading.Thread(target=self._run, name='GroupCommitWriter')
+    self._committer.daemon = True
+    self._committer.start()
+
+  def _next_batch(self):
+    """
+      Wait for a batch to be ready, and return (frames, last ticket), or None if closing.
+    """
+    with self._cond:
+      while True:
+        if self._pending:
+          if (self._closing or self._flush_requested or
+              self._pending_bytes >= self._max_batch_bytes):
+            break
+          remaining = self._pending_since + self._max_delay_secs - time.time()
+          if remaining <= 0:
+            break
+          self._cond.wait(remaining)
+        elif self._closing:
+          return None
+        else:
+          self._flush_requested = False
+          self._cond.wait()
+      batch, ticket = self._pending, self._enqueued
+      self._pending, self._pending_bytes, self._pending_since = [], 0, None
+      self._flush_requested = False
+      return batch, ticket
+
+  def _run(self):
+    try:
+      self._commit_batches()
+    except Exception as e:
+      # Fail everything outstanding rather than leave writers waiting on a dead committer.
+      log.error('GroupCommitWriter for %s died: %s' % (self._fp.name, e))
+      with self._cond:
+        if self._failed_from is None:
+          self._failed_from = self._committed + 1
+        self._cond.notify_all()
+
+  def _commit_batches(self):
+    while True:
+      next_batch = self._next_batch()
+      if next_batch is None:
+        return
+      batch, ticket = next_batch
+      if self._failed_from is not None:
+        # The file may end in a partial frame, so nothing more can be appended safely.
+        continue
+      try:
+        self._fp.write(b''.join(batch))
+        if self._sync:
+          self._fp.flush()
+        success = True
+      except Exception as e:
+        log.error('Failed to commit %d records to %s: %s' % (len(batch), self._fp.name, e))
+        success = False
+      with self._cond:
+        if success:
+          self._committed = ticket
+        elif self._failed_from is None:
+          self._failed_from = ticket - len(batch) + 1
+        self._cond.notify_all()
+
+  def enqueue(self, blob):
+    """
+      Enqueue a record for the next batch without waiting for it to be committed.
+
+      Returns a ticket which may be passed to wait(), or None if the writer has failed or is
+      closed.
+    """
+    blob = self._codec.encode(blob)
+    frame = struct.pack('>L', len(blob)) + blob
+    with self._cond:
+      if self._closing or self._failed_from is not None:
+        return None
+      self._pending.append(frame)
+      self._pending_bytes += len(frame)
+      if self._pending_since is None:
+        self._pending_since = time.time()
+        self._cond.notify_all()
+      elif self._pending_bytes >= self._max_batch_bytes:
+        self._cond.notify_all()
+      self._enqueued += 1
+      return self._enqueued
+
+  def wait(self, ticket, timeout=None):
+    """
+      Wait until the record with the given ticket has been committed.
+
+      Returns True if it was committed, False if it failed or the timeout expired.
+    """
+    if ticket is None:
+      return False
+    deadline = None if timeout is None else time.time() + timeout
+    with self._cond:
+      while True:
+        if self._committed >= ticket:
+          return True
+        if self._failed_from is not None and ticket >= self._failed_from:
+          return False
+        if deadline is None:
+          self._cond.wait()
+        else:
+          remaining = deadline - time.time()
+          if remaining <= 0:
+            return False
+          self._cond.wait(remaining)
+
+  def write(self, blob, wait=False):
+    """
+      Append the blob to the current batch.
+
+      If wait=True, block until the batch containing the blob has been committed.
+
+      Returns True on success, False on any filesystem failure.
+    """
+    ticket = self.enqueue(blob)
+    if wait:
+      return self.wait(ticket)
+    return ticket is not None
+
+  def write_many(self, blobs, wait=False):
+    """
+      Append the blobs of an iterable to the current batch.
+
+      If wait=True, block until the batch containing the last blob has been committed.
+
+      Returns True on success, False on any filesystem failure.
+    """
+    ticket = None
+    for blob in blobs:
+      ticket = self.enqueue(blob)
+      if ticket is None:
+        return False
+    if wait and ticket is not None:
+      return self.wait(ticket)
+    return True
+
+  def flush(self, timeout=None):
+    """
+      Commit all enqueued records, waiting until they have been committed.
+
+      Returns True if all records were committed, False otherwise.
+    """
+    with self._cond:
+      ticket = self._enqueued
+      self._flush_requested = True
+      self._cond.notify_all()
+    return self.wait(ticket, timeout=timeout) if ticket else True
+
+  def close(self):
+    """
+      Commit all enqueued records, then close the underlying filehandle.
+    """
+    with self._cond:
+      self._closing = True
+      self._cond.notify_all()
+    self._committer.join()
+    RecordIO.Writer.close(self)
@@ -0,0 +1,316 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+"""Sidecar offset indexes for RecordIO streams.
+
+A RecordIndex maps record ordinals, and optionally a non-decreasing unsigned 64-bit key supplied
+by the writer (e.g. a timestamp), to the byte offsets of records in a RecordIO stream.  It is
+stored next to the stream (conventionally in RecordIndex.sidecar(filename)) as a short header
+followed by fixed-width entries, so record N is found with a single read and a key with a
+binary search, without decoding any records.
+
+Indexes are either maintained by IndexedRecordWriter as records are written, or built after the
+fact with RecordIndex.build.  Since records are written before their index entries, a crash
+may leave the index short of the stream; RecordIndex.build resumes from the last indexed record
+and brings it up to date.
+"""
+
+import os
+import struct
+
+from .filelike import FileLike
+from .recordio import RecordIO
+
+
+class RecordIndex(object):
+  MAGIC = b'RIDX'
+  KEYED = 0x1
+
+  _HEADER = struct.Struct('>4sB')
+  _ENTRY = struct.Struct('>Q')
+  _KEYED_ENTRY = struct.Struct('>QQ')
+
+  @staticmethod
+  def sidecar(filename):
+    """
+      Return the conventional index filename for the RecordIO stream at filename.
+    """
+    return filename + '.idx'
+
+  @staticmethod
+  def build(fp, index_fp, codec, key=None):
+    """
+      Index the records of the RecordIO stream fp that are not yet in the index stored in
+      index_fp, decoding them with codec.  If key is supplied, it is called with each decoded
+      record and must return its key.
+
+      A truncated record at the end of the stream ends the build; it is indexed by a later build
+      once it is complete.
+
+      Returns the updated RecordIndex.
+    """
+    try:
+      fp = FileLike.get(fp)
+    except ValueError as err:
+      raise RecordIO.InvalidFileHandle(err)
+    index = RecordIndex(index_fp, keyed=key is not None)
+    if len(index):
+      fp.seek(index.offset(len(index) - 1))
+      if RecordIO.Reader.do_read(fp, codec) is None:
+        raise RecordIO.PrematureEndOfStream('Index refers past the end of %s' % fp.name)
+    else:
+      fp.seek(0)
+    while True:
+      offset = fp.tell()
+      try:
+        record = RecordIO.Reader.do_read(fp, codec)
+      except RecordIO.PrematureEndOfStream:
+        break
+      if record is None:
+        break
+      index.append(offset, key(record) if key else None)
+    index.flush()
+    return index
+
+  def __init__(self, fp, keyed=None):
+    """
+      Open the index stored in fp.  If fp is empty, a new index is created in it, keyed if
+      keyed=True.  Otherwise keyed, if not None, must match whether the existing index is keyed.
+
+      May raise:
+        RecordIO.InvalidFileHandle if fp does not contain a RecordIndex
+        RecordIO.InvalidArgument if keyed does not match the existing index
+    """
+    try:
+      self._fp = FileLike.get(fp)
+    except ValueError as err:
+      raise RecordIO.InvalidFileHandle(err)
+    self._fp.seek(0)
+    header = self._fp.read(self._HEADER.size)
+    if not header:
+      self._flags = self.KEYED if keyed else 0
+      self._fp.seek(0)
+      try:
+        self._fp.write(self._HEADER.pack(self.MAGIC, self._flags))
+      except (IOError, OSError) as e:
+        raise RecordIO.InvalidFileHandle('Could not create index in %s: %s' % (self._fp.name, e))
+    elif len(header) != self._HEADER.size:
+      raise RecordIO.InvalidFileHandle('%s is not a RecordIndex' % self._fp.name)
+    else:
+      magic, self._flags = self._HEADER.unpack(header)
+      if magic != self.MAGIC:
+        raise RecordIO.InvalidFileHandle('%s is not a RecordIndex' % self._fp.name)
+      if keyed is not None and bool(keyed) != self.keyed:
+        raise RecordIO.InvalidArgument('%s is %s' % (
+            self._fp.name, 'keyed' if self.keyed else 'not keyed'))
+    self._entry = self._KEYED_ENTRY if self.keyed else self._ENTRY
+
+  @property
+  def keyed(self):
+    return bool(self._flags & self.KEYED)
+
+  def __len__(self):
+    # A partially written entry at the end of the index is ignored.
+    self._fp.seek(0, os.SEEK_END)
+    return (self._fp.tell() - self._HEADER.size) // self._entry.size
+
+  def _pack(self, offset, key=None):
+    try:
+      return self._entry.pack(offset, key) if self.keyed else self._entry.pack(offset)
+    except struct.error as e:
+      raise RecordIO.InvalidArgument('Invalid index entry (%r, %r): %s' % (offset, key, e))
+
+  def entry(self, n):
+    """
+      Return the entry for record n: a tuple (offset,) or (offset, key) if the index is keyed.
+
+      May raise:
+        RecordIO.InvalidArgument if there is no record n in the index
+    """
+    if n < 0:
+      raise RecordIO.InvalidArgument('Record number must be non-negative, got %d' % n)
+    self._fp.seek(self._HEADER.size + n * self._entry.size)
+    data = self._fp.read(self._entry.size)
+    if len(data) != self._entry.size:
+      raise RecordIO.InvalidArgument('Record %d is not in %s' % (n, self._fp.name))
+    return self._entry.unpack(data)
+
+  def offset(self, n):
+    """
+      Return the byte offset of record n.
+    """
+    return self.entry(n)[0]
+
+  def key(self, n):
+    """
+      Return the key of record n, or None if the index is not keyed.
+    """
+    return self.entry(n)[1] if self.keyed else None
+
+  def find(self, key):
+    """
+      Return the number of the first record whose key is greater than or equal to key, or
+      len(self) if there is none.  The index must be keyed.
+    """
+    if not self.keyed:
+      raise RecordIO.InvalidArgument('%s is not keyed' % self._fp.name)
+    low, high = 0, len(self)
+    while low < high:
+      middle = (low + high) // 2
+      if self.key(middle) < key:
+        low = middle + 1
+      else:
+        high = middle
+    return low
+
+  def find_offset(self, offset):
+    """
+      Return the number of the first record at or after byte offset offset in the stream, or
+      len(self) if there is none.
+    """
+    low, high = 0, len(self)
+    while low < high:
+      middle = (low + high) // 2
+      if self.offset(middle) < offset:
+        low = middle + 1
+      else:
+        high = middle
+    return low
+
+  def append(self, offset, key=None):
+    """
+      Append an entry for the record at offset, with the given key if the index is keyed.
+    """
+    self._append(self._pack(offset, key))
+
+  def _append(self, entry):
+    self._fp.seek(0, os.SEEK_END)
+    self._fp.write(entry)
+
+  def flush(self):
+    """
+      Flush and fsync the index.
+    """
+    self._fp.flush()
+
+  def close(self):
+    self._fp.close()
+
+
+class IndexedRecordWriter(RecordIO.Writer):
+  def __init__(self, fp, codec, index_fp, key=None, sync=False):
+    """
+      Initialize an IndexedRecordWriter from the FileLike fp, with RecordIO.Codec codec,
+      recording the offset of each record written in the RecordIndex stored in index_fp.
+
+      If key is supplied, it is called with each record and must return a non-decreasing
+      unsigned 64-bit integer, which is recorded alongside the offset so that the record can be
+      found with IndexedRecordReader.seek_key.
+
+      If sync=True is supplied, both the stream and the index are fsynced after each write.
+    """
+    RecordIO.Writer.__init__(self, fp, codec, sync=sync)
+    self._index = RecordIndex(index_fp, keyed=key is not None)
+    self._key = key
+    self._last_key = None
+    if key and len(self._index):
+      self._last_key = self._index.key(len(self._index) - 1)
+    self._fp.seek(0, os.SEEK_END)
+
+  def index(self):
+    return self._index
+
+  def write(self, blob):
+    """
+      Append the blob to the current RecordWriter and record its offset in the index.
+
+      Returns True on success, False on any filesystem failure.
+
+      May raise:
+        RecordIO.InvalidArgument if the key of blob is invalid or smaller than that of the
+          previous record
+    """
+    key = None
+    if self._key:
+      key = self._key(blob)
+      if self._last_key is not None and key < self._last_key:
+        raise RecordIO.InvalidArgument('Key %r is smaller than the previous key %r' % (
+            key, self._last_key))
+    entry = self._index._pack(self._fp.tell(), key)
+    if not RecordIO.Writer.do_write(self._fp, blob, self._codec, sync=self._sync):
+      return False
+    try:
+      self._index._append(entry)
+    except (IOError, OSError):
+      return False
+    if self._sync:
+      self._index.flush()
+    self._last_key = key
+    return True
+
+  def write_many(self, blobs):
+    """
+      Append the blobs of an iterable to the current RecordWriter, recording each in the index.
+
+      Returns True on success, False on any filesystem failure.
+    """
+    for blob in blobs:
+      if not self.write(blob):
+        return False
+    return True
+
+  def close(self):
+    """
+      Close the underlying filehandles of the stream and its index.
+    """
+    RecordIO.Writer.close(self)
+    self._index.close()
+
+
+class IndexedRecordReader(RecordIO.Reader):
+  def __init__(self, fp, codec, index_fp):
+    """
+      Initialize an IndexedRecordReader from file-like fp, with RecordIO.Codec codec, using
+      the RecordIndex stored in index_fp to seek.
+    """
+    RecordIO.Reader.__init__(self, fp, codec)
+    self._index = RecordIndex(index_fp)
+
+  def index(self):
+    return self._index
+
+  def seek_record(self, n):
+    """
+      Position the stream so that the next read returns record n.
+
+      May raise:
+        RecordIO.InvalidArgument if there is no record n in the index
+    """
+    self._fp.seek(self._index.offset(n))
+
+  def seek_key(self, key):
+    """
+      Position the stream so that the next read returns the first record whose key is greater
+      than or equal to key.
+
+      Returns the number of that record, or None (leaving the position unchanged) if there is
+      no such record.
+    """
+    n = self._index.find(key)
+    if n == len(self._index):
+      return None
+    self.seek_record(n)
+    return n
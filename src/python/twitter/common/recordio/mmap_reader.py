@@ -0,0 +1,199 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+"""Memory-mapped RecordIO reader.
+
+MmapRecordReader maps a RecordIO file into memory and walks its frame headers in place, so
+reading a record makes no system calls and frames are returned as zero-copy slices of the
+mapping (memoryview on Python 3, buffer on Python 2.)  If the file grows, it is remapped the
+next time a read reaches the end of the current mapping.
+
+If the file shrinks, it is remapped at its new size the next time the reader seeks, starts
+iterating, or reaches the end of its mapping.  Checking on every read would cost a system call
+per record, so a file must not be truncated below a region that is still being read: touching
+a mapped page past the end of the file raises SIGBUS.
+"""
+
+import mmap
+import os
+import struct
+
+from twitter.common import log
+from twitter.common.lang import Compatibility
+
+from .recordio import RecordIO
+
+
+_HEADER = struct.Struct('>L')
+
+
+class MmapRecordReader(object):
+  def __init__(self, fp, codec):
+    """
+      Initialize a MmapRecordReader from the real file fp, with RecordIO.Codec codec.
+
+      If codec.ACCEPTS_BUFFERS is True, frames are passed to codec.decode without being
+      copied, otherwise they are copied into strings first.
+    """
+    if not hasattr(fp, 'fileno'):
+      raise RecordIO.InvalidFileHandle('MmapRecordReader requires a file with a descriptor.')
+    if not isinstance(codec, RecordIO.Codec):
+      raise RecordIO.InvalidCodec("Codec must be subclass of RecordIO.Codec")
+    self._fp = fp
+    self._codec = codec
+    self._map = None
+    self._view = None
+    self._size = 0
+    self._offset = 0
+
+  def _remap(self):
+    """
+      Remap the file if it has grown or shrunk.  Returns True if more data is available.
+    """
+    size = os.fstat(self._fp.fileno()).st_size
+    if size == self._size:
+      return False
+    # The previous mapping is not closed explicitly, as slices handed out from it may still be
+    # alive; it is unmapped once they have been garbage collected.
+    if size == 0:
+      self._map = self._view = None
+    else:
+      self._map = mmap.mmap(self._fp.fileno(), size, access=mmap.ACCESS_READ)
+      self._view = memoryview(self._map) if Compatibility.PY3 else None
+    grew, self._size = size > self._size, size
+    return grew
+
+  def _slice(self, offset, length):
+    if self._view is not None:
+      return self._view[offset:offset + length]
+    return buffer(self._map, offset, length)
+
+  def _frame_at(self, offset):
+    """
+      Return (frame, next offset) for the frame at offset, or None if there is no data.
+
+      May raise:
+        RecordIO.PrematureEndOfStream if the frame is truncated
+        RecordIO.RecordSizeExceeded if the frame exceeds RecordIO.MAXIMUM_RECORD_SIZE
+    """
+    if offset + RecordIO.RECORD_HEADER_SIZE > self._size:
+      self._remap()
+      if offset >= self._size:
+        return None
+      if offset + RecordIO.RECORD_HEADER_SIZE > self._size:
+        raise RecordIO.PrematureEndOfStream(
+            "Expected %d bytes, got %d" % (RecordIO.RECORD_HEADER_SIZE, self._size - offset))
+    blob_len = _HEADER.unpack_from(self._map, offset)[0]
+    if blob_len > RecordIO.MAXIMUM_RECORD_SIZE:
+      raise RecordIO.RecordSizeExceeded()
+    start = offset + RecordIO.RECORD_HEADER_SIZE
+    end = start + blob_len
+    if end > self._size:
+      self._remap()
+      if end > self._size:
+        raise RecordIO.PrematureEndOfStream()
+    return self._slice(start, blob_len), end
+
+  def _decode(self, frame):
+    if getattr(self._codec, 'ACCEPTS_BUFFERS', False):
+      return self._codec.decode(frame)
+    return self._codec.decode(bytes(frame))
+
+  def tell(self):
+    return self._offset
+
+  def seek(self, offset):
+    self._remap()
+    self._offset = offset
+
+  def read_frame(self):
+    """
+      Read the next undecoded frame as a zero-copy slice of the mapping.  The file position
+      is only updated on success.
+
+      Returns the frame, or None if no data is available.
+
+      May raise:
+        RecordIO.PrematureEndOfStream if the stream is truncated in the middle of
+          an expected message
+        RecordIO.RecordSizeExceeded if the message exceeds RecordIO.MAXIMUM_RECORD_SIZE
+    """
+    frame = self._frame_at(self._offset)
+    if frame is None:
+      return None
+    frame, self._offset = frame
+    return frame
+
+  def read(self):
+    """
+      Read and decode a single record.  The file position is only updated on success.
+
+      Returns the decoded record, or None if no data is available.
+
+      May raise:
+        RecordIO.PrematureEndOfStream if the stream is truncated in the middle of
+          an expected message
+        RecordIO.RecordSizeExceeded if the message exceeds RecordIO.MAXIMUM_RECORD_SIZE
+    """
+    frame = self.read_frame()
+    return None if frame is None else self._decode(frame)
+
+  def try_read(self):
+    """
+      Attempt to read a single record.  Returns None if no complete record is available.
+
+      May raise:
+        RecordIO.RecordSizeExceeded
+    """
+    try:
+      return self.read()
+    except RecordIO.PrematureEndOfStream as e:
+      log.debug('Got premature end of stream [%s], skipping - %s' % (self._fp.name, e))
+      return None
+
+  def frames(self):
+    """
+      Return an iterator over the undecoded frames of the entire file, independent of the
+      current file position.
+    """
+    offset = 0
+    self._remap()
+    try:
+      while True:
+        frame = self._frame_at(offset)
+        if frame is None:
+          break
+        frame, offset = frame
+        yield frame
+    except RecordIO.Error as e:
+      log.error('Caught exception in frames: %s' % e)
+
+  def __iter__(self):
+    """
+      Return an iterator over the decoded records of the entire file, independent of the
+      current file position.
+    """
+    for frame in self.frames():
+      yield self._decode(frame)
+
+  def close(self):
+    """
+      Close the underlying filehandle.  The mapping is released once all frames handed out
+      from it have been garbage collected.
+    """
+    self._map = self._view = None
+    self._size = 0
+    self._fp.close()
@@ -0,0 +1,211 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+"""Parallel decoding of RecordIO files.
+
+ParallelRecordReader splits a RecordIO file into byte ranges at frame boundaries, and decodes
+the ranges in a multiprocessing pool.  The boundaries are looked up in the file's RecordIndex
+sidecar if it has one, and otherwise found by walking the frame headers, read in large chunks,
+without reading any payloads.  Since decoding happens in the workers, the codec (and the projection,
+if any) must be picklable: module-level classes and functions are.
+
+  def user_id(status):
+    return status.user_id
+
+  reader = ParallelRecordReader('statuses.rio', ThriftRecordIO.ThriftCodec(Status),
+                                projection=user_id)
+  user_ids = set(reader.unordered())
+"""
+
+import multiprocessing
+import os
+import struct
+
+from .index import RecordIndex
+from .recordio import RecordIO
+
+
+_HEADER = struct.Struct('>L')
+
+
+def _frame_ends(fp, offset, size, read_bytes=1024 * 1024):
+  """
+    Yield the end offset of each complete frame of fp from offset on, stopping at size or at a
+    truncated frame.  Headers are parsed out of read_bytes reads, and payloads that extend past
+    a read are skipped with a seek.
+
+    May raise:
+      RecordIO.RecordSizeExceeded if a frame exceeds RecordIO.MAXIMUM_RECORD_SIZE
+  """
+  header_size, maximum_size = RecordIO.RECORD_HEADER_SIZE, RecordIO.MAXIMUM_RECORD_SIZE
+  unpack_from = _HEADER.unpack_from
+  while offset + header_size <= size:
+    fp.seek(offset)
+    buf = fp.read(min(read_bytes, size - offset))
+    if len(buf) < header_size:
+      return
+    buf_start, buf_end = offset, offset + len(buf)
+    while offset + header_size <= buf_end:
+      blob_len = unpack_from(buf, offset - buf_start)[0]
+      if blob_len > maximum_size:
+        raise RecordIO.RecordSizeExceeded()
+      next_offset = offset + header_size + blob_len
+      if next_offset > size:
+        return
+      offset = next_offset
+      yield offset
+
+
+def _decode_range(args):
+  """
+    Decode the records of filename between offsets start and end in a worker, applying
+    projection to each.  Returns (records, error message or None.)
+  """
+  filename, start, end, codec, projection = args
+  records = []
+  try:
+    with open(filename, 'rb') as fp:
+      fp.seek(start)
+      while fp.tell() < end:
+        record = RecordIO.Reader.do_read(fp, codec)
+        if record is None:
+          raise RecordIO.PrematureEndOfStream('Unexpected end of stream at %d' % fp.tell())
+        records.append(projection(record) if projection else record)
+  except (RecordIO.Error, IOError, OSError) as e:
+    # Exceptions nested in RecordIO cannot be pickled back from the worker.
+    return None, '%s: %s' % (e.__class__.__name__, e)
+  return records, None
+
+
+class ParallelRecordReader(object):
+  DEFAULT_CHUNK_BYTES = 4 * 1024 * 1024
+
+  # (filename, chunk_bytes) => ((mtime, size), ranges) of the last split of each file.
+  _SPLITS = {}
+
+  @classmethod
+  def split(cls, filename, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """
+      Split the RecordIO file filename into (start, end) byte ranges of complete frames, each
+      at least chunk_bytes long except for the last.  A truncated frame at the end of the file
+      is excluded.
+
+      Frame boundaries are taken from the RecordIndex in RecordIndex.sidecar(filename) if
+      there is one, so it must index this file.  Splits are cached until the file's
+      modification time or size changes.
+
+      May raise:
+        RecordIO.RecordSizeExceeded if a frame exceeds RecordIO.MAXIMUM_RECORD_SIZE
+    """
+    st = os.stat(filename)
+    stamp = (st.st_mtime, st.st_size)
+    cached = cls._SPLITS.get((filename, chunk_bytes))
+    if cached is not None and cached[0] == stamp:
+      return list(cached[1])
+    with open(filename, 'rb') as fp:
+      ranges = cls._split(fp, RecordIndex.sidecar(filename), st.st_size, chunk_bytes)
+    cls._SPLITS[(filename, chunk_bytes)] = (stamp, ranges)
+    return list(ranges)
+
+  @staticmethod
+  def _split(fp, index_filename, size, chunk_bytes):
+    ranges = []
+    start = offset = 0
+    # Split at indexed records, then walk any frames written since the last one was indexed.
+    if os.path.exists(index_filename):
+      try:
+        with open(index_filename, 'rb') as index_fp:
+          index = RecordIndex(index_fp)
+          indexed = len(index)
+          last = index.offset(indexed - 1) if indexed else 0
+          if last < size:
+            while True:
+              n = index.find_offset(start + chunk_bytes)
+              if n >= indexed:
+                break
+              end = index.offset(n)
+              ranges.append((start, end))
+              start = end
+            offset = last
+      except (RecordIO.Error, IOError, OSError):
+        ranges, start, offset = [], 0, 0
+    for offset in _frame_ends(fp, offset, size):
+      if offset - start >= chunk_bytes:
+        ranges.append((start, offset))
+        start = offset
+    if offset > start:
+      ranges.append((start, offset))
+    return ranges
+
+  def __init__(self, filename, codec, processes=None, projection=None,
+               chunk_bytes=DEFAULT_CHUNK_BYTES, pool=None):
+    """
+      Initialize a ParallelRecordReader over the RecordIO file filename, with the picklable
+      RecordIO.Codec codec.
+
+        processes: The number of worker processes (default: the number of CPUs.)
+        projection: If supplied, a picklable function applied to each decoded record in the
+                    workers, whose result is yielded in place of the record.
+        chunk_bytes: The approximate number of bytes decoded by a worker at a time.
+        pool: A multiprocessing.Pool to use instead of creating one for each iteration.
+    """
+    if not isinstance(codec, RecordIO.Codec):
+      raise RecordIO.InvalidCodec("Codec must be subclass of RecordIO.Codec")
+    self._filename = filename
+    self._codec = codec
+    self._processes = processes
+    self._projection = projection
+    self._chunk_bytes = chunk_bytes
+    self._pool = pool
+
+  def _iterate(self, ordered):
+    ranges = self.split(self._filename, self._chunk_bytes)
+    if not ranges:
+      return
+    pool = self._pool or multiprocessing.Pool(self._processes)
+    try:
+      work = [(self._filename, start, end, self._codec, self._projection)
+              for start, end in ranges]
+      mapper = pool.imap if ordered else pool.imap_unordered
+      for records, error in mapper(_decode_range, work):
+        if error:
+          raise RecordIO.Error('Failed to decode %s: %s' % (self._filename, error))
+        for record in records:
+          yield record
+    finally:
+      if pool is not self._pool:
+        pool.terminate()
+        pool.join()
+
+  def __iter__(self):
+    """
+      Return an iterator over the (projected) records of the file, in file order.
+
+      May raise:
+        RecordIO.Error if any record fails to decode
+    """
+    return self._iterate(ordered=True)
+
+  def unordered(self):
+    """
+      Return an iterator over the (projected) records of the file, in the order in which
+      workers finish decoding them.  Records within the same chunk keep their relative
+      order.
+
+      May raise:
+        RecordIO.Error if any record fails to decode
+    """
+    return self._iterate(ordered=False)
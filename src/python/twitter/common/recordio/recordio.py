@@ -36,6 +36,9 @@ from twitter.common.lang import Compatibility, Interface
 from .filelike import FileLike
 
 
+_HEADER = struct.Struct('>L')
+
+
 class RecordIO(object):
   class Error(Exception): pass
   class PrematureEndOfStream(Error): pass
@@ -47,11 +50,16 @@ class RecordIO(object):
 
   RECORD_HEADER_SIZE = 4
   MAXIMUM_RECORD_SIZE = 64 * 1024 * 1024
+  DEFAULT_BATCH_BYTES = 1024 * 1024
 
   class Codec(Interface):
     """
       An encoder/decoder interface for bespoke RecordReader/Writers.
+
+      Codecs whose decode accepts any object supporting the buffer interface (e.g. memoryview)
+      may set ACCEPTS_BUFFERS = True, so that readers can hand them frames without copying.
     """
+    ACCEPTS_BUFFERS = False
     @abstractmethod
     def encode(self, blob):
       """
@@ -152,6 +160,67 @@ class RecordIO(object):
         raise RecordIO.PrematureEndOfStream()
       return decoder.decode(read_blob)
 
+    @staticmethod
+    def do_read_many(fp, decoder, max_records=None, max_bytes=None):
+      """
+        Read up to max_records complete records from the given filehandle with a single read of
+        up to max_bytes, and decode them using the supplied decoder.  The file position is left
+        at the end of the last record returned.  If the next record does not fit in max_bytes,
+        it is read on its own.
+
+        Returns a list of records, which is empty if no data is available.
+
+        May raise:
+          RecordIO.PrematureEndOfStream if the stream is truncated in the middle of
+            the first expected message
+          RecordIO.RecordSizeExceeded if the first message exceeds RecordIO.MAXIMUM_RECORD_SIZE
+      """
+      if max_records is not None and max_records <= 0:
+        return []
+      start = fp.tell()
+      buf = fp.read(max_bytes or RecordIO.DEFAULT_BATCH_BYTES)
+      if len(buf) == 0:
+        # Reset EOF (appears to be only necessary on OS X)
+        fp.seek(start)
+        return []
+      # Hoist lookups out of the loop, which dominates for small records.
+      records, decode = [], decoder.decode
+      append = records.append
+      header_size, maximum_size = RecordIO.RECORD_HEADER_SIZE, RecordIO.MAXIMUM_RECORD_SIZE
+      unpack_from = _HEADER.unpack_from
+      remaining = -1 if max_records is None else max_records
+      offset, buf_len = 0, len(buf)
+      while offset + header_size <= buf_len and remaining != 0:
+        blob_len = unpack_from(buf, offset)[0]
+        end = offset + header_size + blob_len
+        if end > buf_len or blob_len > maximum_size:
+          break
+        append(decode(buf[offset + header_size:end]))
+        offset = end
+        remaining -= 1
+      fp.seek(start + offset)
+      if not records:
+        # The next record is larger than the buffer, oversized or truncated.
+        record = RecordIO.Reader.do_read(fp, decoder)
+        return [] if record is None else [record]
+      return records
+
+    def read_many(self, max_records=None, max_bytes=None):
+      """
+        Read up to max_records records from this stream, reading up to max_bytes (by default
+        RecordIO.DEFAULT_BATCH_BYTES) at a time.  The file position is left at the end of the
+        last record returned, except on failure.
+
+        Returns a list of records, which is empty if no data is available.
+
+        May raise:
+          RecordIO.PrematureEndOfStream if the stream is truncated in the middle of
+            the first expected message
+          RecordIO.RecordSizeExceeded if the first message exceeds RecordIO.MAXIMUM_RECORD_SIZE
+      """
+      return RecordIO.Reader.do_read_many(self._fp, self._codec, max_records=max_records,
+          max_bytes=max_bytes)
+
     def read(self):
       """
         Read a single record from this stream.  Updates the file position on both
@@ -221,6 +290,40 @@ class RecordIO(object):
         fp.flush()
       return True
 
+    @staticmethod
+    def do_write_many(fp, records, codec, sync=False):
+      """
+        Write the records of an iterable to the specified fp using the supplied codec, packing
+        their frames into writes of about RecordIO.DEFAULT_BATCH_BYTES.
+
+        Returns True on success, False on any filesystem failure.
+      """
+      def write(frames):
+        try:
+          fp.write(b''.join(frames))
+        except (IOError, OSError) as e:
+          log.debug("Got exception in write_many(%s): %s" % (fp.name, e))
+          return False
+        return True
+
+      frames, pending_bytes = [], 0
+      append, encode, pack = frames.append, codec.encode, _HEADER.pack
+      for record in records:
+        blob = encode(record)
+        append(pack(len(blob)))
+        append(blob)
+        pending_bytes += RecordIO.RECORD_HEADER_SIZE + len(blob)
+        if pending_bytes >= RecordIO.DEFAULT_BATCH_BYTES:
+          if not write(frames):
+            return False
+          del frames[:]
+          pending_bytes = 0
+      if frames and not write(frames):
+        return False
+      if sync:
+        fp.flush()
+      return True
+
     @staticmethod
     def append(filename, record, codec):
       """
@@ -253,6 +356,15 @@ class RecordIO(object):
       """
       return RecordIO.Writer.do_write(self._fp, blob, self._codec, sync=self._sync)
 
+    def write_many(self, blobs):
+      """
+        Append the blobs of an iterable to the current RecordWriter, packing them into
+        as few writes as possible.
+
+        Returns True on success, False on any filesystem failure.
+      """
+      return RecordIO.Writer.do_write_many(self._fp, blobs, self._codec, sync=self._sync)
+
 
 class StringCodec(RecordIO.Codec):
   """
@@ -19,6 +19,7 @@ from __future__ import print_function
 import sys
 import inspect
 
+from .parallel import ParallelRecordReader
 from .recordio import RecordIO
 
 try:
@@ -91,6 +92,27 @@ class ThriftRecordReader(RecordIO.Reader):
     RecordIO.Reader.__init__(self, fp, ThriftRecordIO.ThriftCodec(thrift_base))
 
 
+class ParallelThriftRecordReader(ParallelRecordReader):
+  """
+    ParallelRecordReader that deserializes Thrift objects in a pool of worker processes.
+  """
+
+  def __init__(self, filename, thrift_base, **kw):
+    """
+      Construct a ParallelThriftRecordReader over the file filename and Thrift class
+      thrift_base.  Keyword arguments are those of ParallelRecordReader.
+
+      May raise:
+        RecordIO.ThriftUnavailableException if thrift deserialization is unavailable.
+        RecordIO.ThriftUnsuppliedException if thrift_base not supplied
+    """
+    ThriftRecordIO.assert_has_thrift()
+    if not thrift_base:
+      raise ThriftRecordIO.ThriftUnsuppliedException(
+        'Must construct ParallelThriftRecordReader with valid thrift_base!')
+    ParallelRecordReader.__init__(self, filename, ThriftRecordIO.ThriftCodec(thrift_base), **kw)
+
+
 class ThriftRecordWriter(RecordIO.Writer):
   """
     RecordWriter that serializes Thrift objects instead of strings.
@@ -0,0 +1,172 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import gzip
+import json
+from wsgiref.util import setup_testing_defaults
+
+from twitter.common.app.modules.varz import accepts_gzip, etag_matches, VarsEndpoint
+from twitter.common.http import HttpServer
+from twitter.common.lang import Compatibility
+from twitter.common.metrics import AtomicGauge, Label, RootMetrics
+
+import pytest
+
+
+def request(app, path, headers=()):
+  """Send a GET for path to the WSGI app, returning (status code, headers, body).  The header
+     names are lowercased."""
+  environ = {}
+  setup_testing_defaults(environ)
+  environ['PATH_INFO'], _, environ['QUERY_STRING'] = path.partition('?')
+  for name, value in headers:
+    environ['HTTP_' + name.upper().replace('-', '_')] = value
+  response = []
+  def start_response(status, response_headers, exc_info=None):
+    response[:] = [int(status.split()[0]),
+                   dict((name.lower(), value) for name, value in response_headers)]
+  body = b''.join(app(environ, start_response))
+  return response[0], response[1], body
+
+
+def gunzip(body):
+  return gzip.GzipFile(fileobj=Compatibility.BytesIO(body)).read()
+
+
+@pytest.fixture
+def vars_app(request):
+  metrics = RootMetrics()
+  metrics.register(AtomicGauge('requests', 42))
+  metrics.register(Label('name', 'brian'))
+  endpoint = VarsEndpoint(history_samples=10)
+  request.addfinalizer(metrics.clear)
+  server = HttpServer()
+  server.mount_routes(endpoint)
+  return server.app(), endpoint
+
+
+def test_vars_etag(vars_app):
+  app, _ = vars_app
+  for path, check in (('/vars', lambda body: 'requests 42' in body.decode('utf-8').splitlines()),
+                      ('/vars.json', lambda body: json.loads(body.decode('utf-8')) == {
+                          'requests': 42, 'name': 'brian'})):
+    status, headers, body = request(app, path)
+    assert status == 200
+    assert check(body)
+    etag = headers['etag']
+    assert 'content-encoding' not in headers
+
+    for if_none_match in (etag, 'W/' + etag, '"other", %s' % etag, '*'):
+      status, headers, body = request(app, path, [('If-None-Match', if_none_match)])
+      assert status == 304, if_none_match
+      assert headers['etag'] == etag
+      assert body == b''
+
+    for if_none_match in ('"other"', etag[:-2] + '"', '"x%s' % etag[1:]):
+      status, _, _ = request(app, path, [('If-None-Match', if_none_match)])
+      assert status == 200, if_none_match
+
+
+def test_vars_gzip(vars_app):
+  app, endpoint = vars_app
+  _, _, plain = request(app, '/vars.json')
+  status, headers, body = request(app, '/vars.json', [('Accept-Encoding', 'deflate, gzip')])
+  assert status == 200
+  assert headers['content-encoding'] == 'gzip'
+  assert headers['vary'] == 'Accept-Encoding'
+  assert gunzip(body) == plain
+  gzip_etag = headers['etag']
+  status, _, _ = request(app, '/vars.json', [('Accept-Encoding', 'gzip'),
+                                              ('If-None-Match', gzip_etag)])
+  assert status == 304
+
+  for accept_encoding in ('gzip;q=0', 'identity', 'deflate, *;q=0', 'gzip;q=0, *'):
+    status, headers, body = request(app, '/vars.json', [('Accept-Encoding', accept_encoding)])
+    assert status == 200
+    assert 'content-encoding' not in headers, accept_encoding
+    assert body == plain
+
+  # A new sample gets a new ETag.
+  RootMetrics().register(AtomicGauge('more', 1))
+  endpoint._monitor.sample_once()
+  status, headers, _ = request(app, '/vars.json', [('Accept-Encoding', 'gzip'),
+                                                    ('If-None-Match', gzip_etag)])
+  assert status == 200
+  assert headers['etag'] != gzip_etag
+
+
+def history_lines(body):
+  return [(float(timestamp), float(value)) for timestamp, value in
+          (line.split() for line in body.decode('utf-8').splitlines())]
+
+
+def test_vars_history(vars_app):
+  app, endpoint = vars_app
+  gauge = RootMetrics().register(AtomicGauge('counter', 0))
+  for _ in range(3):
+    gauge.increment()
+    endpoint._monitor.sample_once()
+
+  status, _, body = request(app, '/vars/history/counter')
+  assert status == 200
+  lines = history_lines(body)
+  assert [value for _, value in lines] == [1, 2, 3]
+  assert [timestamp for timestamp, _ in lines] == sorted(timestamp for timestamp, _ in lines)
+  status, _, body = request(app, '/vars/history/requests')
+  assert status == 200
+  assert [value for _, value in history_lines(body)] == [42] * 4
+
+  status, _, body = request(app, '/vars/history/counter?samples=2')
+  assert status == 200
+  assert [value for _, value in history_lines(body)] == [2, 3]
+
+  # Unknown and non-numeric variables have no history.
+  assert request(app, '/vars/history/unknown')[0] == 404
+  assert request(app, '/vars/history/name')[0] == 404
+
+  for query in ('samples=two', 'samples=0', 'samples=-1', 'samples='):
+    assert request(app, '/vars/history/counter?' + query)[0] == 400, query
+
+
+def test_vars_history_disabled():
+  endpoint = VarsEndpoint()
+  server = HttpServer()
+  server.mount_routes(endpoint)
+  status, _, _ = request(server.app(), '/vars/history/requests')
+  assert status == 404
+
+
+def test_accepts_gzip():
+  assert accepts_gzip('gzip')
+  assert accepts_gzip('GZIP;q=0.5')
+  assert accepts_gzip('deflate, gzip ; q=1')
+  assert accepts_gzip('*')
+  assert not accepts_gzip('')
+  assert not accepts_gzip('gzip;q=0')
+  assert not accepts_gzip('gzip;q=0.0, deflate')
+  assert not accepts_gzip('gzip;q=zero')
+  assert not accepts_gzip('x-gzip-not')
+  assert not accepts_gzip('*, gzip;q=0')
+
+
+def test_etag_matches():
+  assert etag_matches('"abc"', '"abc"')
+  assert etag_matches('"abc"', 'W/"abc"')
+  assert etag_matches('"abc"', '"x", "abc"')
+  assert etag_matches('"abc"', '*')
+  assert not etag_matches('"abc"', '')
+  assert not etag_matches('"abc"', '"abcd"')
+  assert not etag_matches('"abc"', '"x,abc"')
@@ -0,0 +1,160 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import os
+import threading
+import time
+
+from twitter.common.contextutil import temporary_dir
+from twitter.common.dirutil.tail import Inotify, follow
+
+import pytest
+
+try:
+  from queue import Empty, Queue
+except ImportError:
+  from Queue import Empty, Queue
+
+
+pytestmark = pytest.mark.skipif('not Inotify.available()')
+
+
+class Follower(threading.Thread):
+  def __init__(self, filenames, **kw):
+    self.lines = Queue()
+    self._generator = follow(filenames, **kw)
+    threading.Thread.__init__(self)
+    self.daemon = True
+    self.start()
+
+  def run(self):
+    for filename_and_line in self._generator:
+      self.lines.put(filename_and_line)
+    self.lines.put(None)
+
+  def expect(self, *expected):
+    return sorted(self.lines.get(timeout=5) for _ in expected) == sorted(expected)
+
+  def idle(self):
+    try:
+      self.lines.get(timeout=0.1)
+      return False
+    except Empty:
+      return True
+
+
+def write(filename, data, mode='a'):
+  with open(filename, mode) as fp:
+    fp.write(data)
+
+
+def test_follow_many():
+  with temporary_dir() as td:
+    filenames = [os.path.join(td, 'log.%d' % k) for k in range(50)]
+    for filename in filenames:
+      write(filename, 'old 1\nold 2\n')
+    follower = Follower(filenames)
+    assert follower.expect(*[(filename, 'old %d' % k) for filename in filenames for k in (1, 2)])
+    assert follower.idle()
+
+    for k, filename in enumerate(filenames):
+      write(filename, 'new %d\n' % k)
+    assert follower.expect(*[(filename, 'new %d\n' % k) for k, filename in enumerate(filenames)])
+    assert follower.idle()
+
+
+def test_follow_latency():
+  with temporary_dir() as td:
+    filename = os.path.join(td, 'log')
+    write(filename, '')
+    follower = Follower([filename])
+    assert follower.idle()
+    start = time.time()
+    write(filename, 'hello\n')
+    assert follower.expect((filename, 'hello\n'))
+    assert time.time() - start < 0.5
+
+
+def test_follow_rotation_and_truncation():
+  with temporary_dir() as td:
+    filename = os.path.join(td, 'log')
+    write(filename, 'hello\n')
+    follower = Follower([filename])
+    assert follower.expect((filename, 'hello'))
+
+    os.rename(filename, filename + '.1')
+    write(filename, 'rotated\n')
+    assert follower.expect((filename, 'rotated\n'))
+
+    os.unlink(filename)
+    assert follower.idle()
+    write(filename, 'recreated\n')
+    assert follower.expect((filename, 'recreated\n'))
+
+    write(filename, 'trunc\n', mode='w')
+    assert follower.expect((filename, 'trunc\n'))
+
+
+def test_follow_missing():
+  with temporary_dir() as td:
+    filename = os.path.join(td, 'log')
+    follower = Follower([filename])
+    assert follower.idle()
+    write(filename, '')
+    assert follower.idle()
+    write(filename, 'hello\n')
+    assert follower.expect((filename, 'hello\n'))
+
+    follower = Follower([filename, os.path.join(td, 'missing')], forever=False)
+    assert follower.expect((filename, 'hello'))
+    os.unlink(filename)
+    assert follower.lines.get(timeout=5) is None
+
+
+def test_follow_symlink():
+  # The layout of twitter.common.log: app.INFO links to the current log file.
+  with temporary_dir() as td:
+    link, target = os.path.join(td, 'app.INFO'), os.path.join(td, 'app.host.log.INFO.1')
+    write(target, 'hello\n')
+    os.symlink(os.path.basename(target), link)
+    follower = Follower([link])
+    assert follower.expect((link, 'hello'))
+
+    write(target, 'appended\n')
+    assert follower.expect((link, 'appended\n'))
+
+    # Rotate by atomically pointing the link at a new file.
+    new_target = os.path.join(td, 'app.host.log.INFO.2')
+    write(new_target, 'rotated\n')
+    os.symlink(os.path.basename(new_target), link + '.tmp')
+    os.rename(link + '.tmp', link)
+    assert follower.expect((link, 'rotated\n'))
+    write(new_target, 'appended again\n')
+    assert follower.expect((link, 'appended again\n'))
+    write(target, 'old file\n')
+    assert follower.idle()
+
+
+def test_follow_symlinked_directory():
+  with temporary_dir() as td:
+    os.mkdir(os.path.join(td, 'real'))
+    os.symlink('real', os.path.join(td, 'logs'))
+    filename = os.path.join(td, 'logs', 'log')
+    write(filename, '')
+    follower = Follower([filename])
+    assert follower.idle()
+    write(os.path.join(td, 'real', 'log'), 'hello\n')
+    assert follower.expect((filename, 'hello\n'))
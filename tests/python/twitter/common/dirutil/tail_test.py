@@ -18,12 +18,15 @@ from __future__ import print_function
 
 import os
 import copy
+import random
 import threading
 import tempfile
 import time
 import sys
+from twitter.common.contextutil import temporary_file
 from twitter.common.lang import Compatibility
 from twitter.common.dirutil import tail_f
+from twitter.common.dirutil.tail import reverse_lines, tail
 
 if Compatibility.PY3:
   import unittest
@@ -139,3 +142,52 @@ class TestTail(unittest.TestCase):
     self.write_to_fp('hello 3')
     self._thread.clock().tick()
     assert self._thread.clear() == ['hello 3']
+
+
+class CountingFile(object):
+  def __init__(self, fp):
+    self._fp = fp
+    self.bytes_read = 0
+
+  def seek(self, *args):
+    return self._fp.seek(*args)
+
+  def tell(self):
+    return self._fp.tell()
+
+  def read(self, size=-1):
+    data = self._fp.read(size)
+    self.bytes_read += len(data)
+    return data
+
+
+class TestReverseLines(unittest.TestCase):
+  def test_reverse_lines(self):
+    rng = random.Random(31337)
+    contents = ['', '\n', '\n\n', 'a', 'a\n', '\na', 'a\nb', 'a\r\nb\r\n', 'a\n\nb\n\n']
+    for k in range(50):
+      contents.append(''.join(rng.choice('ab\n') for _ in range(rng.randint(0, 200))))
+    for content in contents:
+      with temporary_file() as fp:
+        fp.write(content)
+        fp.flush()
+        for block_size in (1, 2, 3, 7, 8192):
+          assert list(reverse_lines(fp, block_size=block_size)) == (
+              list(reversed(content.splitlines()))), (content, block_size)
+
+  def test_tail(self):
+    with temporary_file() as fp:
+      lines = ['line %d %s' % (k, 'x' * (k % 300)) for k in range(1000)]
+      fp.write('\n'.join(lines) + '\n')
+      fp.flush()
+      assert list(tail(fp.name, lines=10)) == lines[-10:]
+      assert list(tail(fp.name, lines=2000)) == lines
+      assert list(tail(fp.name, lines=0)) == []
+
+  def test_reads_only_the_tail(self):
+    with temporary_file() as fp:
+      fp.write('x' * 10000 + '\n' + 'y' * 100 + '\n' + 'z' * 100 + '\n')
+      fp.flush()
+      counting_fp = CountingFile(fp)
+      assert next(reverse_lines(counting_fp, block_size=64)) == 'z' * 100
+      assert counting_fp.bytes_read < 200
@@ -0,0 +1,124 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+"""
+Benchmark for twitter.common.log.formatters.glog.
+
+Formats a stream of synthetic records, many per second of wall-clock time, with GlogFormatter
+and with the formatter it replaced (which called time.localtime for every record), checks that
+their output is identical and writes records/second as JSON:
+
+  $ ./pants py tests/python/twitter/common/log:benchmark_glog_formatter -- --records=1000000
+"""
+
+from __future__ import print_function
+
+import json
+import logging
+import optparse
+import platform
+import sys
+import time
+
+from twitter.common.log.formatters.base import format_message
+from twitter.common.log.formatters.glog import GlogFormatter
+
+
+class LegacyGlogFormatter(logging.Formatter):
+  """GlogFormatter as it was before caching timestamps, for comparison."""
+
+  def format(self, record):
+    try:
+      level = GlogFormatter.LEVEL_MAP[record.levelno]
+    except:
+      level = '?'
+    date = time.localtime(record.created)
+    date_usec = (record.created - int(record.created)) * 1e6
+    record_message = '%c%02d%02d %02d:%02d:%02d.%06d %s %s:%d] %s' % (
+       level, date.tm_mon, date.tm_mday, date.tm_hour, date.tm_min, date.tm_sec, date_usec,
+       record.process if record.process is not None else '?????',
+       record.filename,
+       record.lineno,
+       format_message(record))
+    record.getMessage = lambda: record_message
+    return logging.Formatter.format(self, record)
+
+
+FORMATTERS = {
+  'legacy': LegacyGlogFormatter,
+  'glog': GlogFormatter,
+}
+
+
+def make_records(count, records_per_second):
+  levels = (logging.DEBUG, logging.INFO, logging.INFO, logging.INFO, logging.WARN, logging.ERROR)
+  start = time.time()
+  records = []
+  for k in range(count):
+    record = logging.LogRecord('benchmark', levels[k % len(levels)], '/src/service/handler.py',
+        100 + k % 50, 'request %d served in %.2fms', (k, k % 1000 / 10.0), None)
+    record.created = start + float(k) / records_per_second
+    records.append(record)
+  return records
+
+
+def bench(formatter, records):
+  start = time.time()
+  output = [formatter.format(record) for record in records]
+  return time.time() - start, output
+
+
+def main(args):
+  parser = optparse.OptionParser(usage='%prog [options]')
+  parser.add_option('--records', type='int', default=200000,
+      help='Number of records to format [default: %default]')
+  parser.add_option('--records_per_second', type='int', default=1000,
+      help='Rate of the synthetic records in wall-clock time [default: %default]')
+  parser.add_option('--output', default=None,
+      help='Write JSON results to this file instead of stdout.')
+  options, _ = parser.parse_args(args)
+
+  records = make_records(options.records, options.records_per_second)
+  results, outputs = [], {}
+  for name in sorted(FORMATTERS):
+    elapsed, outputs[name] = bench(FORMATTERS[name](), records)
+    results.append({
+      'benchmark': name,
+      'records': options.records,
+      'elapsed_secs': elapsed,
+      'records_per_sec': options.records / elapsed if elapsed > 0 else None,
+    })
+    print('%-8s %12.0f records/sec' % (name, results[-1]['records_per_sec'] or 0),
+          file=sys.stderr)
+  if outputs['glog'] != outputs['legacy']:
+    print('Output of glog and legacy formatters differs!', file=sys.stderr)
+    sys.exit(1)
+
+  report = {
+    'python': platform.python_version(),
+    'implementation': platform.python_implementation(),
+    'timestamp': time.time(),
+    'results': results,
+  }
+  if options.output:
+    with open(options.output, 'w') as fp:
+      json.dump(report, fp, indent=2, sort_keys=True)
+  else:
+    print(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == '__main__':
+  main(sys.argv[1:])
@@ -0,0 +1,159 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+"""
+Benchmarks for twitter.common.log.parsers.
+
+Parses a large synthetic glog file, in which a fraction of the lines are continuation lines that
+match no parser, and writes lines/second as JSON.  The strptime benchmark measures the
+exception-driven strptime parser that GlogLine and ZooLine used to be, for comparison:
+
+  $ ./pants py tests/python/twitter/common/log:benchmark_parsers -- --lines=1000000
+"""
+
+from __future__ import print_function
+
+from datetime import datetime
+import json
+import optparse
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+from twitter.common.log.parsers import GlogLine, Line, ZooLine
+from twitter.common.log.reader import Stream
+
+
+def synthesize(filename, lines, continuation_fraction):
+  rng = random.Random(31337)
+  timestamp = 0
+  with open(filename, 'w') as fp:
+    for k in range(lines):
+      if rng.random() < continuation_fraction:
+        fp.write('  continuation of the previous line %d\n' % k)
+        continue
+      timestamp += rng.randint(0, 50000)
+      seconds, micros = divmod(timestamp, 1000000)
+      minutes, seconds = divmod(seconds, 60)
+      hours, minutes = divmod(minutes, 60)
+      fp.write('%s11%02d %02d:%02d:%02d.%06d 14209 executor_base.py:43] message %d\n' % (
+          rng.choice('IWEF'), 1 + hours // 24, hours % 24, minutes, seconds, micros, k))
+
+
+def strptime_parse(line):
+  """The strptime parser, as previously used by GlogLine and ZooLine."""
+  def glog(line):
+    if len(line) == 0 or line[0] not in 'IWEFD':
+      raise ValueError
+    sline = line[1:].split(' ')
+    if len(sline) < 2:
+      raise ValueError
+    t = datetime.strptime(''.join(['2013', sline[0], ' ', sline[1]]), '%Y%m%d %H:%M:%S.%f')
+    return GlogLine(line, GlogLine.LEVEL_MAP[line[0]], t, sline[2], sline[3], ' '.join(sline[4:]))
+
+  def zoo(line):
+    sline = line.split(':')
+    if len(sline) < 6:
+      raise ValueError
+    t = datetime.strptime(':'.join(sline[0:3]), '%Y-%m-%d %H:%M:%S,%f')
+    return ZooLine(line, 0, t, sline[3], sline[4], ':'.join(sline[5:]))
+
+  for parser in (glog, zoo):
+    try:
+      return parser(line)
+    except ValueError:
+      continue
+
+
+def bench_strptime(filename):
+  with open(filename) as fp:
+    for line in fp:
+      strptime_parse(line.rstrip('\n'))
+
+
+def bench_parse_order(filename):
+  with open(filename) as fp:
+    for line in fp:
+      Line.parse_order(line.rstrip('\n'), GlogLine, ZooLine)
+
+
+def bench_stream(filename):
+  stream = Stream(filename, (GlogLine, ZooLine))
+  while stream.next() is not Stream.EOF:
+    pass
+
+
+BENCHMARKS = {
+  'strptime': bench_strptime,
+  'parse_order': bench_parse_order,
+  'stream': bench_stream,
+}
+
+
+def main(args):
+  parser = optparse.OptionParser(usage='%prog [options]')
+  parser.add_option('--benchmarks', default='strptime,parse_order,stream',
+      help='Comma-separated benchmarks to run [default: %default]')
+  parser.add_option('--lines', type='int', default=500000,
+      help='Number of lines in the synthetic log [default: %default]')
+  parser.add_option('--continuation_fraction', type='float', default=0.1,
+      help='Fraction of continuation lines [default: %default]')
+  parser.add_option('--output', default=None,
+      help='Write JSON results to this file instead of stdout.')
+  options, _ = parser.parse_args(args)
+
+  benchmarks = options.benchmarks.split(',')
+  for name in benchmarks:
+    if name not in BENCHMARKS:
+      parser.error('Unknown benchmark %s, choose from %s' % (name, ', '.join(sorted(BENCHMARKS))))
+
+  fd, filename = tempfile.mkstemp()
+  os.close(fd)
+  results = []
+  try:
+    synthesize(filename, options.lines, options.continuation_fraction)
+    for name in benchmarks:
+      start = time.time()
+      BENCHMARKS[name](filename)
+      elapsed = time.time() - start
+      results.append({
+        'benchmark': name,
+        'lines': options.lines,
+        'elapsed_secs': elapsed,
+        'lines_per_sec': options.lines / elapsed if elapsed > 0 else None,
+      })
+      print('%-12s %12.0f lines/sec' % (name, results[-1]['lines_per_sec'] or 0), file=sys.stderr)
+  finally:
+    os.unlink(filename)
+
+  report = {
+    'python': platform.python_version(),
+    'implementation': platform.python_implementation(),
+    'timestamp': time.time(),
+    'results': results,
+  }
+  if options.output:
+    with open(options.output, 'w') as fp:
+      json.dump(report, fp, indent=2, sort_keys=True)
+  else:
+    print(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == '__main__':
+  main(sys.argv[1:])
@@ -0,0 +1,202 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import logging
+import logging.handlers
+import os
+import threading
+
+import pytest
+
+from twitter.common.contextutil import temporary_dir
+from twitter.common.log.handlers import AsyncHandler
+
+
+def make_record(message, level=logging.INFO):
+  return logging.LogRecord('test', level, __file__, 0, message, (), None)
+
+
+def make_file_handler(filename, level=logging.DEBUG):
+  handler = logging.FileHandler(filename)
+  handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+  handler.setLevel(level)
+  return handler
+
+
+class SlowHandler(logging.Handler):
+  """A handler that records messages once it is released."""
+  def __init__(self):
+    logging.Handler.__init__(self)
+    self.messages = []
+    self.release_writes = threading.Event()
+
+  def emit(self, record):
+    self.release_writes.wait()
+    self.messages.append(record.getMessage())
+
+
+def test_writes_batches_to_files():
+  with temporary_dir() as td:
+    info, error = os.path.join(td, 'INFO'), os.path.join(td, 'ERROR')
+    handler = AsyncHandler([make_file_handler(info), make_file_handler(error, logging.ERROR)],
+                           batch_size=7)
+    for k in range(100):
+      handler.handle(make_record('message %d' % k, logging.ERROR if k % 10 == 0 else logging.INFO))
+    assert handler.flush(timeout=10)
+    assert handler.queue_depth() == 0
+    with open(info) as fp:
+      assert fp.read().splitlines() == [
+          '%s message %d' % ('ERROR' if k % 10 == 0 else 'INFO', k) for k in range(100)]
+    with open(error) as fp:
+      assert fp.read().splitlines() == ['ERROR message %d' % k for k in range(0, 100, 10)]
+    handler.close()
+
+
+def test_close_drains_queue():
+  with temporary_dir() as td:
+    filename = os.path.join(td, 'log')
+    handler = AsyncHandler([make_file_handler(filename)], flush_interval=60)
+    for k in range(1000):
+      handler.emit(make_record('message %d' % k))
+    handler.close()
+    with open(filename) as fp:
+      assert len(fp.read().splitlines()) == 1000
+    assert handler.dropped() == 0
+
+
+def test_overflow_drop():
+  target = SlowHandler()
+  handler = AsyncHandler([target], max_queue=5, overflow=AsyncHandler.DROP, batch_size=1)
+  try:
+    for k in range(20):
+      handler.emit(make_record('message %d' % k))
+    # At most one record is held by the writer and max_queue are queued.
+    assert handler.dropped() >= 20 - 6
+    assert handler.queue_depth() <= 6
+  finally:
+    target.release_writes.set()
+    handler.close()
+  assert len(target.messages) + handler.dropped() == 20
+
+
+def test_overflow_block():
+  target = SlowHandler()
+  handler = AsyncHandler([target], max_queue=5, overflow=AsyncHandler.BLOCK, batch_size=1,
+                         flush_interval=0.01)
+  emitter = threading.Thread(target=lambda: [handler.emit(make_record('message %d' % k))
+                                             for k in range(20)])
+  emitter.start()
+  emitter.join(0.2)
+  assert emitter.is_alive()
+  target.release_writes.set()
+  emitter.join(10)
+  assert not emitter.is_alive()
+  handler.close()
+  assert target.messages == ['message %d' % k for k in range(20)]
+  assert handler.dropped() == 0
+
+
+def test_bad_overflow_policy():
+  with pytest.raises(ValueError):
+    AsyncHandler([], overflow='explode')
+
+
+def test_mixed_byte_and_unicode_messages():
+  with temporary_dir() as td:
+    filename = os.path.join(td, 'log')
+    handler = AsyncHandler([make_file_handler(filename)], batch_size=10)
+    messages = [b'caf\xc3\xa9 bytes', u'caf\xe9 unicode', 'plain']
+    for message in messages:
+      handler.emit(make_record(message))
+    handler.close()
+    with open(filename, 'rb') as fp:
+      assert fp.read().decode('utf-8').splitlines() == [
+          u'INFO caf\xe9 bytes', u'INFO caf\xe9 unicode', u'INFO plain']
+
+
+class BrokenHandler(logging.Handler):
+  def __init__(self):
+    logging.Handler.__init__(self)
+    self.errors = 0
+
+  def emit(self, record):
+    raise RuntimeError('broken')
+
+  def handleError(self, record):
+    self.errors += 1
+
+
+def test_writer_survives_broken_handler():
+  with temporary_dir() as td:
+    filename = os.path.join(td, 'log')
+    broken = BrokenHandler()
+    broken.handle = broken.emit
+    handler = AsyncHandler([broken, make_file_handler(filename)], batch_size=1)
+    for k in range(5):
+      handler.emit(make_record('message %d' % k))
+    assert handler.flush(timeout=10)
+    handler.close()
+    assert broken.errors == 5
+    with open(filename) as fp:
+      assert fp.read().splitlines() == ['INFO message %d' % k for k in range(5)]
+
+
+def test_overflow_block_without_writer():
+  target = SlowHandler()
+  handler = AsyncHandler([target], max_queue=5, overflow=AsyncHandler.BLOCK, batch_size=1,
+                         flush_interval=0.01)
+  writer = handler._thread
+  handler._thread = threading.Thread(target=lambda: None)
+  handler._thread.start()
+  handler._thread.join()
+  try:
+    for k in range(20):
+      handler.emit(make_record('message %d' % k))
+    assert handler.queue_depth() <= 6
+    assert handler.dropped() >= 20 - 6
+  finally:
+    target.release_writes.set()
+    handler._thread = writer
+    handler.close()
+  assert len(target.messages) + handler.dropped() == 20
+
+
+def test_handlers_overriding_emit():
+  with temporary_dir() as td:
+    filename = os.path.join(td, 'x.log')
+    rotating = logging.handlers.RotatingFileHandler(filename, maxBytes=200, backupCount=3)
+    rotating.setFormatter(logging.Formatter('%(message)s'))
+    slow = SlowHandler()
+    slow.release_writes.set()
+    handler = AsyncHandler([rotating, slow], batch_size=50)
+    for k in range(100):
+      handler.emit(make_record('message %03d' % k))
+    handler.close()
+    assert os.path.getsize(filename) <= 200
+    assert os.path.exists(filename + '.3')
+    assert len(slow.messages) == 100
+
+
+def test_delayed_file_handler():
+  with temporary_dir() as td:
+    filename = os.path.join(td, 'log')
+    file_handler = logging.FileHandler(filename, delay=True)
+    file_handler.setFormatter(logging.Formatter('%(message)s'))
+    handler = AsyncHandler([file_handler])
+    handler.emit(make_record('delayed'))
+    handler.close()
+    with open(filename) as fp:
+      assert fp.read() == 'delayed\n'
@@ -0,0 +1,301 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import logging
+import socket
+import threading
+import time
+
+import pytest
+
+from twitter.common.log import handlers
+from twitter.common.log.handlers import AsyncScribeHandler
+
+try:
+  from scribe import scribe
+  from thrift.protocol import TBinaryProtocol
+  from thrift.transport import TTransport, TSocket
+  _SCRIBE_PRESENT = True
+except ImportError:
+  _SCRIBE_PRESENT = False
+
+
+_CATEGORY = 'python_default'
+_HOST = '127.0.0.1'
+
+requires_scribe = pytest.mark.skipif('not _SCRIBE_PRESENT')
+
+
+class FakeScribe(object):
+  """A scribe server on a local port that records the messages it accepts."""
+
+  def __init__(self, results=()):
+    self.messages = []
+    self.calls = 0
+    self.connections = 0
+    self._results = list(results)
+    self._lock = threading.Lock()
+    self._socket = TSocket.TServerSocket(host=_HOST, port=0)
+    self._socket.listen()
+    self.port = self._socket.handle.getsockname()[1]
+    thread = threading.Thread(target=self._serve)
+    thread.daemon = True
+    thread.start()
+
+  def Log(self, messages):
+    with self._lock:
+      self.calls += 1
+      if self._results:
+        result = self._results.pop(0)
+        if result != scribe.ResultCode.OK:
+          return result
+      self.messages.extend(entry.message for entry in messages)
+      return scribe.ResultCode.OK
+
+  def _serve(self):
+    while True:
+      try:
+        client = self._socket.accept()
+      except Exception:
+        return
+      with self._lock:
+        self.connections += 1
+      thread = threading.Thread(target=self._handle, args=(client,))
+      thread.daemon = True
+      thread.start()
+
+  def _handle(self, client):
+    transport = TTransport.TFramedTransport(client)
+    protocol = TBinaryProtocol.TBinaryProtocol(transport)
+    processor = scribe.Processor(self)
+    try:
+      while True:
+        processor.process(protocol, protocol)
+    except (TTransport.TTransportException, EOFError):
+      pass
+    finally:
+      transport.close()
+
+  def close(self):
+    self._socket.handle.shutdown(socket.SHUT_RDWR)
+    self._socket.close()
+
+
+def unavailable_port():
+  """Returns a bound socket that refuses connections, and its port."""
+  sock = socket.socket()
+  sock.bind((_HOST, 0))
+  return sock, sock.getsockname()[1]
+
+
+def make_record(message):
+  return logging.LogRecord('test', logging.INFO, __file__, 0, message, (), None)
+
+
+def make_handler(server, **kw):
+  handler = AsyncScribeHandler(category=_CATEGORY, host=_HOST, port=server.port, **kw)
+  handler.setFormatter(logging.Formatter('%(message)s'))
+  return handler
+
+
+@requires_scribe
+def test_batches_over_one_connection():
+  server = FakeScribe()
+  handler = make_handler(server, batch_size=10, flush_interval=60)
+  try:
+    for k in range(100):
+      handler.emit(make_record('message %d' % k))
+    assert handler.flush(timeout=10)
+    assert server.messages == ['message %d' % k for k in range(100)]
+    assert server.calls <= 11
+    assert server.connections == 1
+  finally:
+    handler.close()
+    server.close()
+
+
+@requires_scribe
+def test_flush_interval():
+  server = FakeScribe()
+  handler = make_handler(server, batch_size=1000, flush_interval=0.05)
+  try:
+    handler.emit(make_record('lonely'))
+    deadline = time.time() + 10
+    while not server.messages and time.time() < deadline:
+      time.sleep(0.01)
+    assert server.messages == ['lonely']
+  finally:
+    handler.close()
+    server.close()
+
+
+@requires_scribe
+def test_retry_with_backoff():
+  server = FakeScribe(results=[scribe.ResultCode.TRY_LATER] * 3)
+  handler = make_handler(server, batch_size=1, max_backoff=0.05)
+  try:
+    handler.emit(make_record('eventually'))
+    assert handler.flush(timeout=10)
+    assert server.messages == ['eventually']
+    assert server.calls == 4
+  finally:
+    handler.close()
+    server.close()
+
+
+@requires_scribe
+def test_unavailable():
+  sock, port = unavailable_port()
+  handler = AsyncScribeHandler(category=_CATEGORY, host=_HOST, port=port, batch_size=1,
+                               max_backoff=0.05, close_timeout=0.1)
+  try:
+    handler.emit(make_record('unavailable'))
+    assert not handler.flush(timeout=0.2)
+    assert handler.messages_pending
+  finally:
+    handler.close()
+    sock.close()
+  assert handler.dropped == 1
+
+
+@requires_scribe
+def test_overflow_drop_oldest():
+  sock, port = unavailable_port()
+  handler = AsyncScribeHandler(category=_CATEGORY, host=_HOST, port=port, max_queue=5,
+                               batch_size=100, flush_interval=60, close_timeout=0)
+  try:
+    for k in range(8):
+      handler.emit(make_record('message %d' % k))
+    assert [entry.message for entry in handler._queue] == ['message %d' % k for k in range(3, 8)]
+    assert handler.dropped == 3
+  finally:
+    handler.close()
+    sock.close()
+
+
+@requires_scribe
+def test_overflow_block():
+  server = FakeScribe()
+  handler = make_handler(server, max_queue=2, overflow='block', batch_size=2, flush_interval=60)
+  try:
+    for k in range(20):
+      handler.emit(make_record('message %d' % k))
+    assert handler.flush(timeout=10)
+    assert server.messages == ['message %d' % k for k in range(20)]
+    assert handler.dropped == 0
+  finally:
+    handler.close()
+    server.close()
+
+
+def test_bad_overflow_policy(stub_scribe):
+  with pytest.raises(ValueError):
+    AsyncScribeHandler(category=_CATEGORY, host=_HOST, port=1463, overflow='explode')
+
+
+class StubScribeModule(object):
+  """Stands in for the scribe bindings, so that the sender can be tested without them."""
+
+  class LogEntry(object):
+    def __init__(self, category, message):
+      self.category = category
+      self.message = message
+
+  class ResultCode(object):
+    OK = 0
+    TRY_LATER = 1
+
+
+@pytest.fixture
+def stub_scribe(monkeypatch):
+  monkeypatch.setattr(handlers, '_SCRIBE_PRESENT', True)
+  monkeypatch.setattr(handlers, 'scribe', StubScribeModule, raising=False)
+
+
+class StubClient(object):
+  """A scribe client that fails or returns the given results before accepting messages."""
+
+  def __init__(self, failures=()):
+    self.messages = []
+    self.calls = 0
+    self.connections = 0
+    self.release = threading.Event()
+    self.release.set()
+    self._failures = list(failures)
+
+  def Log(self, messages):
+    self.release.wait()
+    self.calls += 1
+    if self._failures:
+      failure = self._failures.pop(0)
+      if isinstance(failure, Exception):
+        raise failure
+      return failure
+    self.messages.extend(entry.message for entry in messages)
+    return StubScribeModule.ResultCode.OK
+
+
+class StubScribeHandler(AsyncScribeHandler):
+  def __init__(self, client, **kw):
+    self.client = client
+    AsyncScribeHandler.__init__(self, category=_CATEGORY, host=_HOST, port=1463, **kw)
+    self.setFormatter(logging.Formatter('%(message)s'))
+
+  def _connect(self):
+    self.client.connections += 1
+    self._client = self.client
+
+
+def test_sender_survives_errors(stub_scribe):
+  client = StubClient(failures=[socket.error('reset'), EOFError(), RuntimeError('protocol'),
+                                StubScribeModule.ResultCode.TRY_LATER, ValueError('bad frame')])
+  handler = StubScribeHandler(client, max_queue=2, overflow='block', batch_size=1,
+                              max_backoff=0.01)
+  emitter = threading.Thread(target=lambda: [handler.emit(make_record('message %d' % k))
+                                             for k in range(10)])
+  emitter.daemon = True
+  try:
+    emitter.start()
+    emitter.join(10)
+    assert not emitter.is_alive()
+    assert handler.flush(timeout=10)
+    assert client.messages == ['message %d' % k for k in range(10)]
+    assert client.calls == 15
+    # Each exception drops the connection; a TRY_LATER result does not.
+    assert client.connections == 5
+  finally:
+    handler.close()
+
+
+def test_concurrent_flushes(stub_scribe):
+  client = StubClient()
+  client.release.clear()
+  handler = StubScribeHandler(client, batch_size=100, flush_interval=60)
+  try:
+    handler.emit(make_record('first'))
+    results = []
+    flusher = threading.Thread(target=lambda: results.append(handler.flush(timeout=10)))
+    flusher.start()
+    # A flush that gives up while the first batch is being sent must not cancel the other.
+    assert not handler.flush(timeout=0.05)
+    handler.emit(make_record('second'))
+    client.release.set()
+    flusher.join(10)
+    assert results == [True]
+    assert client.messages == ['first', 'second']
+  finally:
+    client.release.set()
+    handler.close()
@@ -0,0 +1,75 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import logging
+import sys
+import time
+
+from twitter.common.log.formatters.glog import GlogFormatter
+
+
+def make_record(msg, args=(), level=logging.INFO, created=None, process=1234, exc_info=None):
+  record = logging.LogRecord('test', level, '/path/to/source.py', 42, msg, args, exc_info)
+  if created is not None:
+    record.created = created
+  record.process = process
+  return record
+
+
+def expected_line(record, message):
+  date = time.localtime(record.created)
+  return '%s%02d%02d %02d:%02d:%02d.%06d %s source.py:42] %s' % (
+      GlogFormatter.LEVEL_MAP.get(record.levelno, '?'), date.tm_mon, date.tm_mday, date.tm_hour,
+      date.tm_min, date.tm_sec, (record.created - int(record.created)) * 1e6,
+      record.process if record.process is not None else '?????', message)
+
+
+def test_format():
+  formatter = GlogFormatter()
+  start = time.mktime((2013, 3, 9, 23, 59, 58, 0, 0, -1))
+  for k, created in enumerate([start + 0.000001, start + 0.5, start + 0.999999, start + 1,
+                               start + 1.25, start + 2.75, start + 2.8, start + 3600.5]):
+    record = make_record('message %d: %s', (k, 'hello'), created=created)
+    assert formatter.format(record) == expected_line(record, 'message %d: hello' % k)
+    assert record.message == formatter.format(record)
+
+
+def test_format_levels_and_pid():
+  formatter = GlogFormatter()
+  for level, letter in ((logging.DEBUG, 'D'), (logging.INFO, 'I'), (logging.WARN, 'W'),
+                        (logging.ERROR, 'E'), (logging.FATAL, 'F'), (logging.INFO + 1, '?')):
+    assert formatter.format(make_record('x', level=level)).startswith(letter)
+  for process, pid in ((1234, '1234'), (None, '?????'), (5678, '5678')):
+    assert formatter.format(make_record('x', process=process)).split(' ')[2] == pid
+
+
+def test_format_bad_args():
+  formatter = GlogFormatter()
+  record = make_record('100%% %s %s', ('too few',))
+  assert formatter.format(record) == expected_line(record, '100%% %s %s')
+
+
+def test_format_exception():
+  formatter = GlogFormatter()
+  try:
+    raise ValueError('broken')
+  except ValueError:
+    record = make_record('failed', exc_info=sys.exc_info())
+  formatted = formatter.format(record)
+  first_line, traceback = formatted.split('\n', 1)
+  assert first_line == expected_line(record, 'failed')
+  assert traceback.startswith('Traceback')
+  assert traceback.endswith('ValueError: broken')
@@ -0,0 +1,121 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+from datetime import datetime
+
+import pytest
+
+from twitter.common.log.parsers import GlogLine, Level, Line, ZooLine
+
+
+CURRENT_YEAR = datetime.now().year
+
+
+def test_glog_line():
+  line = GlogLine.parse('W1101 18:39:49.557605 14209 executor_base.py:43] Executor  [None]: ok')
+  assert line.level == Level.WARNING
+  assert line.datetime == datetime(CURRENT_YEAR, 11, 1, 18, 39, 49, 557605)
+  assert line.pid == '14209'
+  assert line.source == 'executor_base.py:43]'
+  assert line.message == 'Executor  [None]: ok'
+
+  line = GlogLine.parse('E1101 19:00:00.000001 1 a.py:1]')
+  assert line.datetime == datetime(CURRENT_YEAR, 11, 1, 19, 0, 0, 1)
+  assert line.message == ''
+
+  level, dt, rest = GlogLine.split_time('I1101 18:39:49.557605 14209 a.py:43] hello world')
+  assert (level, dt, rest) == (Level.INFO, datetime(CURRENT_YEAR, 11, 1, 18, 39, 49, 557605),
+                               ['14209', 'a.py:43]', 'hello', 'world'])
+
+
+@pytest.mark.parametrize('text', [
+  '',
+  'resources {',
+  '  value: 0.25',
+  'X1101 18:39:49.557605 14209 a.py:43] bad level',
+  'I1101 18:39:49.557605 14209',
+  'I1101 18:39:49. 14209 a.py:43] no microseconds',
+  'I1101 18:39:49.5576050 14209 a.py:43] long microseconds',
+  'I1301 18:39:49.557605 14209 a.py:43] bad month',
+  'I1101 24:39:49.557605 14209 a.py:43] bad hour',
+  'I1101 18:60:49.557605 14209 a.py:43] bad minute',
+  'I11a1 18:39:49.557605 14209 a.py:43] bad digit',
+  '2012-11-01 18:39:49,557:12345(0x7f):ZOO_INFO@log_env@658: not glog',
+])
+def test_glog_line_rejects(text):
+  assert GlogLine.try_parse(text) is None
+  with pytest.raises(ValueError):
+    GlogLine.parse(text)
+
+
+def test_zoo_line():
+  line = ZooLine.parse(
+      '2012-11-01 18:39:49,557:12345(0x7f):ZOO_INFO@log_env@658: Client environment:host')
+  assert line.level == Level.INFO
+  assert line.datetime == datetime(2012, 11, 1, 18, 39, 49, 557000)
+  assert line.pid == '12345(0x7f)'
+  assert line.source == 'log_env@658'
+  assert line.message == ' Client environment:host'
+  assert ZooLine.parse('2012-11-01 18:39:49,557:1:ZOO_BOGUS@x:y').level == 0
+
+
+@pytest.mark.parametrize('text', [
+  '',
+  'I1101 18:39:49.557605 14209 a.py:43] not zookeeper',
+  '2012-11-01 18:39:49,557:12345:ZOO_INFO@too few fields',
+  '2012-13-01 18:39:49,557:1:ZOO_INFO@x:bad month',
+  '2012-11-01 18:39:49.557:1:ZOO_INFO@x:bad separator',
+  '2012-11-01 18:39:49,:1:ZOO_INFO@x:no milliseconds',
+])
+def test_zoo_line_rejects(text):
+  assert ZooLine.try_parse(text) is None
+  with pytest.raises(ValueError):
+    ZooLine.parse(text)
+
+
+def test_short_fractions():
+  # As with strptime's %f, fractional seconds may have fewer digits than usual.
+  line = GlogLine.parse('I1101 18:39:49.55760 14209 a.py:43] five digits')
+  assert line.datetime == datetime(CURRENT_YEAR, 11, 1, 18, 39, 49, 557600)
+  assert (line.pid, line.source, line.message) == ('14209', 'a.py:43]', 'five digits')
+  assert GlogLine.split_time('I1101 18:39:49.5 1 a.py:43] x')[2] == ['1', 'a.py:43]', 'x']
+
+  line = ZooLine.parse('2012-11-01 18:39:49,55:1:ZOO_INFO@x:two digits')
+  assert line.datetime == datetime(2012, 11, 1, 18, 39, 49, 550000)
+  assert (line.pid, line.source, line.message) == ('1', 'x', 'two digits')
+  line = ZooLine.parse('2012-11-01 18:39:49,557123:1:ZOO_INFO@x:six digits')
+  assert line.datetime == datetime(2012, 11, 1, 18, 39, 49, 557123)
+
+
+def test_hour_cache():
+  # Consecutive lines in the same hour, then a different hour, then an invalid hour.
+  for text, expected in (
+      ('I1101 18:00:00.000000 1 a.py:1] x', datetime(CURRENT_YEAR, 11, 1, 18)),
+      ('I1101 18:59:59.000000 1 a.py:1] x', datetime(CURRENT_YEAR, 11, 1, 18, 59, 59)),
+      ('I1102 03:00:00.000000 1 a.py:1] x', datetime(CURRENT_YEAR, 11, 2, 3)),
+      ('I1132 03:00:00.000000 1 a.py:1] x', None),
+      ('I1132 03:00:01.000000 1 a.py:1] x', None),
+      ('I1101 18:00:00.000000 1 a.py:1] x', datetime(CURRENT_YEAR, 11, 1, 18))):
+    line = GlogLine.try_parse(text)
+    assert (line and line.datetime) == expected
+
+
+def test_parse_order():
+  glog = 'I1101 18:39:49.557605 14209 a.py:43] hello'
+  zoo = '2012-11-01 18:39:49,557:1:ZOO_INFO@x:hello'
+  assert isinstance(Line.parse_order(glog, ZooLine, GlogLine), GlogLine)
+  assert isinstance(Line.parse_order(zoo, GlogLine, ZooLine), ZooLine)
+  assert Line.parse_order('  continuation', GlogLine, ZooLine) is None
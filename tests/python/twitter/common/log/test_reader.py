@@ -14,6 +14,7 @@
 # limitations under the License.
 # ==================================================================================================
 
+from datetime import datetime
 import os
 
 from twitter.common.lang import Compatibility
@@ -21,7 +22,8 @@ from twitter.common.log.parsers import GlogLine
 from twitter.common.log.reader import (
   Buffer,
   Stream,
-  StreamMuxer)
+  StreamMuxer,
+  TimeIndex)
 
 
 TEST_GLOG_LINES = """
@@ -46,6 +48,7 @@ I1101 18:39:50.000000 14209 executor_base.py:43] Executor [None]:    Yet another
   lines
 """
 
+CURRENT_YEAR = datetime.now().year
 TEST_GLOG_LINES_LENGTH = len(TEST_GLOG_LINES.split('\n'))
 
 
@@ -128,3 +131,79 @@ def test_stream():
   write_and_rewind(writer, lines[2].raw)
   assert stream.next() == lines[1]
 
+
+
+def glog_line(second, message):
+  return 'I1101 18:39:%02d.000000 14209 executor_base.py:43] %s' % (second, message)
+
+
+def test_stream_muxer():
+  streams = []
+  for k in range(20):
+    lines = [glog_line(second, 'stream %d' % k) for second in range(k % 3, 60, 3 + k % 4)]
+    streams.append((Stream(Compatibility.StringIO('\n'.join(lines)), (GlogLine,)), k))
+  muxer = StreamMuxer(streams)
+  merged = read_all(muxer, terminator=Stream.EOF)
+  assert len(merged) == sum(len(range(k % 3, 60, 3 + k % 4)) for k in range(20))
+  assert [line.datetime for _, line in merged] == sorted(line.datetime for _, line in merged)
+  for label, line in merged:
+    assert line.message == 'stream %d' % label
+  assert muxer.next() is Stream.EOF
+
+
+def test_stream_muxer_infinite():
+  writers = [Compatibility.StringIO() for _ in range(2)]
+  muxer = StreamMuxer((Stream(writer, (GlogLine,), infinite=True), k)
+                      for k, writer in enumerate(writers))
+  assert muxer.next() is None
+  write_and_rewind(writers[0], glog_line(1, 'first') + '\n' + glog_line(3, 'third') + '\n')
+  write_and_rewind(writers[1], glog_line(2, 'second') + '\n' + glog_line(4, 'fourth') + '\n')
+  assert [muxer.next()[1].message for _ in range(2)] == ['first', 'second']
+  assert muxer.next() is None
+
+
+def timed_log(minutes):
+  lines = []
+  for second in range(minutes * 60):
+    lines.append(glog_line(second % 60, 'line %d' % second).replace(
+        '18:39', '18:%02d' % (second // 60)))
+    if second % 7 == 0:
+      lines.append('  continuation of line %d' % second)
+  return '\n'.join(lines) + '\n'
+
+
+def test_time_index():
+  log = timed_log(10)
+  for block_size in (1, 100, 4096, 1 << 20):
+    index = TimeIndex(Compatibility.StringIO(log), (GlogLine,), block_size=block_size)
+    assert index.sample(0) == (0, datetime(CURRENT_YEAR, 11, 1, 18, 0, 0))
+    assert index.sample(1)[1] == datetime(CURRENT_YEAR, 11, 1, 18, 0, 1)
+    assert index.sample(len(log)) is None
+    for minute, second in ((0, 0), (0, 1), (3, 59), (9, 59)):
+      target = datetime(CURRENT_YEAR, 11, 1, 18, minute, second)
+      offset = index.find(target)
+      assert offset == 0 or log[offset - 1] == '\n'
+      assert GlogLine.parse(log[offset:].split('\n', 1)[0]).datetime <= target
+      assert len(log[offset:log.index('line %d' % (minute * 60 + second))]) <= block_size + 200
+
+
+def test_stream_between():
+  log = timed_log(10)
+  start, end = datetime(CURRENT_YEAR, 11, 1, 18, 3, 30), datetime(CURRENT_YEAR, 11, 1, 18, 4, 0)
+  fp = Compatibility.StringIO(log)
+  index = TimeIndex(fp, (GlogLine,), block_size=512)
+  lines = read_all(Stream.between(fp, (GlogLine,), start, end, index=index),
+                   terminator=Stream.EOF)
+  assert [line.message.split('\n')[0] for line in lines] == [
+      'line %d' % second for second in range(210, 240)]
+  assert lines[0].message == 'line 210\n  continuation of line 210'
+
+  lines = read_all(Stream.between(Compatibility.StringIO(log), (GlogLine,), end=start),
+                   terminator=Stream.EOF)
+  assert len(lines) == 210
+
+  lines = read_all(Stream.between(Compatibility.StringIO(log), (GlogLine,), start=start),
+                   terminator=Stream.EOF)
+  assert len(lines) == 600 - 210
+  assert read_all(Stream.between(Compatibility.StringIO(log), (GlogLine,),
+      start=datetime(CURRENT_YEAR, 11, 2)), terminator=Stream.EOF) == []
@@ -0,0 +1,187 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+from datetime import datetime, timedelta
+import multiprocessing
+import os
+import random
+
+import pytest
+
+from twitter.common.contextutil import temporary_dir
+from twitter.common.log.parsers import GlogLine, Level, ZooLine
+from twitter.common.log.reader import Stream
+from twitter.common.log.search import LogFilter, SearchError, search
+
+
+CURRENT_YEAR = datetime.now().year
+START = datetime(CURRENT_YEAR, 3, 1, 12)
+
+
+def write_glog(filename, seed, entries=500, jitter=0):
+  """Write a glog file, with timestamps out of order by up to jitter seconds."""
+  rng = random.Random(seed)
+  t = START
+  with open(filename, 'w') as fp:
+    fp.write('Log file created at: %s\n' % t.strftime('%Y/%m/%d %H:%M:%S'))
+    for k in range(entries):
+      t += timedelta(microseconds=rng.randint(0, 20000000))
+      written = t - timedelta(seconds=rng.uniform(0, jitter))
+      fp.write('%s%s %d %s.py:%d] host %d entry %d%s\n' % (
+          rng.choice('DIWEF'), written.strftime('%m%d %H:%M:%S.%f'), 1000 + seed,
+          rng.choice(['handler', 'server', 'client']), rng.randint(1, 100), seed, k,
+          ' Timeout' if rng.random() < 0.1 else ''))
+      if rng.random() < 0.1:
+        fp.write('  traceback line for entry %d\n' % k)
+
+
+def write_zoo(filename, entries=200):
+  t = START
+  with open(filename, 'w') as fp:
+    for k in range(entries):
+      t += timedelta(seconds=7)
+      fp.write('%s,%03d:42(0x1):ZOO_%s@zookeeper_process@%d: zoo entry %d\n' % (
+          t.strftime('%Y-%m-%d %H:%M:%S'), k % 1000, ('INFO', 'WARN', 'ERROR')[k % 3], k, k))
+
+
+def brute_force(filenames, log_filter):
+  matches = []
+  for index, filename in enumerate(filenames):
+    stream = Stream(filename, (GlogLine, ZooLine))
+    while True:
+      line = stream.next()
+      if line is Stream.EOF:
+        break
+      if log_filter.accepts(line):
+        matches.append((line.datetime, index, filename, line))
+  return [(filename, line) for _, _, filename, line in sorted(matches, key=lambda m: m[:2])]
+
+
+def assert_same(actual, expected):
+  # Stream includes the empty line after the final newline of a file in the last entry.
+  assert [(f, l.raw) for f, l in actual] == [(f, l.raw.rstrip('\n')) for f, l in expected]
+
+
+@pytest.fixture(scope='module')
+def logs(request):
+  with temporary_dir(cleanup=False) as td:
+    filenames = []
+    for seed in range(6):
+      filenames.append(os.path.join(td, 'host%d.INFO' % seed))
+      write_glog(filenames[-1], seed)
+    filenames.append(os.path.join(td, 'zookeeper.log'))
+    write_zoo(filenames[-1])
+    pool = multiprocessing.Pool(2)
+    def cleanup():
+      pool.terminate()
+      pool.join()
+      for filename in filenames:
+        os.unlink(filename)
+      os.rmdir(td)
+    request.addfinalizer(cleanup)
+    return filenames, pool
+
+
+@pytest.mark.parametrize('log_filter', [
+  LogFilter(),
+  LogFilter(level=Level.WARNING),
+  LogFilter(start=START + timedelta(minutes=20), end=START + timedelta(minutes=40)),
+  LogFilter(start=START + timedelta(minutes=30, seconds=0.5)),
+  LogFilter(end=START + timedelta(minutes=10)),
+  LogFilter(source=r'^handler\.py'),
+  LogFilter(pattern='Timeout'),
+  LogFilter(pattern='traceback line'),
+  LogFilter(level=Level.ERROR, start=START + timedelta(minutes=5), pattern=r'entry \d+5\b'),
+  LogFilter(start=datetime(CURRENT_YEAR - 1, 3, 1), end=datetime(CURRENT_YEAR + 1, 3, 1)),
+  LogFilter(start=START + timedelta(days=1)),
+])
+def test_search(logs, log_filter):
+  filenames, pool = logs
+  assert_same(search(filenames, log_filter=log_filter, pool=pool),
+              brute_force(filenames, log_filter))
+
+
+def test_search_order(logs):
+  filenames, pool = logs
+  matches = search(filenames, pool=pool)
+  assert len(set(filename for filename, _ in matches)) == len(filenames)
+  assert [line.datetime for _, line in matches] == sorted(line.datetime for _, line in matches)
+
+
+def test_search_missing_file(logs):
+  filenames, pool = logs
+  with pytest.raises(SearchError):
+    search(filenames + ['/does/not/exist'], pool=pool)
+  assert search([], pool=pool) == []
+
+
+def test_search_out_of_order(logs):
+  _, pool = logs
+  with temporary_dir() as td:
+    filenames = [os.path.join(td, 'host%d.INFO' % seed) for seed in range(3)]
+    for seed, filename in enumerate(filenames):
+      write_glog(filename, seed, entries=2000, jitter=3)
+    for log_filter in (
+        LogFilter(start=START + timedelta(minutes=20), end=START + timedelta(minutes=40)),
+        LogFilter(start=START + timedelta(hours=2, seconds=0.5)),
+        LogFilter(end=START + timedelta(minutes=10)),
+        LogFilter(level=Level.ERROR, start=START + timedelta(minutes=5),
+                  end=START + timedelta(hours=1))):
+      assert_same(search(filenames, log_filter=log_filter, pool=pool),
+                  brute_force(filenames, log_filter))
+
+
+class PickyGlogLine(GlogLine):
+  """A parser that rejects some lines that peek accepts."""
+
+  @classmethod
+  def try_parse(cls, line):
+    return None if line.endswith('7') else super(PickyGlogLine, cls).try_parse(line)
+
+
+def test_search_parse_failure(logs):
+  filenames, pool = logs
+  matches = search(filenames[:1], parsers=(PickyGlogLine,), pool=pool)
+  assert matches
+  assert all(not line.raw.split('\n')[0].endswith('7') for _, line in matches)
+
+
+def test_peek_agrees_with_try_parse():
+  for line in [
+      'I0301 12:00:00.000000 1 a.py:1] x',
+      'I0301 12:00:00.000000 1 a.py:1]',
+      'I0301 12:00:00.000000 1',
+      'I0301 12:60:00.000000 1 a.py:1] x',
+      'I0301 12:00:60.000000 1 a.py:1] x',
+      'I0231 12:00:00.000000 1 a.py:1] x',
+      'I0301 12:00:00.00000x 1 a.py:1] x',
+      'I0301 12:00:00.12345 1 a.py:1] x',
+      'I0301 12:00:00.1 1 a.py:1] x',
+      '2013-03-01 12:00:00,123:42(0x1):ZOO_INFO@zookeeper_process@1: x',
+      '2013-03-01 12:00:00,123:42(0x1):ZOO_INFO@zookeeper_process@1',
+      '2013-02-30 12:00:00,123:42(0x1):ZOO_INFO@a@1: x',
+      '2013-03-01 12:00:61,123:42(0x1):ZOO_INFO@a@1: x',
+      '2013-03-01 12:00:00,12:42(0x1):ZOO_INFO@a@1: x',
+      '2013-03-01 12:00:00,123456:42(0x1):ZOO_INFO@a@1: x',
+      '  continuation']:
+    for parser in (GlogLine, ZooLine):
+      parsed = parser.try_parse(line)
+      peeked = parser.peek(line)
+      assert (parsed is None) == (peeked is None), (parser, line)
+      if parsed is not None:
+        assert peeked[0] == parsed.level
+        assert peeked[1] == parser.timestamp_key(parsed.datetime)
+        assert peeked[2] == parsed.source
@@ -14,6 +14,9 @@
 # limitations under the License.
 # ==================================================================================================
 
+import json
+import threading
+
 from twitter.common.lang import Compatibility
 from twitter.common.log.tracer import Tracer, Trace
 from twitter.common.testing.clock import ThreadedClock
@@ -28,7 +31,8 @@ def test_tracing_timed():
     def print_trace(self, *args, **kw):
       final_trace.append(self._local.parent)
 
-  tracer = PrintTraceInterceptor(output=sio, clock=clock, predicate=lambda v: False)
+  tracer = PrintTraceInterceptor(output=sio, clock=clock, predicate=lambda v: False,
+                                 keep_traces=1)
   assert not hasattr(tracer._local, 'parent')
 
   with tracer.timed('hello'):
@@ -60,6 +64,32 @@ def test_tracing_timed():
   assert sio.getvalue() == ''
 
 
+def test_untraced_blocks():
+  clock = ThreadedClock()
+  final_trace = []
+
+  class PrintTraceInterceptor(Tracer):
+    def print_trace(self, *args, **kw):
+      final_trace.append(self._local.parent)
+
+  tracer = PrintTraceInterceptor(output=Compatibility.StringIO(), clock=clock,
+                                 predicate=lambda v: v < 1)
+  with tracer.timed('verbose', V=1):
+    pass
+  assert not hasattr(tracer._local, 'parent')
+  assert final_trace == []
+
+  # Traces within an untraced block nest in the enclosing trace.
+  with tracer.timed('outer'):
+    with tracer.timed('verbose', V=1):
+      with tracer.timed('inner'):
+        clock.tick(1.0)
+  trace, = final_trace
+  assert trace.msg == 'outer'
+  assert [child.msg for child in trace.children] == ['inner']
+  assert trace.children[0].duration() == 1
+
+
 def test_tracing_filter():
   sio = Compatibility.StringIO()
   tracer = Tracer(output=sio)
@@ -83,3 +113,79 @@ def test_tracing_filter():
   assert sio.getvalue() == 'hello world\n'
   tracer.log('ehrmagherd', V=2)
   assert sio.getvalue() == 'hello world\nehrmagherd\n'
+
+
+def test_lazy_messages():
+  calls = []
+  def message():
+    calls.append(1)
+    return 'lazy'
+
+  sio = Compatibility.StringIO()
+  tracer = Tracer(output=sio, predicate=lambda v: v < 1)
+  tracer.log('hello %s %d', 'world', 1, V=1)
+  tracer.log(message, V=1)
+  assert sio.getvalue() == ''
+  assert calls == []
+  tracer.log('hello %s %d', 'world', 1)
+  tracer.log(message)
+  assert sio.getvalue() == 'hello world 1\nlazy\n'
+  assert calls == [1]
+
+  # A disabled trace never builds its message.
+  del calls[:]
+  sio = Compatibility.StringIO()
+  tracer = Tracer(output=sio, predicate=lambda v: v < 1)
+  with tracer.timed(message, V=1):
+    with tracer.timed('inner %d', 1, V=2):
+      pass
+  assert sio.getvalue() == ''
+  assert calls == []
+
+
+def test_timed_stops_on_exception():
+  clock = ThreadedClock()
+  tracer = Tracer(output=Compatibility.StringIO(), clock=clock, keep_traces=1)
+  try:
+    with tracer.timed('outer'):
+      with tracer.timed('inner'):
+        clock.tick(1.0)
+        raise ValueError('broken')
+  except ValueError:
+    pass
+  assert tracer._local.parent is None
+  trace, = tracer.traces()
+  assert trace.duration() == 1
+  assert trace.children[0].duration() == 1
+
+
+def test_chrome_trace():
+  clock = ThreadedClock()
+  tracer = Tracer(output=Compatibility.StringIO(), clock=clock, predicate=lambda v: False,
+                  keep_traces=2)
+  for k in range(3):
+    with tracer.timed('resolve %d', k):
+      clock.tick(1.0)
+      with tracer.timed('fetch %s', 'link', V=1):
+        clock.tick(0.5)
+
+  sio = Compatibility.StringIO()
+  tracer.write_chrome_trace(sio)
+  document = json.loads(sio.getvalue())
+  events = document['traceEvents']
+  assert [event['name'] for event in events] == ['resolve 1', 'fetch link', 'resolve 2',
+                                                 'fetch link']
+  assert [(event['ts'], event['dur']) for event in events] == [
+      (1.5e6, 1.5e6), (2.5e6, 0.5e6), (3e6, 1.5e6), (4e6, 0.5e6)]
+  assert all(event['ph'] == 'X' for event in events)
+  assert [event['args']['V'] for event in events] == [0, 1, 0, 1]
+  assert set(event['tid'] for event in events) == set([threading.current_thread().ident])
+  assert len(set(event['pid'] for event in events)) == 1
+
+
+def test_chrome_trace_disabled_by_default():
+  tracer = Tracer(output=Compatibility.StringIO())
+  with tracer.timed('hello'):
+    pass
+  assert tracer.traces() == []
+  assert tracer.chrome_trace_events() == []
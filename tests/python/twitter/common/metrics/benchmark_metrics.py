@@ -0,0 +1,255 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+"""
+Micro-benchmarks for twitter.common.metrics.
+
+Measures register, increment, read, Rate.read, Metrics.sample and MetricSampler throughput
+across registry sizes and thread counts, and writes the results as JSON so that runs can be
+compared between commits.  The increment_shared benchmarks have every thread increment a single
+gauge, the contended case StripedAtomicGauge is meant for:
+
+  $ ./pants py tests/python/twitter/common/metrics:benchmark_metrics -- --output=before.json
+"""
+
+from __future__ import print_function
+
+import json
+import optparse
+import platform
+import sys
+import threading
+import time
+
+from twitter.common.metrics import (
+  AtomicGauge,
+  MetricHistory,
+  MetricSampler,
+  Rate,
+  StripedAtomicGauge)
+from twitter.common.metrics.metrics import Metrics
+
+
+DEFAULT_GAUGES = (1000, 10000, 100000)
+DEFAULT_THREADS = (1, 2, 4, 8, 16, 32)
+GAUGES_PER_SCOPE = 100
+
+
+class ManualClock(object):
+  def __init__(self):
+    self._time = 0
+
+  def advance(self, ticks):
+    self._time += ticks
+
+  def time(self):
+    return self._time
+
+
+def make_registry(gauges, gauge_class=AtomicGauge):
+  registry = Metrics()
+  for k in range(gauges):
+    registry.scope('scope%d' % (k // GAUGES_PER_SCOPE)).register(gauge_class('gauge%d' % k))
+  return registry
+
+
+def gauges_of(registry):
+  return [gauge for _, gauge in registry._flatten()[0]]
+
+
+def run_threads(threads, work):
+  """
+    Run work(thread index) on each of the threads concurrently and return the elapsed time.
+  """
+  start_barrier = threading.Event()
+
+  def run(index):
+    start_barrier.wait()
+    work(index)
+
+  workers = [threading.Thread(target=run, args=(index,)) for index in range(threads)]
+  for worker in workers:
+    worker.start()
+  start = time.time()
+  start_barrier.set()
+  for worker in workers:
+    worker.join()
+  return time.time() - start
+
+
+def bench_register(gauges, threads, operations):
+  start = time.time()
+  make_registry(gauges)
+  return gauges, time.time() - start
+
+
+def bench_increment_shared(gauge_class):
+  def bench(gauges, threads, operations):
+    gauge = gauge_class('shared')
+    per_thread = max(1, operations // threads)
+
+    def work(index):
+      increment = gauge.increment
+      for _ in range(per_thread):
+        increment()
+
+    elapsed = run_threads(threads, work)
+    assert gauge.read() == per_thread * threads
+    return per_thread * threads, elapsed
+  return bench
+
+
+def bench_increment(gauge_class):
+  def bench(gauges, threads, operations):
+    targets = gauges_of(make_registry(gauges, gauge_class))
+    per_thread = max(1, operations // threads)
+
+    def work(index):
+      for k in range(per_thread):
+        targets[(index + k) % gauges].increment()
+
+    return per_thread * threads, run_threads(threads, work)
+  return bench
+
+
+def bench_read(gauges, threads, operations):
+  targets = gauges_of(make_registry(gauges))
+  per_thread = max(1, operations // threads)
+
+  def work(index):
+    for k in range(per_thread):
+      targets[(index + k) % gauges].read()
+
+  return per_thread * threads, run_threads(threads, work)
+
+
+def bench_rate_read(gauges, threads, operations):
+  clock = ManualClock()
+  rates = [Rate('rate%d' % k, AtomicGauge('gauge%d' % k), clock=clock) for k in range(gauges)]
+  iterations = max(1, operations // gauges)
+  start = time.time()
+  for _ in range(iterations):
+    clock.advance(1)
+    for rate in rates:
+      rate.read()
+  return iterations * gauges, time.time() - start
+
+
+def bench_sample(gauges, threads, operations):
+  registry = make_registry(gauges)
+  registry.sample()  # build the flattened registry outside of the measurement
+  iterations = max(1, operations // gauges)
+  start = time.time()
+  for _ in range(iterations):
+    registry.sample()
+  return iterations * gauges, time.time() - start
+
+
+def bench_sampler_history(gauges, threads, operations):
+  registry = make_registry(gauges)
+  history = MetricHistory(60)
+  samples = registry.sample()
+  iterations = max(1, operations // gauges)
+  start = time.time()
+  for k in range(iterations):
+    history.record(k, samples)
+  return iterations * gauges, time.time() - start
+
+
+def bench_sampler_sample(gauges, threads, operations):
+  sampler = MetricSampler(make_registry(gauges), history=MetricHistory(60))
+  iterations = max(1, operations // gauges)
+  start = time.time()
+  for _ in range(iterations):
+    sampler.sample_once()
+  return iterations * gauges, time.time() - start
+
+
+# name => (benchmark, whether it is run across thread counts, whether it is run across registry
+#          sizes)
+BENCHMARKS = {
+  'register': (bench_register, False, True),
+  'increment.AtomicGauge': (bench_increment(AtomicGauge), True, True),
+  'increment.StripedAtomicGauge': (bench_increment(StripedAtomicGauge), True, True),
+  'increment_shared.AtomicGauge': (bench_increment_shared(AtomicGauge), True, False),
+  'increment_shared.StripedAtomicGauge': (bench_increment_shared(StripedAtomicGauge), True, False),
+  'read': (bench_read, True, True),
+  'rate_read': (bench_rate_read, False, True),
+  'sample': (bench_sample, False, True),
+  'sampler_history': (bench_sampler_history, False, True),
+  'sampler_sample': (bench_sampler_sample, False, True),
+}
+
+
+def run(benchmarks, gauge_counts, thread_counts, operations):
+  results = []
+  for name in benchmarks:
+    benchmark, threaded, sized = BENCHMARKS[name]
+    for gauges in (gauge_counts if sized else (1,)):
+      for threads in (thread_counts if threaded else (1,)):
+        ops, elapsed = benchmark(gauges, threads, operations)
+        results.append({
+          'benchmark': name,
+          'gauges': gauges,
+          'threads': threads,
+          'operations': ops,
+          'elapsed_secs': elapsed,
+          'ops_per_sec': ops / elapsed if elapsed > 0 else None,
+        })
+        print('%-36s gauges=%-7d threads=%-3d %12.0f ops/sec' % (
+            name, gauges, threads, results[-1]['ops_per_sec'] or 0), file=sys.stderr)
+  return results
+
+
+def parse_ints(value):
+  return [int(v) for v in value.split(',')]
+
+
+def main(args):
+  parser = optparse.OptionParser(usage='%prog [options]')
+  parser.add_option('--benchmarks', default=','.join(sorted(BENCHMARKS)),
+      help='Comma-separated benchmarks to run [default: all]')
+  parser.add_option('--gauges', default=','.join(map(str, DEFAULT_GAUGES)),
+      help='Comma-separated registry sizes [default: %default]')
+  parser.add_option('--threads', default=','.join(map(str, DEFAULT_THREADS)),
+      help='Comma-separated thread counts [default: %default]')
+  parser.add_option('--operations', type='int', default=200000,
+      help='Approximate number of operations per measurement [default: %default]')
+  parser.add_option('--output', default=None,
+      help='Write JSON results to this file instead of stdout.')
+  options, _ = parser.parse_args(args)
+
+  benchmarks = options.benchmarks.split(',')
+  for name in benchmarks:
+    if name not in BENCHMARKS:
+      parser.error('Unknown benchmark %s, choose from %s' % (name, ', '.join(sorted(BENCHMARKS))))
+
+  report = {
+    'python': platform.python_version(),
+    'implementation': platform.python_implementation(),
+    'timestamp': time.time(),
+    'results': run(benchmarks, parse_ints(options.gauges), parse_ints(options.threads),
+                   options.operations),
+  }
+  if options.output:
+    with open(options.output, 'w') as fp:
+      json.dump(report, fp, indent=2, sort_keys=True)
+  else:
+    print(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == '__main__':
+  main(sys.argv[1:])
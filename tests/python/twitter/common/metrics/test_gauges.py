@@ -14,6 +14,8 @@
 # limitations under the License.
 # ==================================================================================================
 
+import threading
+
 import pytest
 
 from twitter.common.quantity import Amount, Time, Data
@@ -21,6 +23,7 @@ from twitter.common.metrics import (
   Label,
   AtomicGauge,
   MutatorGauge,
+  StripedAtomicGauge,
 
   gaugelike,
   namable,
@@ -74,6 +77,41 @@ def test_atomic_gauge_types():
   with pytest.raises(TypeError):
     ag.add('hello')
 
+def test_striped_atomic_gauge():
+  sg = StripedAtomicGauge('a')
+  assert sg.name() == 'a'
+  assert sg.read() == 0
+  sg.add(-2)
+  assert sg.read() == -2
+  sg.increment()
+  sg.increment()
+  sg.decrement()
+  assert sg.read() == -1
+  assert StripedAtomicGauge('a', 23).read() == 23
+  with pytest.raises(TypeError):
+    StripedAtomicGauge('a', None)
+  with pytest.raises(TypeError):
+    sg.add('hello')
+
+
+def test_striped_atomic_gauge_threads():
+  sg = StripedAtomicGauge('a', 5)
+  def bump():
+    for _ in range(1000):
+      sg.increment()
+  threads = [threading.Thread(target=bump) for _ in range(8)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  assert sg.read() == 8005
+  # cells from exited threads are folded into the base value
+  assert sg._cells == []
+  assert sg._base == 8005
+  sg.add(10)
+  assert sg.read() == 8015
+
+
 def test_named_gauge_types():
   with pytest.raises(TypeError):
     ag = AtomicGauge(0)
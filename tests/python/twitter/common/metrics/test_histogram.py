@@ -0,0 +1,109 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import random
+
+import pytest
+
+from twitter.common.metrics import Histogram, RootMetrics
+
+
+def within(value, expected, precision=0.01):
+  return abs(value - expected) <= expected * precision
+
+
+def test_empty_histogram():
+  hist = Histogram('latency')
+  assert hist.name() == 'latency'
+  assert hist.count() == 0
+  assert hist.percentiles() == []
+  assert hist.sample() == {'count': 0, 'max': 0, 'p50': 0, 'p90': 0, 'p99': 0, 'p999': 0}
+
+
+def test_percentile_names():
+  assert Histogram.percentile_name(50) == 'p50'
+  assert Histogram.percentile_name(99) == 'p99'
+  assert Histogram.percentile_name(99.9) == 'p999'
+  assert Histogram.percentile_name(99.99) == 'p9999'
+  assert Histogram.percentile_name(100) == 'p100'
+
+
+def test_histogram_precision():
+  for precision in (0.1, 0.01, 0.001):
+    hist = Histogram('latency', percentiles=(1, 25, 50, 75, 99, 100), precision=precision)
+    for value in range(1, 10001):
+      hist.add(value)
+    assert hist.count() == 10000
+    for percentile, value in hist.percentiles():
+      assert within(value, percentile * 100, precision), (
+          'p%s: %s not within %s of %s' % (percentile, value, precision, percentile * 100))
+
+
+def test_histogram_max_is_exact():
+  hist = Histogram('latency')
+  values = [random.uniform(0, 1000) for _ in range(1000)]
+  for value in values:
+    hist.add(value)
+  assert hist.sample()['max'] == max(values)
+  assert hist.sample()['p999'] <= max(values)
+
+
+def test_histogram_out_of_bounds():
+  hist = Histogram('latency', percentiles=(50, 100), lowest=1, highest=100)
+  for value in (0, -5, 0.5):
+    hist.add(value)
+  # clamped to the largest observed value
+  assert hist.percentiles() == [(50, 0.5), (100, 0.5)]
+  hist.clear()
+  assert hist.count() == 0
+  hist.add(1000000)
+  assert hist.percentiles()[-1][1] <= 1000000
+
+
+def test_histogram_bad_arguments():
+  with pytest.raises(TypeError):
+    Histogram(None)
+  with pytest.raises(ValueError):
+    Histogram('latency', precision=0)
+  with pytest.raises(ValueError):
+    Histogram('latency', lowest=10, highest=1)
+  with pytest.raises(ValueError):
+    Histogram('latency', percentiles=(0, 50))
+  with pytest.raises(TypeError):
+    Histogram('latency').add('hello')
+
+
+def test_histogram_unicode_name():
+  histogram = Histogram(u'latency')
+  histogram.add(1)
+  assert histogram.name() == u'latency'
+  assert histogram.sample()['count'] == 1
+
+
+def test_histogram_registration():
+  rm = RootMetrics()
+  hist = rm.scope('http').register(Histogram('latency_ms', percentiles=(50, 99)))
+  hist.add(10)
+  hist.add(20)
+  samples = rm.sample()
+  assert sorted(samples) == [
+      'http.latency_ms.count', 'http.latency_ms.max', 'http.latency_ms.p50',
+      'http.latency_ms.p99']
+  assert samples['http.latency_ms.count'] == 2
+  assert samples['http.latency_ms.max'] == 20
+  assert within(samples['http.latency_ms.p50'], 10)
+  assert within(samples['http.latency_ms.p99'], 20)
+  rm.clear()
@@ -0,0 +1,72 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import pytest
+
+from twitter.common.metrics import (
+  AtomicGauge,
+  Label,
+  MetricHistory,
+  MetricSampler,
+  RootMetrics)
+
+
+def test_history_bad_capacity():
+  for capacity in (0, -1, None, 'hello'):
+    with pytest.raises(ValueError):
+      MetricHistory(capacity)
+
+
+def test_history_empty():
+  history = MetricHistory(3)
+  assert history.capacity() == 3
+  assert history.names() == []
+  assert history.get('foo') is None
+
+
+def test_history_wraps():
+  history = MetricHistory(3)
+  for k in range(5):
+    history.record(k, {'foo': k * 10, 'label': 'hello'})
+  assert history.names() == ['foo']
+  assert history.get('label') is None
+  assert history.get('foo') == [(2, 20), (3, 30), (4, 40)]
+
+
+def test_history_missing_values():
+  history = MetricHistory(4)
+  history.record(0, {'foo': 1})
+  history.record(1, {'foo': 2, 'bar': 3.5})
+  history.record(2, {'bar': 4.5})
+  assert sorted(history.names()) == ['bar', 'foo']
+  assert history.get('foo') == [(0, 1), (1, 2)]
+  assert history.get('bar') == [(1, 3.5), (2, 4.5)]
+
+
+def test_sampler_records_history():
+  rm = RootMetrics()
+  gauge = rm.register(AtomicGauge('requests', 42))
+  rm.register(Label('name', 'brian'))
+  history = MetricHistory(10)
+  sampler = MetricSampler(rm, history=history)
+  assert sampler.history() is history
+  assert [value for _, value in history.get('requests')] == [42]
+  assert history.get('name') is None
+  gauge.add(1)
+  sampler.sample_once()
+  assert [value for _, value in history.get('requests')] == [42, 43]
+  assert sampler.sample()['requests'] == 43
+  rm.clear()
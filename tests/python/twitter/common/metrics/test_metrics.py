@@ -86,3 +86,31 @@ def test_bad_scope_names():
     my_scope.scope(123)
   with pytest.raises(TypeError):
     my_scope.scope(RootMetrics)
+
+def test_registration_after_sampling():
+  rm = RootMetrics()
+  rm.register(Label('ping', 'pong'))
+  assert rm.sample() == {'ping': 'pong'}
+  child = rm.scope('a').scope('b')
+  assert rm.sample() == {'ping': 'pong'}
+  child.register(Label('ping', 'pong'))
+  assert rm.sample() == {'ping': 'pong', 'a.b.ping': 'pong'}
+  assert rm.scope('a').sample() == {'b.ping': 'pong'}
+  assert rm.scope('a').sample(sample_prefix='a.') == {'a.b.ping': 'pong'}
+  rm.scope('a').register(Label('pong', 'ping'))
+  assert rm.sample() == {'ping': 'pong', 'a.b.ping': 'pong', 'a.pong': 'ping'}
+  rm.clear()
+  assert rm.sample() == {}
+
+def test_sample_changed_since():
+  rm = RootMetrics()
+  mg = rm.scope('earth').register(MutatorGauge('name', 'brian'))
+  rm.register(Label('ping', 'pong'))
+  first = rm.sample()
+  assert first == {'earth.name': 'brian', 'ping': 'pong'}
+  assert rm.sample(changed_since=first) == {}
+  mg.write('zargon')
+  assert rm.sample(changed_since=first) == {'earth.name': 'zargon'}
+  rm.register(Label('new', None))
+  assert rm.sample(changed_since=first) == {'earth.name': 'zargon', 'new': None}
+  rm.clear()
@@ -14,15 +14,19 @@
 # limitations under the License.
 # ==================================================================================================
 
+import math
+
 import pytest
 import unittest
 
 from twitter.common.quantity import Amount, Time, Data
 from twitter.common.metrics import (
   AtomicGauge,
+  LoadAverage,
   MutatorGauge,
   NamedGauge,
-  Rate
+  Rate,
+  RootMetrics
 )
 
 class FakeGauge(NamedGauge):
@@ -91,3 +95,70 @@ class TestRate(unittest.TestCase):
     assert rate.name() == 'holyguacamole_per_1secs'
     rate = Rate.of(gauge, name = 'holyguacamole', window = Amount(3, Time.HOURS))
     assert rate.name() == 'holyguacamole_per_3hrs'
+
+  def test_bounded_samples(self):
+    clock = TestClock()
+    gauge = FakeGauge('test').supplies(range(0, 100, 10))
+    rate = Rate("foo", gauge, window = Amount(30, Time.SECONDS), clock=clock, max_samples=3)
+    assert rate.read() == 0
+    for _ in range(9):
+      clock.advance(1)
+      assert rate.read() == 10.0
+    assert len(rate._samples) == 3
+
+
+class TestLoadAverage(unittest.TestCase):
+  def test_constant_rate(self):
+    clock = TestClock()
+    gauge = AtomicGauge('requests')
+    load = LoadAverage.of(gauge, clock=clock)
+    assert load.name() == 'requests_load'
+    assert load.sample() == {'1mins': 0.0, '5mins': 0.0, '15mins': 0.0}
+
+    # 10 requests/sec for one minute
+    for _ in range(60):
+      clock.advance(1)
+      gauge.add(10)
+      load.update()
+    averages = dict(load.averages())
+    assert abs(averages['1mins'] - 10 * (1 - math.exp(-1))) < 1e-6
+    assert abs(averages['5mins'] - 10 * (1 - math.exp(-1.0 / 5))) < 1e-6
+    assert abs(averages['15mins'] - 10 * (1 - math.exp(-1.0 / 15))) < 1e-6
+
+    # the average is independent of sampling frequency
+    clock2 = TestClock()
+    gauge2 = AtomicGauge('requests')
+    load2 = LoadAverage.of(gauge2, clock=clock2)
+    load2.update()
+    clock2.advance(60)
+    gauge2.add(600)
+    load2.update()
+    for (_, v1), (_, v2) in zip(load.averages(), load2.averages()):
+      assert abs(v1 - v2) < 1e-6
+
+  def test_zero_time_elapsed(self):
+    clock = TestClock()
+    gauge = FakeGauge('test').supplies([0, 10, 20])
+    load = LoadAverage('foo', gauge, windows=[Amount(1, Time.SECONDS)], clock=clock)
+    load.update()
+    load.update()
+    assert load.averages() == [('1secs', 0.0)]
+    clock.advance(1)
+    load.update()
+    assert abs(load.averages()[0][1] - 20 * (1 - math.exp(-1))) < 1e-6
+
+  def test_registration(self):
+    clock = TestClock()
+    rm = RootMetrics()
+    gauge = rm.register(AtomicGauge('requests'))
+    rm.register(LoadAverage.of(gauge, windows=[Amount(1, Time.MINUTES)], clock=clock))
+    assert rm.sample() == {'requests': 0, 'requests_load.1mins': 0.0}
+    rm.clear()
+
+  def test_static_constructor(self):
+    gauge = FakeGauge('test')
+    with pytest.raises(TypeError):
+      LoadAverage.of(object())
+    assert LoadAverage.of(gauge, name='holyguacamole').name() == 'holyguacamole_load'
+    with pytest.raises(ValueError):
+      LoadAverage('foo', gauge, windows=[])
@@ -0,0 +1,149 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import pytest
+
+from twitter.common.metrics import RootMetrics, Timer
+
+
+class FakeClock(object):
+  def __init__(self):
+    self.now = 0.0
+
+  def advance(self, seconds):
+    self.now += seconds
+
+  def __call__(self):
+    return self.now
+
+
+def test_timer_context_manager():
+  clock = FakeClock()
+  timer = Timer('fetch_ms', percentiles=(50,), clock=clock)
+  assert timer.name() == 'fetch_ms'
+  with timer:
+    clock.advance(0.5)
+  with timer:
+    clock.advance(0.25)
+    with timer:
+      clock.advance(1.0)
+  samples = timer.sample()
+  assert samples['count'] == 3
+  assert samples['total'] == 2750.0
+  assert samples['max'] == 1250.0
+
+
+def test_timer_decorator():
+  clock = FakeClock()
+  timer = Timer('fetch_ms', clock=clock)
+
+  @timer
+  def fetch(seconds):
+    """fetch docs"""
+    clock.advance(seconds)
+    return seconds
+
+  @timer
+  def broken():
+    clock.advance(1)
+    raise ValueError
+
+  assert fetch(2) == 2
+  assert fetch.__name__ == 'fetch'
+  assert fetch.__doc__ == 'fetch docs'
+  with pytest.raises(ValueError):
+    broken()
+  assert timer.sample()['count'] == 2
+  assert timer.total() == 3000.0
+
+
+def test_timer_disabled():
+  clock = FakeClock()
+  timer = Timer('fetch_ms', clock=clock, enabled=False)
+
+  @timer
+  def fetch():
+    clock.advance(1)
+
+  fetch()
+  with timer:
+    clock.advance(1)
+  assert timer.sample()['count'] == 0
+  assert timer.total() == 0
+
+  # enabled mid-block: the block is not timed, but subsequent ones are.
+  with timer:
+    timer.enabled = True
+  fetch()
+  assert timer.sample()['count'] == 1
+
+
+def test_timer_toggled_in_nested_blocks():
+  clock = FakeClock()
+  timer = Timer('fetch_ms', clock=clock)
+
+  # Disabled inside a block: neither that block nor the inner one is timed.
+  with timer:
+    clock.advance(1)
+    timer.enabled = False
+    with timer:
+      clock.advance(1)
+  assert timer.sample()['count'] == 0
+
+  # Toggled off and on inside a block: only the blocks entered after the toggle are timed.
+  timer.enabled = True
+  with timer:
+    clock.advance(1)
+    timer.enabled = False
+    with timer:
+      timer.enabled = True
+      with timer:
+        clock.advance(4)
+    with timer:
+      clock.advance(2)
+    clock.advance(1)
+  assert timer.sample()['count'] == 2
+  assert timer.total() == 4000.0 + 2000.0
+  assert timer._local.starts == []
+
+
+def test_timer_disabled_does_not_touch_thread_state():
+  timer = Timer('fetch_ms', enabled=False)
+  with timer:
+    with timer:
+      pass
+  assert not hasattr(timer._local, 'starts')
+
+
+def test_timer_clock_stepping_backwards():
+  clock = FakeClock()
+  timer = Timer('fetch_ms', clock=clock)
+  with timer:
+    clock.advance(-1)
+  assert timer.sample()['count'] == 1
+  assert timer.total() == 0.0
+
+
+def test_timer_registration():
+  rm = RootMetrics()
+  timer = rm.scope('rpc').register(Timer('fetch_ms', percentiles=(99,)))
+  with timer:
+    pass
+  samples = rm.sample()
+  assert sorted(samples) == [
+      'rpc.fetch_ms.count', 'rpc.fetch_ms.max', 'rpc.fetch_ms.p99', 'rpc.fetch_ms.total']
+  assert samples['rpc.fetch_ms.count'] == 1
+  rm.clear()
@@ -0,0 +1,154 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+"""
+Micro-benchmarks for twitter.common.recordio.
+
+Compares per-record read/write against read_many/write_many across record sizes, and writes
+the results as JSON so that runs can be compared between commits:
+
+  $ ./pants py tests/python/twitter/common/recordio:benchmark_recordio -- --output=before.json
+"""
+
+from __future__ import print_function
+
+import json
+import optparse
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from twitter.common.recordio import RecordReader, RecordWriter
+
+
+DEFAULT_RECORD_SIZES = (16, 64, 256, 4096)
+
+
+def make_records(size, records):
+  return ['%0*d' % (size, k) for k in range(records)]
+
+
+def write_file(filename, records):
+  with open(filename, 'w') as fp:
+    RecordWriter(fp).write_many(records)
+
+
+def bench_write(filename, records):
+  start = time.time()
+  with open(filename, 'w') as fp:
+    writer = RecordWriter(fp)
+    for record in records:
+      writer.write(record)
+  return time.time() - start
+
+
+def bench_write_many(filename, records):
+  start = time.time()
+  with open(filename, 'w') as fp:
+    RecordWriter(fp).write_many(records)
+  return time.time() - start
+
+
+def bench_read(filename, records):
+  write_file(filename, records)
+  start = time.time()
+  with open(filename) as fp:
+    reader = RecordReader(fp)
+    while reader.read() is not None:
+      pass
+  return time.time() - start
+
+
+def bench_read_many(filename, records):
+  write_file(filename, records)
+  start = time.time()
+  with open(filename) as fp:
+    reader = RecordReader(fp)
+    while reader.read_many():
+      pass
+  return time.time() - start
+
+
+BENCHMARKS = {
+  'write': bench_write,
+  'write_many': bench_write_many,
+  'read': bench_read,
+  'read_many': bench_read_many,
+}
+
+
+def run(benchmarks, record_sizes, records):
+  results = []
+  fd, filename = tempfile.mkstemp()
+  os.close(fd)
+  try:
+    for size in record_sizes:
+      data = make_records(size, records)
+      for name in benchmarks:
+        elapsed = BENCHMARKS[name](filename, data)
+        results.append({
+          'benchmark': name,
+          'record_size': size,
+          'records': records,
+          'elapsed_secs': elapsed,
+          'records_per_sec': records / elapsed if elapsed > 0 else None,
+          'mb_per_sec': size * records / elapsed / 1e6 if elapsed > 0 else None,
+        })
+        print('%-12s size=%-6d %12.0f records/sec' % (
+            name, size, results[-1]['records_per_sec'] or 0), file=sys.stderr)
+  finally:
+    os.unlink(filename)
+  return results
+
+
+def parse_ints(value):
+  return [int(v) for v in value.split(',')]
+
+
+def main(args):
+  parser = optparse.OptionParser(usage='%prog [options]')
+  parser.add_option('--benchmarks', default=','.join(sorted(BENCHMARKS)),
+      help='Comma-separated benchmarks to run [default: all]')
+  parser.add_option('--record_sizes', default=','.join(map(str, DEFAULT_RECORD_SIZES)),
+      help='Comma-separated record sizes in bytes [default: %default]')
+  parser.add_option('--records', type='int', default=200000,
+      help='Number of records per measurement [default: %default]')
+  parser.add_option('--output', default=None,
+      help='Write JSON results to this file instead of stdout.')
+  options, _ = parser.parse_args(args)
+
+  benchmarks = options.benchmarks.split(',')
+  for name in benchmarks:
+    if name not in BENCHMARKS:
+      parser.error('Unknown benchmark %s, choose from %s' % (name, ', '.join(sorted(BENCHMARKS))))
+
+  report = {
+    'python': platform.python_version(),
+    'implementation': platform.python_implementation(),
+    'timestamp': time.time(),
+    'results': run(benchmarks, parse_ints(options.record_sizes), options.records),
+  }
+  if options.output:
+    with open(options.output, 'w') as fp:
+      json.dump(report, fp, indent=2, sort_keys=True)
+  else:
+    print(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == '__main__':
+  main(sys.argv[1:])
@@ -0,0 +1,173 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import os
+
+import pytest
+
+from twitter.common.recordio import (
+  BlockRecordIO,
+  BlockRecordReader,
+  BlockRecordWriter,
+  RecordIO,
+  StringCodec)
+
+from recordio_test_harness import EphemeralFile
+
+
+RECORDS = ['record %d: %s' % (k, 'x' * (k % 50)) for k in range(1000)]
+
+
+def write_blocks(fp, records, **kw):
+  writer = BlockRecordWriter(fp, StringCodec(), **kw)
+  for record in records:
+    assert writer.write(record)
+  assert writer.flush()
+  fp.flush()
+  return writer
+
+
+@pytest.mark.parametrize('compression', BlockRecordIO.compressions())
+def test_roundtrip(compression):
+  with EphemeralFile('r+') as fp:
+    write_blocks(fp, RECORDS, compression=compression, block_size=4096)
+    fp.seek(0)
+    reader = BlockRecordReader(fp, StringCodec())
+    assert list(reader) == RECORDS
+    fp.seek(0)
+    assert [reader.read() for _ in RECORDS] == RECORDS
+    assert reader.read() is None
+
+
+def test_compresses():
+  with EphemeralFile('r+') as fp:
+    write_blocks(fp, RECORDS, compression='none')
+    uncompressed = os.path.getsize(fp.name)
+  with EphemeralFile('r+') as fp:
+    write_blocks(fp, RECORDS, compression='zlib', level=9)
+    assert os.path.getsize(fp.name) < uncompressed / 4
+
+
+def test_unknown_compression():
+  with EphemeralFile('r+') as fp:
+    with pytest.raises(BlockRecordIO.UnknownCompression):
+      BlockRecordWriter(fp, StringCodec(), compression='snappy')
+
+
+def test_streaming_reads():
+  with EphemeralFile('r+') as fp:
+    writer = BlockRecordWriter(fp, StringCodec(), block_size=1024 * 1024)
+    reader = BlockRecordReader(open(fp.name), StringCodec())
+    writer.write('hello')
+    fp.flush()
+    assert reader.read() is None
+    writer.flush()
+    fp.flush()
+    assert reader.read() == 'hello'
+    assert reader.read() is None
+    writer.write('world')
+    writer.close()
+    assert reader.read() == 'world'
+
+
+def test_skip_block():
+  with EphemeralFile('r+') as fp:
+    write_blocks(fp, RECORDS, block_size=4096)
+    fp.seek(0)
+    reader = BlockRecordReader(fp, StringCodec())
+    assert reader.read() == RECORDS[0]
+    skipped = reader.skip_block()
+    assert skipped > 0
+    first = reader.read()
+    assert first in RECORDS
+    assert RECORDS.index(first) > skipped
+    while reader.skip_block() is not None:
+      pass
+    assert reader.read() is None
+
+
+def test_truncated_block():
+  with EphemeralFile('r+') as fp:
+    write_blocks(fp, RECORDS[:10])
+    write_blocks(fp, RECORDS[10:20])
+    fp.seek(-1, 2)
+    fp.truncate()
+    fp.seek(0)
+    reader = BlockRecordReader(fp, StringCodec())
+    assert [reader.try_read() for _ in range(10)] == RECORDS[:10]
+    position = fp.tell()
+    assert reader.try_read() is None
+    assert fp.tell() == position
+    with pytest.raises(RecordIO.PrematureEndOfStream):
+      reader.read()
+
+
+def test_corrupt_block():
+  with EphemeralFile('r+') as fp:
+    fp.write('not a block at all')
+    fp.flush()
+    fp.seek(0)
+    reader = BlockRecordReader(fp, StringCodec())
+    with pytest.raises(BlockRecordIO.CorruptBlock):
+      reader.read()
+    assert list(reader) == []
+
+
+def test_write_many_read_many():
+  with EphemeralFile('r+') as fp:
+    writer = BlockRecordWriter(fp, StringCodec(), block_size=4096)
+    assert writer.write_many(RECORDS)
+    assert writer.flush()
+    fp.seek(0)
+    reader = BlockRecordReader(fp, StringCodec())
+    assert reader.read_many(max_records=3) == RECORDS[:3]
+    records = RECORDS[:3]
+    while True:
+      batch = reader.read_many()
+      if not batch:
+        break
+      records.extend(batch)
+    assert records == RECORDS
+
+
+def test_maximum_record_size(monkeypatch):
+  monkeypatch.setattr(RecordIO, 'MAXIMUM_RECORD_SIZE', 64)
+  with EphemeralFile('r+') as fp:
+    writer = BlockRecordWriter(fp, StringCodec(), compression='none', block_size=4096)
+    with pytest.raises(RecordIO.RecordSizeExceeded):
+      writer.write('x' * 61)
+    # Records that fit individually are split across blocks instead of exceeding the maximum.
+    records = ['y' * 30, 'z' * 30, 'w' * 30]
+    assert writer.write_many(records)
+    assert writer.flush()
+    fp.seek(0)
+    reader = BlockRecordReader(fp, StringCodec())
+    assert reader.skip_block() == 1
+    assert reader.skip_block() == 1
+    fp.seek(0)
+    assert list(reader) == records
+
+
+def test_maximum_compressed_size(monkeypatch):
+  monkeypatch.setattr(RecordIO, 'MAXIMUM_RECORD_SIZE', 64)
+  with EphemeralFile('r+') as fp:
+    # Incompressible data grows under zlib, so the compressed block is the one that is too big.
+    writer = BlockRecordWriter(fp, StringCodec(), compression='zlib', block_size=4096)
+    assert writer.write(os.urandom(58))
+    with pytest.raises(RecordIO.RecordSizeExceeded):
+      writer.flush()
+    assert writer.flush()
+    assert os.path.getsize(fp.name) == 0
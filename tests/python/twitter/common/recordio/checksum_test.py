@@ -0,0 +1,137 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import pytest
+
+from twitter.common.recordio import (
+  ChecksummedRecordIO,
+  ChecksummedRecordReader,
+  ChecksummedRecordWriter,
+  RecordIO,
+  StringCodec)
+
+from recordio_test_harness import EphemeralFile
+
+
+RECORDS = ['record %d' % k for k in range(10)]
+FRAME_SIZE = len(ChecksummedRecordIO.frame(RECORDS[0]))
+
+
+def write_records(fp, records):
+  writer = ChecksummedRecordWriter(fp, StringCodec())
+  for record in records:
+    assert writer.write(record)
+  fp.flush()
+
+
+def corrupt(fp, offset, data):
+  fp.seek(offset)
+  fp.write(data)
+  fp.flush()
+  fp.seek(0)
+
+
+def test_roundtrip():
+  with EphemeralFile('r+') as fp:
+    write_records(fp, RECORDS)
+    fp.seek(0)
+    reader = ChecksummedRecordReader(fp, StringCodec())
+    assert list(reader) == RECORDS
+    fp.seek(0)
+    assert [reader.read() for _ in RECORDS] == RECORDS
+    assert reader.read() is None
+
+
+def test_corrupt_length():
+  with EphemeralFile('r+') as fp:
+    write_records(fp, RECORDS)
+    # Flip the high byte of the length of the third record.
+    corrupt(fp, 2 * FRAME_SIZE + 4, b'\x7f')
+    reader = ChecksummedRecordReader(fp, StringCodec())
+    assert reader.read() == RECORDS[0]
+    assert reader.read() == RECORDS[1]
+    with pytest.raises(ChecksummedRecordIO.CorruptFrame):
+      reader.read()
+    assert reader.resync() == 3 * FRAME_SIZE
+    assert reader.read() == RECORDS[3]
+    fp.seek(0)
+    assert list(reader) == RECORDS[:2] + RECORDS[3:]
+
+
+def test_corrupt_payload():
+  with EphemeralFile('r+') as fp:
+    write_records(fp, RECORDS)
+    corrupt(fp, 5 * FRAME_SIZE - 1, b'X')
+    reader = ChecksummedRecordReader(fp, StringCodec())
+    assert list(reader) == RECORDS[:4] + RECORDS[5:]
+    fp.seek(0)
+    for _ in range(4):
+      reader.read()
+    with pytest.raises(ChecksummedRecordIO.ChecksumMismatch):
+      reader.read()
+
+
+def test_torn_frame():
+  with EphemeralFile('r+') as fp:
+    write_records(fp, RECORDS[:3])
+    # A frame torn by a crash, followed by frames written after a restart.
+    fp.write(ChecksummedRecordIO.frame('torn record')[:-3])
+    write_records(fp, RECORDS[3:])
+    fp.seek(0)
+    assert list(ChecksummedRecordReader(fp, StringCodec())) == RECORDS
+
+
+def test_resync_across_chunks():
+  with EphemeralFile('r+') as fp:
+    write_records(fp, RECORDS[:1])
+    garbage = (ChecksummedRecordIO.MAGIC + b'garbage') * (
+        3 * ChecksummedRecordIO.RESYNC_CHUNK_SIZE // 11)
+    fp.write(garbage)
+    write_records(fp, RECORDS[1:])
+    fp.seek(0)
+    assert list(ChecksummedRecordReader(fp, StringCodec())) == RECORDS
+    assert ChecksummedRecordIO.resync(fp, 1) == FRAME_SIZE + len(garbage)
+    fp.seek(0, 2)
+    assert ChecksummedRecordIO.resync(fp, fp.tell() - FRAME_SIZE + 1) is None
+
+
+def test_truncated_tail():
+  with EphemeralFile('r+') as fp:
+    write_records(fp, RECORDS)
+    fp.truncate(len(RECORDS) * FRAME_SIZE - 2)
+    fp.seek(0)
+    reader = ChecksummedRecordReader(fp, StringCodec())
+    assert list(reader) == RECORDS[:-1]
+    fp.seek(0)
+    for _ in RECORDS[:-1]:
+      reader.read()
+    assert reader.try_read() is None
+    with pytest.raises(RecordIO.PrematureEndOfStream):
+      reader.read()
+
+
+def test_write_many_read_many():
+  with EphemeralFile('r+') as fp:
+    writer = ChecksummedRecordWriter(fp, StringCodec())
+    assert writer.write_many(RECORDS)
+    corrupt(fp, 5 * FRAME_SIZE - 1, b'X')
+    reader = ChecksummedRecordReader(fp, StringCodec())
+    assert reader.read_many(max_records=2) == RECORDS[:2]
+    assert reader.read_many() == RECORDS[2:4]
+    with pytest.raises(ChecksummedRecordIO.ChecksumMismatch):
+      reader.read_many()
+    assert reader.resync() == 5 * FRAME_SIZE
+    assert reader.read_many(max_bytes=1) == RECORDS[5:6]
@@ -0,0 +1,132 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import os
+import threading
+
+from twitter.common.recordio import GroupCommitWriter, RecordReader, StringCodec
+from twitter.common.recordio.filelike import FileLike
+
+from recordio_test_harness import EphemeralFile
+
+
+def read_all(filename):
+  with open(filename) as fp:
+    return list(RecordReader(fp))
+
+
+def test_write_and_wait():
+  with EphemeralFile('w') as fp:
+    writer = GroupCommitWriter(fp, StringCodec())
+    assert writer.write('hello', wait=True)
+    assert read_all(fp.name) == ['hello']
+    ticket = writer.enqueue('world')
+    assert writer.wait(ticket)
+    assert read_all(fp.name) == ['hello', 'world']
+    writer.close()
+
+
+def test_flush_and_close():
+  with EphemeralFile('w') as fp:
+    writer = GroupCommitWriter(fp, StringCodec(), max_delay_secs=60)
+    assert writer.flush()
+    for k in range(100):
+      assert writer.write('record %d' % k)
+    assert writer.flush()
+    assert read_all(fp.name) == ['record %d' % k for k in range(100)]
+    writer.write('last')
+    writer.close()
+    assert read_all(fp.name)[-1] == 'last'
+    assert writer.enqueue('closed') is None
+    assert writer.write('closed') is False
+
+
+def test_batches_by_size():
+  with EphemeralFile('w') as fp:
+    writes = []
+    class CountingFileLike(FileLike):
+      def write(self, data):
+        writes.append(data)
+        return FileLike.write(self, data)
+    writer = GroupCommitWriter(CountingFileLike(fp), StringCodec(), sync=False,
+                               max_batch_bytes=100, max_delay_secs=60)
+    tickets = [writer.enqueue('x' * 16) for _ in range(5)]  # 5 * 20 bytes
+    assert writer.wait(tickets[-1], timeout=10)
+    assert len(writes) == 1 and len(writes[0]) == 100
+    writer.close()
+
+
+def test_concurrent_producers():
+  with EphemeralFile('w') as fp:
+    writer = GroupCommitWriter(fp, StringCodec())
+    results = []
+    def produce(index):
+      for k in range(50):
+        results.append(writer.write('%d:%d' % (index, k), wait=(k % 10 == 0)))
+    threads = [threading.Thread(target=produce, args=(index,)) for index in range(8)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    writer.close()
+    assert all(results) and len(results) == 400
+    records = read_all(fp.name)
+    assert sorted(records) == sorted('%d:%d' % (index, k) for index in range(8) for k in range(50))
+    for index in range(8):
+      mine = [record for record in records if record.startswith('%d:' % index)]
+      assert mine == ['%d:%d' % (index, k) for k in range(50)]
+
+
+class FailingFileLike(FileLike):
+  def write(self, data):
+    raise IOError('disk on fire')
+
+
+def test_failed_batch():
+  with EphemeralFile('w') as fp:
+    writer = GroupCommitWriter(FailingFileLike(fp), StringCodec())
+    assert writer.write('hello', wait=True) is False
+    assert writer.enqueue('world') is None
+    assert writer.flush() is False
+    writer.close()
+    assert os.path.getsize(fp.name) == 0
+
+
+class ClosedFileLike(FileLike):
+  def write(self, data):
+    raise ValueError('I/O operation on closed file')
+
+
+def test_failed_batch_unexpected_exception():
+  with EphemeralFile('w') as fp:
+    writer = GroupCommitWriter(ClosedFileLike(fp), StringCodec())
+    ticket = writer.enqueue('hello')
+    assert writer.wait(ticket, timeout=10) is False
+    assert writer.write('world') is False
+    writer.close()
+    assert os.path.getsize(fp.name) == 0
+
+
+def test_committer_dies():
+  class BrokenWriter(GroupCommitWriter):
+    def _next_batch(self):
+      raise RuntimeError('committer bug')
+  with EphemeralFile('w') as fp:
+    writer = BrokenWriter(fp, StringCodec())
+    writer._committer.join(timeout=10)
+    assert writer.enqueue('hello') is None
+    assert writer.write('hello', wait=True) is False
+    writer.close()
@@ -0,0 +1,143 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import pytest
+
+from twitter.common.recordio import (
+  IndexedRecordReader,
+  IndexedRecordWriter,
+  RecordIndex,
+  RecordIO,
+  RecordWriter,
+  StringCodec)
+
+from recordio_test_harness import EphemeralFile
+
+
+def record_key(record):
+  return int(record.split()[1])
+
+
+def write_indexed(fp, index_fp, records, key=None):
+  writer = IndexedRecordWriter(fp, StringCodec(), index_fp, key=key)
+  for record in records:
+    assert writer.write(record)
+  fp.flush()
+  index_fp.flush()
+  return writer
+
+
+def test_invalid_index():
+  with EphemeralFile('r+') as fp:
+    fp.write('not an index')
+    fp.flush()
+    with pytest.raises(RecordIO.InvalidFileHandle):
+      RecordIndex(fp)
+
+
+def test_keyed_mismatch():
+  with EphemeralFile('r+') as fp:
+    RecordIndex(fp, keyed=True)
+    with pytest.raises(RecordIO.InvalidArgument):
+      RecordIndex(fp, keyed=False)
+    assert RecordIndex(fp).keyed
+
+
+def test_seek_record():
+  records = ['record %d' % k for k in range(100)]
+  with EphemeralFile('r+') as fp:
+    with EphemeralFile('r+') as index_fp:
+      write_indexed(fp, index_fp, records)
+      reader = IndexedRecordReader(fp, StringCodec(), index_fp)
+      assert len(reader.index()) == 100
+      assert not reader.index().keyed
+      for n in (57, 0, 99, 3):
+        reader.seek_record(n)
+        assert reader.read() == records[n]
+      assert reader.read() == records[4]
+      for n in (-1, 100):
+        with pytest.raises(RecordIO.InvalidArgument):
+          reader.seek_record(n)
+      with pytest.raises(RecordIO.InvalidArgument):
+        reader.seek_key(10)
+
+
+def test_seek_key():
+  records = ['record %d' % (2 * k) for k in range(50)]
+  with EphemeralFile('r+') as fp:
+    with EphemeralFile('r+') as index_fp:
+      write_indexed(fp, index_fp, records, key=record_key)
+      reader = IndexedRecordReader(fp, StringCodec(), index_fp)
+      assert reader.index().key(10) == 20
+      assert reader.seek_key(0) == 0
+      assert reader.read() == 'record 0'
+      assert reader.seek_key(21) == 11
+      assert reader.read() == 'record 22'
+      assert reader.seek_key(98) == 49
+      assert reader.seek_key(99) is None
+      assert reader.read() == 'record 98'
+
+
+def test_key_must_not_decrease():
+  with EphemeralFile('r+') as fp:
+    with EphemeralFile('r+') as index_fp:
+      writer = write_indexed(fp, index_fp, ['record 1', 'record 3'], key=record_key)
+      with pytest.raises(RecordIO.InvalidArgument):
+        writer.write('record 2')
+      with pytest.raises(RecordIO.InvalidArgument):
+        writer.write('record -1')
+      assert writer.write('record 3')
+      assert len(writer.index()) == 3
+
+
+def test_writer_resumes():
+  with EphemeralFile('r+') as fp:
+    with EphemeralFile('r+') as index_fp:
+      write_indexed(fp, index_fp, ['record 1', 'record 2'], key=record_key)
+      writer = write_indexed(fp, index_fp, ['record 3'], key=record_key)
+      with pytest.raises(RecordIO.InvalidArgument):
+        writer.write('record 2')
+      reader = IndexedRecordReader(fp, StringCodec(), index_fp)
+      assert len(reader.index()) == 3
+      reader.seek_record(2)
+      assert reader.read() == 'record 3'
+
+
+def test_build():
+  records = ['record %d' % k for k in range(10)]
+  with EphemeralFile('r+') as fp:
+    writer = RecordWriter(fp)
+    for record in records[:5]:
+      writer.write(record)
+    fp.write('\x00\x00')
+    fp.flush()
+    with EphemeralFile('r+') as index_fp:
+      index = RecordIndex.build(fp, index_fp, StringCodec(), key=record_key)
+      assert len(index) == 5
+      assert index.key(4) == 4
+
+      # Complete the truncated record and resume the build.
+      fp.seek(-2, 2)
+      fp.truncate()
+      for record in records[5:]:
+        writer.write(record)
+      fp.flush()
+      index = RecordIndex.build(fp, index_fp, StringCodec(), key=record_key)
+      assert len(index) == 10
+
+      reader = IndexedRecordReader(fp, StringCodec(), index_fp)
+      assert reader.seek_key(7) == 7
+      assert reader.read() == 'record 7'
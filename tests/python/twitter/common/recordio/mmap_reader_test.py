@@ -0,0 +1,171 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import struct
+
+import pytest
+
+from twitter.common.recordio import MmapRecordReader, RecordIO, RecordWriter, StringCodec
+
+from recordio_test_harness import EphemeralFile
+
+
+class BufferCodec(RecordIO.Codec):
+  ACCEPTS_BUFFERS = True
+
+  def __init__(self):
+    self.decoded = []
+
+  def encode(self, blob):
+    return blob
+
+  def decode(self, blob):
+    self.decoded.append(blob)
+    return bytes(blob)
+
+
+def write_records(fp, records):
+  writer = RecordWriter(fp)
+  for record in records:
+    writer.write(record)
+  fp.flush()
+
+
+def test_bad_codec():
+  with EphemeralFile('r') as fp:
+    with pytest.raises(RecordIO.InvalidCodec):
+      MmapRecordReader(fp, 'not a codec')
+
+
+def test_empty_file():
+  with EphemeralFile('r') as fp:
+    reader = MmapRecordReader(fp, StringCodec())
+    assert reader.read() is None
+    assert reader.try_read() is None
+    assert list(reader) == []
+    assert reader.tell() == 0
+
+
+def test_read_and_iterate():
+  with EphemeralFile('r+') as fp:
+    write_records(fp, ['hello', '', 'world'])
+    reader = MmapRecordReader(fp, StringCodec())
+    assert reader.read() == 'hello'
+    assert reader.tell() == RecordIO.RECORD_HEADER_SIZE + 5
+    assert reader.read() == ''
+    assert reader.read() == 'world'
+    assert reader.read() is None
+    assert list(reader) == ['hello', '', 'world']
+    reader.seek(0)
+    assert reader.read() == 'hello'
+
+
+def test_frames_are_buffers():
+  with EphemeralFile('r+') as fp:
+    write_records(fp, ['hello', 'world'])
+    reader = MmapRecordReader(fp, StringCodec())
+    frames = list(reader.frames())
+    assert len(frames) == 2
+    assert not isinstance(frames[0], str)
+    assert [bytes(frame) for frame in frames] == [b'hello', b'world']
+
+
+def test_codec_accepts_buffers():
+  with EphemeralFile('r+') as fp:
+    write_records(fp, ['hello'])
+    codec = BufferCodec()
+    reader = MmapRecordReader(fp, codec)
+    assert reader.read() == b'hello'
+    assert not isinstance(codec.decoded[0], bytes)
+
+
+def test_file_grows():
+  with EphemeralFile('r+') as fp:
+    write_records(fp, ['hello'])
+    reader = MmapRecordReader(fp, StringCodec())
+    assert reader.read() == 'hello'
+    assert reader.read() is None
+    write_records(fp, ['world'])
+    assert reader.read() == 'world'
+    assert reader.read() is None
+
+
+def test_file_shrinks():
+  with EphemeralFile('r+') as fp:
+    write_records(fp, ['hello', 'world'])
+    reader = MmapRecordReader(fp, StringCodec())
+    assert reader.read() == 'hello'
+    assert reader.read() == 'world'
+    fp.seek(0)
+    fp.truncate()
+    write_records(fp, ['hi'])
+    assert reader.read() is None
+    assert list(reader) == ['hi']
+    reader.seek(0)
+    assert reader.read() == 'hi'
+    assert reader.read() is None
+
+
+def test_file_truncated_under_reader():
+  with EphemeralFile('r+') as fp:
+    write_records(fp, ['hello', 'world'])
+    reader = MmapRecordReader(fp, StringCodec())
+    assert reader.read() == 'hello'
+    fp.seek(0)
+    fp.truncate()
+    assert list(reader) == []
+    reader.seek(0)
+    assert reader.read() is None
+    write_records(fp, ['again'])
+    assert reader.read() == 'again'
+
+
+def test_truncated_header():
+  with EphemeralFile('r+') as fp:
+    write_records(fp, ['hello'])
+    fp.write(b'\x00\x00')
+    fp.flush()
+    reader = MmapRecordReader(fp, StringCodec())
+    assert reader.read() == 'hello'
+    position = reader.tell()
+    with pytest.raises(RecordIO.PrematureEndOfStream):
+      reader.read()
+    assert reader.try_read() is None
+    assert reader.tell() == position
+
+
+def test_truncated_frame():
+  with EphemeralFile('r+') as fp:
+    fp.write(struct.pack('>L', 10) + b'hello')
+    fp.flush()
+    reader = MmapRecordReader(fp, StringCodec())
+    with pytest.raises(RecordIO.PrematureEndOfStream):
+      reader.read()
+    assert reader.try_read() is None
+    assert reader.tell() == 0
+    assert list(reader) == []
+    fp.write(b'world')
+    fp.flush()
+    assert reader.read() == 'helloworld'
+
+
+def test_record_size_exceeded():
+  with EphemeralFile('r+') as fp:
+    fp.write(struct.pack('>L', RecordIO.MAXIMUM_RECORD_SIZE + 1))
+    fp.flush()
+    reader = MmapRecordReader(fp, StringCodec())
+    with pytest.raises(RecordIO.RecordSizeExceeded):
+      reader.try_read()
@@ -0,0 +1,143 @@
+# ==================================================================================================
+# Copyright 2013 Twitter, Inc.
+# --------------------------------------------------------------------------------------------------
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this work except in compliance with the License.
+# You may obtain a copy of the License in the LICENSE file, or at:
+#
+#  http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==================================================================================================
+
+import os
+
+import pytest
+
+from twitter.common.recordio import (
+  IndexedRecordWriter,
+  ParallelRecordReader,
+  RecordIndex,
+  RecordIO,
+  RecordWriter,
+  StringCodec)
+from twitter.common.recordio import parallel
+
+from recordio_test_harness import EphemeralFile
+
+
+RECORDS = ['record %d' % k for k in range(2000)]
+
+
+def record_number(record):
+  return int(record.split()[1])
+
+
+class FailingCodec(StringCodec):
+  def decode(self, blob):
+    if blob == 'record 1234':
+      raise RecordIO.InvalidTypeException('bad record')
+    return blob
+
+
+def write_records(fp, records):
+  writer = RecordWriter(fp)
+  for record in records:
+    writer.write(record)
+  fp.flush()
+
+
+def test_split():
+  with EphemeralFile('r+') as fp:
+    assert ParallelRecordReader.split(fp.name) == []
+    write_records(fp, RECORDS[:100])
+    fp.write('\x00\x00\x00\x10truncated')
+    fp.flush()
+    ranges = ParallelRecordReader.split(fp.name, chunk_bytes=100)
+    assert ranges[0][0] == 0
+    assert all(end - start >= 100 for start, end in ranges[:-1])
+    assert all(ranges[k][1] == ranges[k + 1][0] for k in range(len(ranges) - 1))
+    assert ranges[-1][1] == sum(4 + len(record) for record in RECORDS[:100])
+
+
+def test_split_large_frames():
+  with EphemeralFile('r+') as fp:
+    records = ['x' * 3000, 'y', 'z' * 5000]
+    write_records(fp, records)
+    ends = list(parallel._frame_ends(fp, 0, os.path.getsize(fp.name), read_bytes=1024))
+    assert ends == [3004, 3009, 8013]
+    assert ParallelRecordReader.split(fp.name, chunk_bytes=3005) == [(0, 3009), (3009, 8013)]
+
+
+def test_split_with_index(monkeypatch):
+  with EphemeralFile('r+') as fp:
+    with open(RecordIndex.sidecar(fp.name), 'w+') as index_fp:
+      writer = IndexedRecordWriter(fp, StringCodec(), index_fp)
+      writer.write_many(RECORDS[:1000])
+      fp.flush()
+      index_fp.flush()
+    # Records appended after the last indexed one are found by walking their headers.
+    write_records(fp, RECORDS[1000:1010])
+    frame_ends, walked = parallel._frame_ends, []
+    def counting_frame_ends(fp, offset, size):
+      for end in frame_ends(fp, offset, size):
+        walked.append(end)
+        yield end
+    monkeypatch.setattr(parallel, '_frame_ends', counting_frame_ends)
+    try:
+      with_index = ParallelRecordReader.split(fp.name, chunk_bytes=1000)
+      assert len(with_index) > 10
+      assert len(walked) == 11
+      os.unlink(RecordIndex.sidecar(fp.name))
+      ParallelRecordReader._SPLITS.clear()
+      assert ParallelRecordReader.split(fp.name, chunk_bytes=1000) == with_index
+      assert len(walked) == 11 + 1010
+    finally:
+      if os.path.exists(RecordIndex.sidecar(fp.name)):
+        os.unlink(RecordIndex.sidecar(fp.name))
+
+
+def test_split_cached(monkeypatch):
+  with EphemeralFile('r+') as fp:
+    write_records(fp, RECORDS[:100])
+    ranges = ParallelRecordReader.split(fp.name, chunk_bytes=100)
+    def frame_ends(fp, offset, size):
+      raise AssertionError('split was not cached')
+    monkeypatch.setattr(parallel, '_frame_ends', frame_ends)
+    assert ParallelRecordReader.split(fp.name, chunk_bytes=100) == ranges
+    monkeypatch.undo()
+    write_records(fp, RECORDS[100:200])
+    assert ParallelRecordReader.split(fp.name, chunk_bytes=100)[-1][1] == sum(
+        4 + len(record) for record in RECORDS[:200])
+
+
+def test_ordered():
+  with EphemeralFile('r+') as fp:
+    write_records(fp, RECORDS)
+    reader = ParallelRecordReader(fp.name, StringCodec(), processes=2, chunk_bytes=1024)
+    assert list(reader) == RECORDS
+
+
+def test_unordered_projection():
+  with EphemeralFile('r+') as fp:
+    write_records(fp, RECORDS)
+    reader = ParallelRecordReader(fp.name, StringCodec(), processes=2, chunk_bytes=1024,
+                                  projection=record_number)
+    assert sorted(reader.unordered()) == list(range(len(RECORDS)))
+
+
+def test_empty():
+  with EphemeralFile('r+') as fp:
+    assert list(ParallelRecordReader(fp.name, StringCodec(), processes=2)) == []
+
+
+def test_decode_failure():
+  with EphemeralFile('r+') as fp:
+    write_records(fp, RECORDS)
+    reader = ParallelRecordReader(fp.name, FailingCodec(), processes=2, chunk_bytes=1024)
+    with pytest.raises(RecordIO.Error):
+      list(reader)
@@ -227,6 +227,36 @@ class RecordioTestBase(mox.MoxTestBase):
       rr = RecordReader(fp)
       assert rr.read() == test_string
 
+  def test_write_many_read_many(self):
+    test_strings = ['record %d' % k for k in range(100)] + ['', 'x' * 1000]
+    with self.EphemeralFile('r+') as fp:
+      rw = RecordWriter(fp)
+      assert rw.write_many(iter(test_strings))
+      fp.seek(0)
+      rr = RecordReader(fp)
+      assert rr.read_many(max_records=0) == []
+      assert rr.read_many(max_records=10) == test_strings[:10]
+      assert rr.read() == test_strings[10]
+      records = []
+      while True:
+        batch = rr.read_many(max_bytes=64)
+        if not batch:
+          break
+        records.extend(batch)
+      assert records == test_strings[11:]
+      assert rr.read_many() == []
+
+  def test_read_many_truncated(self):
+    test_strings = ['hello', 'world']
+    with self.EphemeralFile('r+') as fp:
+      RecordWriter(fp).write_many(test_strings)
+      fp.write(struct.pack('>L', 100) + 'truncated')
+      fp.seek(0)
+      rr = RecordReader(fp)
+      assert rr.read_many() == test_strings
+      with pytest.raises(RecordIO.PrematureEndOfStream):
+        rr.read_many()
+
 
 class TestRecordioBuiltin(RecordioTestBase):
   def test_recordwriter_framing(self):